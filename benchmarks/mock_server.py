@@ -0,0 +1,361 @@
+import functools
+import gzip
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+import numpy as np
+
+MARKETS = ['Large Cap', 'Mid Cap', 'Small Cap', 'First North', 'Index']
+COUNTRIES = ['Sverige', 'Norge', 'Finland', 'Danmark']
+REPORT_FIELDS = ['revenues', 'gross_Income', 'operating_Income', 'profit_Before_Tax', 'profit_To_Equity_Holders',
+                 'earnings_Per_Share', 'number_Of_Shares', 'dividend', 'intangible_Assets', 'tangible_Assets',
+                 'financial_Assets', 'non_Current_Assets', 'cash_And_Equivalents', 'current_Assets', 'total_Assets',
+                 'total_Equity', 'non_Current_Liabilities', 'current_Liabilities', 'total_Liabilities_And_Equity',
+                 'net_Debt', 'cash_Flow_From_Operating_Activities', 'cash_Flow_From_Investing_Activities',
+                 'cash_Flow_From_Financing_Activities', 'cash_Flow_For_The_Year', 'free_Cash_Flow',
+                 'stock_Price_Average', 'stock_Price_High', 'stock_Price_Low']
+
+
+class MockBorsdataServer:
+    """
+    local stand-in for the Börsdata API serving deterministic synthetic payloads of realistic size.
+    every request can be delayed (latency) and answered with 429 (error_rate) to exercise retries.
+
+        with MockBorsdataServer(instruments=2000, latency=0.02) as server:
+            api = BorsdataAPI('key', url_root=server.url_root)
+    """
+    def __init__(self, instruments=2000, years=20, latency=0.0, error_rate=0.0, retry_after=0, seed=0,
+                 host='127.0.0.1', port=0, last_date='2020-12-30'):
+        """
+        :param instruments: number of instruments in the universe
+        :param years: years of daily prices and reports per instrument
+        :param latency: delay in seconds added to every response
+        :param error_rate: share of requests answered with 429 Too Many Requests
+        :param retry_after: value of the Retry-After header of the 429-responses
+        :param seed: seed of the synthetic data
+        :param host: interface to listen on
+        :param port: port to listen on, 0 picks a free port
+        :param last_date: date of the last stock price bar
+        """
+        self.instruments = instruments
+        self.years = years
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.last_date = np.datetime64(last_date, 'D')
+        self.request_count = 0
+        self.throttled_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self._routes = [
+            (r'branches', self._branches),
+            (r'sectors', self._sectors),
+            (r'markets', self._markets),
+            (r'countries', self._countries),
+            (r'translationmetadata', self._translation_metadata),
+            (r'instruments', self._instruments),
+            (r'instruments/updated', self._instruments_updated),
+            (r'instruments/(\d+)/stockprices', self._stock_prices),
+            (r'instruments/stockprices/last', self._stock_prices_last),
+            (r'instruments/stockprices/date', self._stock_prices_date),
+            (r'instruments/(\d+)/reports', self._reports),
+            (r'instruments/(\d+)/reports/(\w+)', self._report),
+            (r'instruments/reports/metadata', self._reports_metadata),
+            (r'instruments/(\d+)/kpis/(\d+)/(\w+)/(\w+)/history', self._kpi_history),
+            (r'instruments/kpis/(\d+)/(\w+)/(\w+)', self._kpi_all_instruments),
+            (r'instruments/kpis/updated', self._kpis_updated),
+            (r'instruments/kpis/metadata', self._kpis_metadata),
+            (r'instruments/stocksplits', self._stock_splits),
+        ]
+
+    @property
+    def url_root(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1/'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def stats(self):
+        return {'requests': self.request_count, 'throttled': self.throttled_count}
+
+    def _handle(self, handler):
+        if urlparse(handler.path).path.strip('/') == '_stats':
+            self._send(handler, 200, json.dumps(self.stats()).encode(), {'Content-Type': 'application/json'})
+            return
+        with self._lock:
+            self.request_count += 1
+            throttled = self.error_rate > 0 and self._random.random() < self.error_rate
+            if throttled:
+                self.throttled_count += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if throttled:
+            self._send(handler, 429, b'', {'Retry-After': str(self.retry_after)})
+            return
+        url = urlparse(handler.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path.strip('/')
+        path = path[len('v1/'):].strip('/') if path.startswith('v1/') else path
+        compress = 'gzip' in handler.headers.get('Accept-Encoding', '')
+        for pattern, route in self._routes:
+            match = re.fullmatch(pattern, path)
+            if match:
+                body = self._body(route.__name__, match.groups(), query.get('date'), query.get('from'),
+                                  query.get('to'), compress)
+                headers = {'Content-Type': 'application/json'}
+                if compress:
+                    headers['Content-Encoding'] = 'gzip'
+                self._send(handler, 200, body, headers)
+                return
+        self._send(handler, 404, b'', {})
+
+    @staticmethod
+    def _send(handler, status, body, headers):
+        handler.send_response(status)
+        for key, value in headers.items():
+            handler.send_header(key, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    @functools.lru_cache(maxsize=512)
+    def _body(self, route_name, args, date, from_date, to_date, compress):
+        route = getattr(self, route_name)
+        if route_name == '_stock_prices_date':
+            payload = route(*args, date=date)
+        elif route_name == '_stock_prices':
+            payload = route(*args, from_date=from_date, to_date=to_date)
+        else:
+            payload = route(*args)
+        body = (payload if isinstance(payload, str) else json.dumps(payload, separators=(',', ':'))).encode()
+        return gzip.compress(body, compresslevel=1) if compress else body
+
+    """
+    Synthetic data
+    """
+    def _rng(self, *keys):
+        return np.random.RandomState(zlib.crc32(repr((self.seed,) + keys).encode()))
+
+    def _instrument_meta(self, ins_id):
+        return {'insId': ins_id, 'name': f'Instrument {ins_id}', 'urlName': f'instrument-{ins_id}',
+                'instrument': 2 if ins_id % len(MARKETS) == len(MARKETS) - 1 else 0,
+                'isin': f'SE{ins_id:010d}', 'ticker': f'INS{ins_id}', 'yahoo': f'INS{ins_id}.ST',
+                'sectorId': ins_id % 10 + 1, 'marketId': ins_id % len(MARKETS) + 1, 'branchId': ins_id % 30 + 1,
+                'countryId': ins_id % len(COUNTRIES) + 1, 'listingDate': '2000-01-03T00:00:00',
+                'stockPriceCurrency': 'SEK', 'reportCurrency': 'SEK'}
+
+    def _trading_days(self):
+        start = self.last_date - 365 * self.years
+        days = np.arange(start, self.last_date + 1, dtype='datetime64[D]')
+        return days[np.is_busday(days)]
+
+    def _bars(self, ins_id, days):
+        rng = self._rng('prices', ins_id)
+        all_days = self._trading_days()
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(all_days))))
+        positions = np.searchsorted(all_days, days)
+        close = close[positions]
+        spread = close * 0.01
+        volume = rng.randint(1000, 1000000, len(all_days))[positions]
+        return [{'d': str(day), 'h': round(float(c + s), 2), 'l': round(float(c - s), 2), 'c': round(float(c), 2),
+                 'o': round(float(c - s / 2), 2), 'v': int(v)}
+                for day, c, s, v in zip(days, close, spread, volume)]
+
+    def _branches(self):
+        return {'branches': [{'id': i, 'name': f'Branch {i}', 'sectorId': (i - 1) % 10 + 1} for i in range(1, 31)]}
+
+    def _sectors(self):
+        return {'sectors': [{'id': i, 'name': f'Sector {i}'} for i in range(1, 11)]}
+
+    def _markets(self):
+        return {'markets': [{'id': i + 1, 'name': name, 'countryId': 1, 'isIndex': name == 'Index',
+                             'exchangeName': 'Nasdaq'} for i, name in enumerate(MARKETS)]}
+
+    def _countries(self):
+        return {'countries': [{'id': i + 1, 'name': name} for i, name in enumerate(COUNTRIES)]}
+
+    def _translation_metadata(self):
+        return {'translationMetadatas': [{'translationKey': f'key{i}', 'nameSv': f'Nyckel {i}',
+                                          'nameEn': f'Key {i}'} for i in range(100)]}
+
+    def _instruments(self):
+        return {'instruments': [self._instrument_meta(ins_id) for ins_id in range(1, self.instruments + 1)]}
+
+    def _instruments_updated(self):
+        return {'instruments': [{'insId': ins_id, 'updatedAt': f'{self.last_date}T0{ins_id % 10}:00:00'}
+                                for ins_id in range(1, self.instruments + 1)]}
+
+    def _stock_prices(self, ins_id, from_date=None, to_date=None):
+        # the full history is the largest payload, it is formatted directly instead of via json.dumps
+        ins_id = int(ins_id)
+        rng = self._rng('prices', ins_id)
+        days = self._trading_days()
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days))))
+        spread = close * 0.01
+        volume = rng.randint(1000, 1000000, len(days))
+        # the bars between from_date and to_date (inclusive)
+        in_range = np.ones(len(days), dtype=bool)
+        if from_date is not None:
+            in_range &= days >= np.datetime64(from_date, 'D')
+        if to_date is not None:
+            in_range &= days <= np.datetime64(to_date, 'D')
+        days, close, spread, volume = days[in_range], close[in_range], spread[in_range], volume[in_range]
+        rows = ','.join('{"d":"%s","h":%.2f,"l":%.2f,"c":%.2f,"o":%.2f,"v":%d}' % row
+                        for row in zip(days.astype(str).tolist(), (close + spread).tolist(),
+                                       (close - spread).tolist(), close.tolist(), (close - spread / 2).tolist(),
+                                       volume.tolist()))
+        return '{"instrument":%d,"stockPricesList":[%s]}' % (ins_id, rows)
+
+    def _stock_prices_last(self):
+        return {'stockPricesList': [dict(self._bars(ins_id, self._trading_days()[-1:])[0], i=ins_id)
+                                    for ins_id in range(1, self.instruments + 1)]}
+
+    def _stock_prices_date(self, date=None):
+        day = np.datetime64(date or str(self.last_date), 'D')
+        if not np.is_busday(day) or day > self.last_date:
+            return {'stockPricesList': []}
+        return {'stockPricesList': [dict(self._bars(ins_id, np.array([day]))[0], i=ins_id)
+                                    for ins_id in range(1, self.instruments + 1)]}
+
+    def _report_rows(self, ins_id, report_type):
+        rng = self._rng('reports', ins_id, report_type)
+        last_year = int(str(self.last_date)[:4])
+        periods = [(year, 5) for year in range(last_year - self.years, last_year)] if report_type == 'year' else \
+            [(year, period) for year in range(last_year - self.years, last_year) for period in range(1, 5)]
+        rows = []
+        for year, period in periods:
+            row = {'year': year, 'period': period}
+            for field in REPORT_FIELDS:
+                row[field] = None if rng.rand() < 0.02 else round(float(rng.normal(1000, 300)), 2)
+            row['report_End_Date'] = f'{year}-12-31T00:00:00'
+            row['report_Date'] = f'{year + 1}-02-15T00:00:00'
+            row['currency'] = 'SEK'
+            rows.append(row)
+        return rows
+
+    def _reports(self, ins_id):
+        ins_id = int(ins_id)
+        return {'instrument': ins_id, 'reportsYear': self._report_rows(ins_id, 'year'),
+                'reportsQuarter': self._report_rows(ins_id, 'quarter'), 'reportsR12': self._report_rows(ins_id, 'r12')}
+
+    def _report(self, ins_id, report_type):
+        return {'instrument': int(ins_id), 'reports': self._report_rows(int(ins_id), report_type)}
+
+    def _reports_metadata(self):
+        return {'reportMetadatas': [{'reportId': i + 1, 'nameSv': field, 'nameEn': field, 'reportPropery': field}
+                                    for i, field in enumerate(REPORT_FIELDS)]}
+
+    def _kpi_history(self, ins_id, kpi_id, report_type, price_type):
+        rng = self._rng('kpi', int(ins_id), int(kpi_id))
+        last_year = int(str(self.last_date)[:4])
+        return {'kpiId': int(kpi_id), 'reportTime': report_type, 'priceValue': price_type,
+                'values': [{'y': year, 'p': 5, 'v': round(float(rng.normal(15, 5)), 2)}
+                           for year in range(last_year - self.years, last_year)]}
+
+    def _kpi_all_instruments(self, kpi_id, calc_group, calc):
+        rng = self._rng('kpis', int(kpi_id), calc_group, calc)
+        values = rng.normal(15, 5, self.instruments)
+        return {'kpiId': int(kpi_id), 'group': calc_group, 'calculation': calc,
+                'values': [{'i': ins_id, 'n': round(float(value), 2), 's': None}
+                           for ins_id, value in zip(range(1, self.instruments + 1), values)]}
+
+    def _kpis_updated(self):
+        return {'kpisCalcUpdated': f'{self.last_date}T06:00:00'}
+
+    def _kpis_metadata(self):
+        return {'kpiHistoryMetadatas': [{'kpiId': i, 'nameSv': f'KPI {i}', 'nameEn': f'KPI {i}', 'format': None,
+                                         'isString': False} for i in range(1, 100)]}
+
+    def _stock_splits(self):
+        rng = self._rng('splits')
+        ins_ids = rng.choice(np.arange(1, self.instruments + 1), max(self.instruments // 100, 1), replace=False)
+        return {'stockSplitList': [{'instrumentId': int(ins_id), 'splitType': 'Split', 'ratio': '2:1',
+                                    'splitDate': f'{self.last_date - int(rng.randint(30, 3000))}T00:00:00'}
+                                   for ins_id in sorted(ins_ids)]}
+
+
+def _serve(kwargs, queue):
+    with MockBorsdataServer(**kwargs) as server:
+        queue.put(server.url_root)
+        server._thread.join()
+
+
+class MockServerProcess:
+    """
+    runs a MockBorsdataServer in a separate process, so that generating the payloads does not
+    compete with the benchmarked client for the GIL. takes the arguments of MockBorsdataServer.
+    """
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._process = None
+        self.url_root = None
+
+    def start(self):
+        queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_serve, args=(self._kwargs, queue), daemon=True)
+        self._process.start()
+        self.url_root = queue.get(timeout=60)
+        return self
+
+    def stop(self):
+        self._process.terminate()
+        self._process.join()
+
+    def stats(self):
+        with urlopen(self.url_root.replace('/v1/', '/_stats')) as response:
+            return json.loads(response.read())
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # serving the mock api until interrupted
+    with MockBorsdataServer(port=8080) as mock_server:
+        print(f'MockBorsdataServer >> serving on {mock_server.url_root}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,160 @@
+"""
+Offline benchmarks of BorsdataAPI and the BorsdataClient/ExcelExporter workflows against MockBorsdataServer
+(running in a separate process).
+run from the repository root:
+
+    python -m benchmarks.run_benchmarks --instruments 500 --latency 0.02 --error-rate 0.01
+"""
+import argparse
+import json
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from benchmarks.mock_server import MockServerProcess
+from borsdata import constants as constants
+from borsdata.borsdata_api import BorsdataAPI
+from borsdata.rate_limiter import TokenBucketRateLimiter
+
+
+class Measurement:
+    """
+    wall time, per-operation latencies and peak memory of one scenario.
+    peak memory is the peak python-allocated memory of the scenario if trace_memory is set (tracemalloc slows
+    down the scenario considerably), otherwise the peak RSS of the whole process so far (incl. the mock server).
+    """
+    trace_memory = False
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.wall_time = 0
+        self.peak_memory = 0
+
+    def __enter__(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wall_time = time.perf_counter() - self._start
+        if self.trace_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            # ru_maxrss is in kilobytes on linux
+            self.peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def timed(self, function):
+        # wraps function so that the latency of every call is recorded
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+        return wrapper
+
+    def result(self):
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.array([np.nan])
+        operations = len(self.latencies)
+        return {'scenario': self.name, 'operations': operations, 'wall_time_s': round(self.wall_time, 3),
+                'throughput_ops_s': round(operations / self.wall_time, 1) if self.wall_time > 0 else None,
+                'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+                'p90_ms': round(float(np.percentile(latencies, 90)), 2),
+                'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+                'peak_memory_mb': round(self.peak_memory / 2 ** 20, 1)}
+
+
+def create_api(server, args):
+    rate_limiter = TokenBucketRateLimiter(rate=args.rate, capacity=args.rate, window_calls=0)
+    return BorsdataAPI('benchmark', url_root=server.url_root, rate_limiter=rate_limiter, pool_size=args.workers,
+                       backoff_factor=0.01, max_retries=10)
+
+
+def single_call(server, args):
+    api = create_api(server, args)
+    with Measurement('single_call') as measurement:
+        get_stock_prices = measurement.timed(api.get_instrument_stock_prices)
+        for ins_id in range(1, args.calls + 1):
+            get_stock_prices(ins_id)
+    return measurement
+
+
+def universe_sweep(server, args):
+    api = create_api(server, args)
+    with Measurement('universe_sweep') as measurement:
+        get_stock_prices = measurement.timed(api.get_instrument_stock_prices)
+        for ins_id, stock_prices, error in api.fetch_many(get_stock_prices, range(1, args.instruments + 1),
+                                                          args.workers):
+            if error is not None:
+                raise error
+    return measurement
+
+
+def metadata_join(server, args):
+    from borsdata.borsdata_client import BorsdataClient
+    with Measurement('metadata_join') as measurement:
+        for _ in range(args.repeat):
+            client = BorsdataClient(create_api(server, args))
+            measurement.timed(client.instruments_with_meta_data)()
+    return measurement
+
+
+def excel_export(server, args):
+    from borsdata.excel_exporter import ExcelExporter
+    exporter = ExcelExporter(create_api(server, args))
+    exporter._instruments = exporter._instruments.head(args.export_instruments)
+    with Measurement('excel_export') as measurement:
+        exporter._fetch_instrument = measurement.timed(exporter._fetch_instrument)
+        exporter.create_excel_files(max_workers=args.workers)
+    return measurement
+
+
+SCENARIOS = {'single_call': single_call, 'universe_sweep': universe_sweep, 'metadata_join': metadata_join,
+             'excel_export': excel_export}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BorsdataAPI benchmarks against a local mock server')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--instruments', type=int, default=500, help='instruments in the mock universe')
+    parser.add_argument('--years', type=int, default=20, help='years of history per instrument')
+    parser.add_argument('--latency', type=float, default=0.0, help='latency per response in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of responses that are 429')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent api-calls')
+    parser.add_argument('--rate', type=float, default=1000, help='api-calls per second allowed by the rate limiter')
+    parser.add_argument('--calls', type=int, default=50, help='api-calls in the single_call scenario')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions of the metadata_join scenario')
+    parser.add_argument('--export-instruments', type=int, default=20, help='instruments in the excel_export scenario')
+    parser.add_argument('--trace-memory', action='store_true', help='measure peak memory per scenario (slow)')
+    parser.add_argument('--json', help='write the results to this json-file')
+    args = parser.parse_args()
+    Measurement.trace_memory = args.trace_memory
+    # exports are written to a temporary directory that is removed afterwards
+    export_path = tempfile.mkdtemp(prefix='borsdata_benchmark_')
+    constants.EXPORT_PATH = export_path + '/'
+    results = []
+    try:
+        with MockServerProcess(instruments=args.instruments, years=args.years, latency=args.latency,
+                               error_rate=args.error_rate) as server:
+            for name in args.scenarios:
+                stats_before = server.stats()
+                result = SCENARIOS[name](server, args).result()
+                stats_after = server.stats()
+                result['requests'] = stats_after['requests'] - stats_before['requests']
+                result['throttled'] = stats_after['throttled'] - stats_before['throttled']
+                results.append(result)
+                print(' '.join(f'{key}={value}' for key, value in result.items()))
+    finally:
+        shutil.rmtree(export_path, ignore_errors=True)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+helpers of the api-calls shared by BorsdataRawAPI and AsyncBorsdataAPI, without pandas or numpy
+"""
+
+
+def date_param(value):
+    """
+    date query parameter of the api, 'yyyy-mm-dd'
+    :param value: date, e.g. a str, dt.date, np.datetime64 or pd.Timestamp, None is not sent
+    :return: str or None
+    """
+    return None if value is None else str(value)[:10]
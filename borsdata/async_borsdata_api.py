@@ -0,0 +1,615 @@
+import asyncio
+import itertools
+import json
+import time
+import aiohttp
+from borsdata import constants as constants
+from borsdata.api_utils import date_param
+from borsdata.borsdata_raw_api import BorsdataRawAPI
+from borsdata.price_panel import PricePanel, FIELDS
+from borsdata.rate_limiter import TokenBucketRateLimiter
+from borsdata.response_cache import ResponseCache, CacheEntry
+from borsdata.response_frames import json_frame, instruments_frame, kpi_history_frame, reports_frames, \
+    stock_prices_frame, stock_prices_all_frame, stock_splits_frame
+from borsdata.stock_price_decoder import decode_stock_prices
+from borsdata.stock_splits import SplitIndex
+import pandas as pd
+
+
+class AsyncBorsdataAPI:
+    """
+    asyncio version of BorsdataAPI, the methods mirror BorsdataAPI and return the same data frames.
+    use as an async context manager (or call close()) to release the pooled connections:
+
+        async with AsyncBorsdataAPI(constants.API_KEY) as api:
+            instruments = await api.get_instruments()
+    """
+    _retry_status_codes = BorsdataRawAPI._retry_status_codes
+    # retry delays, metrics and cache invalidation work as in BorsdataRawAPI
+    _backoff_delay = BorsdataRawAPI._backoff_delay
+    _observe = BorsdataRawAPI._observe
+    _count = BorsdataRawAPI._count
+    _invalidate_updated = BorsdataRawAPI._invalidate_updated
+    _date_range = staticmethod(BorsdataRawAPI._date_range)
+    invalidate_cache = BorsdataRawAPI.invalidate_cache
+    kpis_updated = BorsdataRawAPI.kpis_updated
+    request_count = BorsdataRawAPI.request_count
+
+    def __init__(self, _api_key, verbose=False, pool_size=10, max_retries=5, backoff_factor=0.5, max_backoff=30,
+                 rate_limiter=None, url_root='https://apiservice.borsdata.se/v1/', cache=None, metrics=None,
+                 timeout=30):
+        """
+        :param _api_key: Börsdata API key
+        :param verbose: trace api-calls in terminal
+        :param pool_size: max number of open connections in the session pool
+        :param max_retries: number of retries on 429/5xx responses and connection errors
+        :param backoff_factor: base delay in seconds for exponential backoff between retries
+        :param max_backoff: upper limit in seconds for a single backoff delay
+        :param rate_limiter: rate limiter shared by all api-calls, can be shared with a BorsdataAPI
+        :param url_root: root url of the api, e.g. a local stub server for testing
+        :param cache: ResponseCache for the responses, None disables caching (can be shared with a BorsdataAPI)
+        :param metrics: Metrics collecting counters and stage latencies per endpoint, None disables metrics
+        :param timeout: seconds to wait for the connection and for each read of a response (or a tuple
+                        (connect, read)), a timed out api-call is retried like a connection error
+        """
+        self._api_key = _api_key
+        self._params = {'authKey': self._api_key, 'maxYearCount': 20, 'maxR12QCount': 40, 'maxCount': 20, 'version': 1}
+        self._url_root = url_root
+        self._rate_limiter = rate_limiter if rate_limiter is not None else TokenBucketRateLimiter()
+        self._cache = cache
+        self._metrics = metrics
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._max_backoff = max_backoff
+        self._timeout = timeout
+        self._pool_size = pool_size
+        # the session is created on first use, it has to be created inside a running event loop
+        self._session = None
+        # identical api-calls in flight share one request, cache key: task
+        self._in_flight = {}
+        # kpisCalcUpdated seen by the last refresh_cache
+        self._kpis_updated = None
+        # http-requests sent, see request_count (single-threaded, no lock needed)
+        self._request_count = 0
+        # ins_id -> name lookup, see get_instrument_names
+        self._instrument_names = None
+        # split factors for the adjusted stock prices, see get_split_index
+        self._split_index = None
+        self._verbose = verbose
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        closes the underlying http-session and its pooled connections
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _debug_trace(self, string):
+        if self._verbose:
+            print(string)
+
+    async def _observe_async(self, stage, url, awaitable):
+        """
+        awaits awaitable and records its duration as stage of the api-call to url, if metrics are enabled
+        :param stage: 'rate_limit' or 'network'
+        :param url: url of the api-call
+        :return: result of awaitable
+        """
+        if self._metrics is None:
+            return await awaitable
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._metrics.observe(stage, url, time.perf_counter() - start)
+
+    def _get_session(self):
+        if self._session is None:
+            connect, read = self._timeout if isinstance(self._timeout, tuple) else (self._timeout, self._timeout)
+            connector = aiohttp.TCPConnector(limit=self._pool_size)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+                                                  headers={'Accept-Encoding': 'gzip, deflate',
+                                                           'Accept': 'application/json'})
+        return self._session
+
+    async def _get_content(self, url, params=None):
+        """
+        internal function returning the raw response body, served from the cache if possible.
+        identical calls in flight at the same time share one request.
+        :param url: url to be added to _url_root
+        :param params: extra query parameters for this call only
+        :return: response body (bytes)
+        """
+        request_params = dict(self._params, **{key: value for key, value in (params or {}).items() if value is not None})
+        key = ResponseCache.key(url, request_params)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_content(url, request_params))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # a cancelled caller does not cancel the request of the others
+        return await asyncio.shield(task)
+
+    async def _fetch_content(self, url, request_params):
+        if self._cache is None or self._cache.ttl(url) is None:
+            return (await self._request(url, request_params))[2]
+        key = ResponseCache.key(url, request_params)
+        entry = self._cache.get(key)
+        if entry is not None and self._cache.is_fresh(entry):
+            self._debug_trace("AsyncBorsdataAPI >> cache hit: " + url)
+            self._count('cache_hits', url)
+            return entry.content
+        # revalidating a stale entry with a conditional request
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        status, response_headers, content = await self._request(url, request_params, headers)
+        if status == 304:
+            self._count('cache_revalidated', url)
+            self._cache.touch(key, entry)
+            return entry.content
+        self._count('cache_misses', url)
+        self._cache.set(key, CacheEntry(url, content, response_headers.get('ETag'),
+                                        response_headers.get('Last-Modified')))
+        return content
+
+    async def _get(self, url, request_params, headers):
+        async with self._get_session().get(self._url_root + url, params=request_params, headers=headers) as response:
+            return response, await response.read()
+
+    async def _request(self, url, request_params, headers=None):
+        """
+        internal function for http-requests, retries with exponential backoff on 429/5xx
+        :param url: url to be added to _url_root
+        :param request_params: query parameters
+        :param headers: extra http-headers, e.g. for conditional requests
+        :return: (status 200 or 304 for conditional requests, response headers, response body)
+        """
+        attempt = 0
+        while True:
+            # wait for the rate limiter to prevent error 429.
+            await self._observe_async('rate_limit', url, self._rate_limiter.acquire_async())
+            self._debug_trace("AsyncBorsdataAPI >> calling API: " + self._url_root + url)
+            self._count('requests', url)
+            self._request_count += 1
+            try:
+                response, content = await self._observe_async('network', url, self._get(url, request_params, headers))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self._max_retries:
+                    self._count('errors', url)
+                    raise
+                delay = self._backoff_delay(attempt)
+                self._debug_trace(f"AsyncBorsdataAPI >> connection error ({e}), retrying in {delay:.2f}s")
+            else:
+                # status_code == 200 SUCCESS!
+                self._count('bytes', url, len(content))
+                if response.status == 200 or (response.status == 304 and headers):
+                    return response.status, response.headers, content
+                if response.status == 429:
+                    self._count('throttled', url)
+                if response.status not in self._retry_status_codes or attempt >= self._max_retries:
+                    self._count('errors', url)
+                    print(f"AsyncBorsdataAPI >> API-Error, status code: {response.status}")
+                    raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status,
+                                                      message=f"API-Error, status code: {response.status}",
+                                                      headers=response.headers)
+                delay = self._backoff_delay(attempt, response)
+                self._debug_trace(f"AsyncBorsdataAPI >> status code: {response.status}, retrying in {delay:.2f}s")
+            self._count('retries', url)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _call_api(self, url, params=None):
+        """
+        internal function for api-calls
+        :param url: url to be added to _url_root
+        :param params: extra query parameters for this call only
+        :return: json-encoded content if any
+        """
+        content = await self._get_content(url, params)
+        return self._observe('decode', url, json.loads, content)
+
+    async def refresh_cache(self):
+        """
+        see BorsdataAPI.refresh_cache, removes cached data of instruments that have been updated and kpi-data
+        if the kpis have been re-calculated, drops the instrument names and updates the split index.
+        costs two api-calls (no-op without a cache).
+        :return: list of updated instrument ids
+        """
+        if self._cache is None:
+            return []
+        instruments = (await self._call_api('instruments/updated'))['instruments']
+        kpis_updated = (await self._call_api('instruments/kpis/updated'))['kpisCalcUpdated']
+        updated = self._invalidate_updated(instruments, kpis_updated)
+        if updated:
+            self._instrument_names = None
+            if self._split_index is not None:
+                self._split_index.update(await self.get_stock_splits())
+        return updated
+
+    """
+    Instrument Meta
+    """
+    async def get_branches(self):
+        """
+        returns branch data
+        :return: pd.DataFrame
+        """
+        json_data = await self._call_api('branches')
+        return self._observe('process', 'branches', json_frame, json_data, 'branches')
+
+    async def get_countries(self):
+        """
+        returns countries data
+        :return: pd.DataFrame
+        """
+        json_data = await self._call_api('countries')
+        return self._observe('process', 'countries', json_frame, json_data, 'countries')
+
+    async def get_markets(self):
+        """
+        returns market data
+        :return: pd.DataFrame
+        """
+        json_data = await self._call_api('markets')
+        return self._observe('process', 'markets', json_frame, json_data, 'markets')
+
+    async def get_sectors(self):
+        """
+        returns sector data
+        :return: pd.DataFrame
+        """
+        json_data = await self._call_api('sectors')
+        return self._observe('process', 'sectors', json_frame, json_data, 'sectors')
+
+    async def get_translation_meta_data(self):
+        """
+        returns translation metadata
+        :return: pd.DataFrame
+        """
+        json_data = await self._call_api('translationmetadata')
+        return self._observe('process', 'translationmetadata', json_frame, json_data, 'translationMetadatas')
+
+    """
+    Instruments
+    """
+    async def get_instruments(self):
+        """
+        returns instrument data
+        :return: pd.DataFrame
+        """
+        json_data = await self._call_api('instruments')
+        return self._observe('process', 'instruments', instruments_frame, json_data)
+
+    async def get_instruments_updated(self):
+        """
+        returns all updated instruments
+        :return: pd.DataFrame
+        """
+        json_data = await self._call_api('instruments/updated')
+        return self._observe('process', 'instruments/updated', json_frame, json_data, 'instruments')
+
+    """
+    KPIs
+    """
+    async def get_kpi_history(self, ins_id, kpi_id, report_type, price_type, max_count=None):
+        """
+        returns kpi history for instrument
+        :param ins_id: instrument id
+        :param kpi_id: kpi id
+        :param report_type: ['quarter', 'year', 'r12']
+        :param price_type: ['mean', 'high', 'low']
+        :param max_count: max number of periods (default 20)
+        :return: pd.DataFrame
+        """
+        url = f"instruments/{ins_id}/kpis/{kpi_id}/{report_type}/{price_type}/history"
+        json_data = await self._call_api(url, {'maxCount': max_count})
+        return self._observe('process', url, kpi_history_frame, json_data)
+
+    async def get_kpi_summary(self, ins_id, report_type):
+        """
+        returns kpi summary for instrument
+        :param ins_id: instrument id
+        :param report_type: report type ['quarter', 'year', 'r12']
+        :return: json object
+        """
+        return await self._call_api(f"instruments/{ins_id}/kpis/{report_type}/summary")
+
+    async def get_kpi_data_instrument(self, ins_id, kpi_id, calc_group, calc):
+        """
+        get screener data, for more information: https://github.com/Borsdata-Sweden/API/wiki/KPI-Screener
+        :param ins_id: instrument id
+        :param kpi_id: kpi id
+        :param calc_group: ['1year', '3year', '5year', '7year', '10year', '15year']
+        :param calc: ['high', 'latest', 'mean', 'low', 'sum', 'cagr']
+        :return: json object
+        """
+        return await self._call_api(f"instruments/{ins_id}/kpis/{kpi_id}/{calc_group}/{calc}")
+
+    async def get_kpi_data_all_instruments(self, kpi_id, calc_group, calc):
+        """
+        get kpi data for all instruments
+        :param kpi_id: kpi id
+        :param calc_group: ['1year', '3year', '5year', '7year', '10year', '15year']
+        :param calc: ['high', 'latest', 'mean', 'low', 'sum', 'cagr']
+        :return: json object
+        """
+        return await self._call_api(f"instruments/kpis/{kpi_id}/{calc_group}/{calc}")
+
+    async def get_updated_kpis(self):
+        """
+        get latest calculation time for kpis
+        :return: json object
+        """
+        return await self._call_api("instruments/kpis/updated")
+
+    async def get_kpi_metadata(self):
+        """
+        get kpi metadata
+        :return: json object
+        """
+        return await self._call_api("instruments/kpis/metadata")
+
+    """
+    Reports
+    """
+    async def get_instrument_report(self, ins_id, report_type, max_count=None):
+        """
+        get specific report data
+        :param ins_id: instrument id
+        :param report_type: ['quarter', 'year', 'r12']
+        :param max_count: max number of reports (default 20)
+        :return: pd.DataFrame of report data
+        """
+        json_data = await self._call_api(f"instruments/{ins_id}/reports/{report_type}", {'maxCount': max_count})
+        return pd.DataFrame.from_dict(json_data['reports'], orient='columns')
+
+    async def get_instrument_reports(self, ins_id, max_year_count=None, max_r12q_count=None):
+        """
+        get all report data
+        :param ins_id: instrument id
+        :param max_year_count: max number of year reports (default 20)
+        :param max_r12q_count: max number of quarter and r12 reports (default 40)
+        :return: [pd.DataFrame(), pd.DataFrame(), pd.DataFrame()]
+        """
+        url = f'instruments/{ins_id}/reports'
+        json_data = await self._call_api(url, {'maxYearCount': max_year_count, 'maxR12QCount': max_r12q_count})
+        return self._observe('process', url, reports_frames, json_data)
+
+    async def get_reports_metadata(self):
+        """
+        get report metadata
+        :return: pd.DataFrame with metadata
+        """
+        json_data = await self._call_api("instruments/reports/metadata")
+        return pd.DataFrame.from_dict(json_data['reportMetadatas'], orient='columns')
+
+    """
+    Stockprices
+    """
+    async def get_instrument_stock_prices(self, ins_id, from_date=None, to_date=None, max_count=None, adjusted=False):
+        """
+        get stock prices for ins_id
+        :param ins_id: instrument id
+        :param from_date: first date, e.g. '2020-01-01' (default the full history)
+        :param to_date: last date (default the latest)
+        :param max_count: max number of days
+        :param adjusted: adjust the prices and volumes for stock splits, see get_split_index
+        :return: pd.DataFrame()
+        """
+        columns = await self.get_instrument_stock_price_arrays(ins_id, from_date, to_date, max_count, adjusted)
+        return self._observe('process', f'instruments/{ins_id}/stockprices', stock_prices_frame, columns)
+
+    async def get_instrument_stock_price_arrays(self, ins_id, from_date=None, to_date=None, max_count=None,
+                                                adjusted=False):
+        """
+        get stock prices for ins_id as typed numpy columns, without creating a data frame
+        :param ins_id: instrument id
+        :param from_date: first date, e.g. '2020-01-01' (default the full history)
+        :param to_date: last date (default the latest)
+        :param max_count: max number of days
+        :param adjusted: adjust the prices and volumes for stock splits, see get_split_index
+        :return: dict with 'date' (datetime64[D]), 'high', 'low', 'close', 'open' (float32) and 'volume' (int64)
+        """
+        url = f'instruments/{ins_id}/stockprices'
+        content = await self._get_content(url, self._date_range(from_date, to_date, max_count))
+        columns = self._observe('decode', url, decode_stock_prices, content)
+        if adjusted:
+            split_index = await self.get_split_index()
+            columns = self._observe('process', url, split_index.adjust_arrays, ins_id, columns)
+        return columns
+
+    async def get_instruments_stock_prices_last(self):
+        """
+        get last days' stock prices for all instruments
+        :return: pd.DataFrame()
+        """
+        url = 'instruments/stockprices/last'
+        columns = self._observe('decode', url, decode_stock_prices, await self._get_content(url))
+        stock_prices = self._observe('process', url, stock_prices_all_frame, columns)
+        stock_prices.fillna(0, inplace=True)
+        return stock_prices
+
+    async def get_stock_prices_date(self, date, adjusted=False):
+        """
+        get all instrument stock prices for passed date
+        :param date: date in string format, e.g. '2000-01-01'
+        :param adjusted: adjust the prices and volumes for stock splits, see get_split_index
+        :return: pd.DataFrame()
+        """
+        url = 'instruments/stockprices/date'
+        content = await self._get_content(url, {'date': date_param(date)})
+        columns = self._observe('decode', url, decode_stock_prices, content)
+        stock_prices = self._observe('process', url, stock_prices_all_frame, columns)
+        if adjusted:
+            split_index = await self.get_split_index()
+            stock_prices = self._observe('process', url, split_index.adjust_frame, stock_prices)
+        return stock_prices
+
+    """
+    Stocksplits
+    """
+    async def get_stock_splits(self):
+        """
+        get stock splits
+        :return: pd.DataFrame()
+        """
+        json_data = await self._call_api('instruments/stocksplits')
+        return self._observe('process', 'instruments/stocksplits', stock_splits_frame, json_data)
+
+    async def get_split_index(self, refresh=False):
+        """
+        cumulative split factors of all instruments, built from get_stock_splits on first use
+        :param refresh: fetch the stock splits and update the index now
+        :return: SplitIndex
+        """
+        if self._split_index is None:
+            self._split_index = SplitIndex.from_frame(await self.get_stock_splits())
+        elif refresh:
+            self._split_index.update(await self.get_stock_splits())
+        return self._split_index
+
+    """
+    Bulk Functions
+    """
+    async def fetch_many(self, function, ins_ids, max_concurrency=8, max_in_flight=None):
+        """
+        awaits function(ins_id) for every ins_id with at most max_concurrency calls in flight,
+        the calls share the rate limiter. a failing instrument does not abort the others.
+        at most max_in_flight calls are pending besides the finished ones being yielded, i.e. a slow
+        consumer holds a bounded number of results in memory and ins_ids can be a (lazy) generator.
+        :param function: coroutine function taking an ins_id, e.g. self.get_instrument_stock_prices
+        :param ins_ids: iterable of instrument ids
+        :param max_concurrency: number of concurrent api-calls
+        :param max_in_flight: max number of pending calls (default 2 * max_concurrency)
+        :return: async generator of (ins_id, result, error) in order of completion
+        """
+        max_in_flight = max_in_flight if max_in_flight is not None else 2 * max_concurrency
+        semaphore = asyncio.Semaphore(max_concurrency)
+        ins_ids = iter(ins_ids)
+        pending = set()
+
+        async def fetch(ins_id):
+            async with semaphore:
+                try:
+                    return ins_id, await function(ins_id), None
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._debug_trace(f"AsyncBorsdataAPI >> fetch_many Error for ins_id {ins_id}: {e}")
+                    return ins_id, None, e
+
+        def submit(count):
+            for ins_id in itertools.islice(ins_ids, count):
+                pending.add(asyncio.ensure_future(fetch(ins_id)))
+        try:
+            submit(max_in_flight)
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                # the finished calls are replaced before they are yielded, so the calls keep running
+                submit(len(done))
+                for task in done:
+                    yield task.result()
+        finally:
+            # the caller may stop iterating early, cancel the remaining calls
+            for task in pending:
+                task.cancel()
+
+    def get_instruments_stock_prices_many(self, ins_ids, max_concurrency=8, from_date=None, to_date=None,
+                                          adjusted=False, max_in_flight=None):
+        """
+        get stock prices for several instruments concurrently
+        :return: async generator of (ins_id, pd.DataFrame(), error)
+        """
+        return self.fetch_many(lambda ins_id: self.get_instrument_stock_prices(ins_id, from_date, to_date,
+                                                                               adjusted=adjusted),
+                               ins_ids, max_concurrency, max_in_flight)
+
+    def get_instrument_reports_many(self, ins_ids, max_concurrency=8, max_in_flight=None):
+        """
+        get all report data for several instruments concurrently
+        :return: async generator of (ins_id, (reports_quarter, reports_year, reports_r12), error)
+        """
+        return self.fetch_many(self.get_instrument_reports, ins_ids, max_concurrency, max_in_flight)
+
+    def get_kpi_history_many(self, ins_ids, kpi_id, report_type, price_type, max_concurrency=8, max_in_flight=None):
+        """
+        get kpi history for several instruments concurrently
+        :return: async generator of (ins_id, pd.DataFrame(), error)
+        """
+        return self.fetch_many(lambda ins_id: self.get_kpi_history(ins_id, kpi_id, report_type, price_type),
+                               ins_ids, max_concurrency, max_in_flight)
+
+    async def get_price_panel(self, ins_ids, fields=FIELDS, max_concurrency=8, path=None, from_date=None,
+                              to_date=None, adjusted=False):
+        """
+        get stock prices for several instruments as aligned date x ins_id float32 matrices
+        :param ins_ids: iterable of instrument ids
+        :param fields: fields to keep, default ('open', 'high', 'low', 'close', 'volume')
+        :param max_concurrency: number of concurrent api-calls
+        :param path: directory for memory-mapped matrices, None keeps them in memory
+        :param from_date: first date (default the full history)
+        :param to_date: last date (default the latest)
+        :param adjusted: adjust the prices and volumes for stock splits
+        :return: PricePanel
+        """
+        if adjusted:
+            await self.get_split_index()
+
+        def fetch(ins_id):
+            return self.get_instrument_stock_price_arrays(ins_id, from_date, to_date, adjusted=adjusted)
+
+        arrays = []
+        async for ins_id, columns, error in self.fetch_many(fetch, ins_ids, max_concurrency):
+            if error is not None:
+                print(f"AsyncBorsdataAPI >> get_price_panel could not fetch ins_id {ins_id}: {error}")
+                continue
+            arrays.append((int(ins_id), columns['date'], columns))
+        return PricePanel.from_arrays(arrays, fields, path)
+
+    """
+    Helper Functions
+    """
+    async def get_instrument_name(self, ins_id):
+        """
+        returns the instrument name (if found)
+        :param ins_id: instrument id
+        :return: name of instrument (string)
+        """
+        try:
+            name = (await self.get_instrument_names())[ins_id]
+        except Exception as e:
+            print("AsyncBorsdataAPI >> get_instrument_name Error")
+            print(e)
+            name = "Name could not be found!"
+        return name
+
+    async def get_instrument_names(self):
+        """
+        returns a dict of ins_id: name, built once and kept until refresh_cache() finds updated instruments
+        :return: dict
+        """
+        if self._instrument_names is None:
+            instruments = await self.get_instruments()
+            self._instrument_names = dict(zip(instruments['insId'], instruments['name']))
+        return self._instrument_names
+
+
+if __name__ == "__main__":
+    # Main, call functions here.
+    async def main():
+        async with AsyncBorsdataAPI(constants.API_KEY) as api:
+            print(await api.get_instruments())
+
+    asyncio.run(main())
@@ -1,304 +1,333 @@
-import requests
 import pandas as pd
-import time
 from borsdata import constants as constants
+from borsdata.borsdata_raw_api import BorsdataRawAPI
+from borsdata.api_utils import date_param
+from borsdata.response_frames import json_frame, instruments_frame, kpi_history_frame, reports_frames, \
+    stock_prices_frame, stock_prices_all_frame, stock_splits_frame
+from borsdata.price_panel import PricePanel, FIELDS
+from borsdata.stock_price_decoder import decode_stock_prices
+from borsdata.single_flight import SingleFlight, single_flight
+from borsdata.stock_splits import SplitIndex
 
-# pandas options for string representation of data frames (print)
-pd.set_option('display.max_columns', None)
-pd.set_option('display.max_rows', None)
 
+class BorsdataAPI(BorsdataRawAPI):
+    """
+    the Börsdata API as pandas data frames, see BorsdataRawAPI for the api-calls and their options
+    """
+    def __init__(self, _api_key, **kwargs):
+        """
+        :param _api_key: Börsdata API key
+        :param kwargs: verbose, pool_size, max_retries, backoff_factor, max_backoff, rate_limiter, url_root,
+                       cache, metrics and timeout, see BorsdataRawAPI
+        """
+        super().__init__(_api_key, **kwargs)
+        # concurrent identical calls of the methods below share one parsed result
+        self._flights = SingleFlight()
+        # ins_id -> name lookup, see get_instrument_names
+        self._instrument_names = None
+        # split factors for the adjusted stock prices, see get_split_index
+        self._split_index = None
 
-class BorsdataAPI:
-    def __init__(self, _api_key, verbose=False):
-        self._api_key = _api_key
-        self._params = {'authKey': self._api_key, 'maxYearCount': 20, 'maxR12QCount': 40, 'maxCount': 20, 'date': None, 'version': 1}
-        self._url_root = 'https://apiservice.borsdata.se/v1/'
-        self._last_api_call = 0
-        self._api_calls_per_second = 10
-        # used for tracing (api-calls in terminal)
-        self._verbose = verbose
-
-    def _debug_trace(self, string):
-        if self._verbose:
-            print(string)
-
-    def _call_api(self, url):
-        """
-        internal function for api-calls
-        :param url: url to be added to _url_root
-        :return: json-encoded content if any
-        """
-        current_time = time.time()
-        time_delta = current_time - self._last_api_call
-        # introduce sleep if time-delta is too big to prevent error 429.
-        if time_delta < 1 / self._api_calls_per_second:
-            time.sleep(1 / self._api_calls_per_second - time_delta)
-        response = requests.get(self._url_root + url, self._params)
-        self._debug_trace("BorsdataAPI >> calling API: " + self._url_root + url)
-        self._last_api_call = time.time()
-        # status_code == 200 SUCCESS!
-        if response.status_code != 200:
-            print(f"BorsdataAPI >> API-Error, status code: {response.status_code}")
-            return response
-        return response.json()
+    def refresh_cache(self):
+        """
+        see BorsdataRawAPI.refresh_cache, also drops the instrument names and updates the split index
+        if instruments have been updated
+        :return: list of updated instrument ids
+        """
+        updated = super().refresh_cache()
+        if updated:
+            self._instrument_names = None
+            if self._split_index is not None:
+                self._split_index.update(self.get_stock_splits())
+        return updated
 
     """
     Instrument Meta
     """
+    @single_flight
     def get_branches(self):
         """
         returns branch data
         :return: pd.DataFrame
         """
-        json_data = self._call_api('branches')
-        return pd.json_normalize(json_data['branches'])
+        json_data = self.get_branches_json()
+        return self._observe('process', 'branches', json_frame, json_data, 'branches')
 
+    @single_flight
     def get_countries(self):
         """
         returns countries data
         :return: pd.DataFrame
         """
-        json_data = self._call_api('countries')
-        return pd.json_normalize(json_data['countries'])
+        json_data = self.get_countries_json()
+        return self._observe('process', 'countries', json_frame, json_data, 'countries')
 
+    @single_flight
     def get_markets(self):
         """
         returns market data
         :return: pd.DataFrame
         """
-        json_data = self._call_api('markets')
-        return pd.json_normalize(json_data['markets'])
+        json_data = self.get_markets_json()
+        return self._observe('process', 'markets', json_frame, json_data, 'markets')
 
+    @single_flight
     def get_sectors(self):
         """
         returns sector data
         :return: pd.DataFrame
         """
-        json_data = self._call_api('sectors')
-        return pd.json_normalize(json_data['sectors'])
+        json_data = self.get_sectors_json()
+        return self._observe('process', 'sectors', json_frame, json_data, 'sectors')
 
+    @single_flight
     def get_translation_meta_data(self):
         """
         returns translation metadata
         :return: pd.DataFrame
         """
-        url = 'translationmetadata'
-        json_data = self._call_api(url)
-        translation_data = pd.json_normalize(json_data['translationMetadatas'])
-        return translation_data
+        json_data = self.get_translation_meta_data_json()
+        return self._observe('process', 'translationmetadata', json_frame, json_data, 'translationMetadatas')
 
     """
     Instruments
     """
+    @single_flight
     def get_instruments(self):
         """
         returns instrument data
         :return: pd.DataFrame
         """
-        url = 'instruments'
-        json_data = self._call_api(url)
-        instruments = pd.json_normalize(json_data['instruments'])
-        instruments['listingDate'] = pd.to_datetime(instruments['listingDate'])
-        return instruments
+        json_data = self.get_instruments_json()
+        return self._observe('process', 'instruments', instruments_frame, json_data)
 
+    @single_flight
     def get_instruments_updated(self):
         """
         returns all updated instruments
         :return: pd.DataFrame
         """
-        url = 'instruments/updated'
-        json_data = self._call_api(url)
-        instruments = pd.json_normalize(json_data['instruments'])
-        print(instruments.tail())
-        return instruments
+        json_data = self.get_instruments_updated_json()
+        return self._observe('process', 'instruments/updated', json_frame, json_data, 'instruments')
 
     """
     KPIs
     """
-    def get_kpi_history(self, ins_id, kpi_id, report_type, price_type):
-        url = f"instruments/{ins_id}/kpis/{kpi_id}/{report_type}/{price_type}/history"
-        json_data = self._call_api(url)
-        # creating dataframes from json-data
-        kpi_history = pd.DataFrame.from_dict(json_data['values'], orient='columns')
-        # the structure of the data-columns received are; 'y' year, 'p' period, 'v' value (kpi).
-        # renaming the columns
-        kpi_history.rename(columns={"y": "year", "p": "period", "v": "kpi_value"}, inplace=True)
-        kpi_history.fillna(0, inplace=True)
-        return kpi_history
-
-    def get_kpi_summary(self, ins_id, report_type):
+    @single_flight
+    def get_kpi_history(self, ins_id, kpi_id, report_type, price_type, max_count=None):
         """
-        returns kpi summary for instrument
-        :param ins_id: instrument id
-        :param report_type: report type ['quarter', 'year', 'r12']
-        :return: json object
-        """
-        url = f"instruments/{ins_id}/kpis/{report_type}/summary"
-        json_data = self._call_api(url)
-        return json_data
-
-    def get_kpi_data_instrument(self, ins_id, kpi_id, calc_group, calc):
-        """
-        get screener data, for more information: https://github.com/Borsdata-Sweden/API/wiki/KPI-Screener
+        returns kpi history for instrument
         :param ins_id: instrument id
         :param kpi_id: kpi id
-        :param calc_group: ['1year', '3year', '5year', '7year', '10year', '15year']
-        :param calc: ['high', 'latest', 'mean', 'low', 'sum', 'cagr']
-        :return: json object
-        """
-        url = f"instruments/{ins_id}/kpis/{kpi_id}/{calc_group}/{calc}"
-        json_data = self._call_api(url)
-        print(json_data)
-        return json_data
-
-    def get_kpi_data_all_instruments(self, kpi_id, calc_group, calc):
-        """
-        get kpi data for all instruments
-        :param kpi_id: kpi id
-        :param calc_group: ['1year', '3year', '5year', '7year', '10year', '15year']
-        :param calc: ['high', 'latest', 'mean', 'low', 'sum', 'cagr']
-        :return: json object
-        """
-        url = f"instruments/kpis/{kpi_id}/{calc_group}/{calc}"
-        json_data = self._call_api(url)
-        print(json_data)
-        return json_data
-
-    def get_updated_kpis(self):
-        """
-        get latest calculation time for kpis
-        :return: json object
-        """
-        url = f"instruments/kpis/updated"
-        json_data = self._call_api(url)
-        return json_data
-
-    def get_kpi_metadata(self):
-        """
-        get kpi metadata
-        :return: json object
+        :param report_type: ['quarter', 'year', 'r12']
+        :param price_type: ['mean', 'high', 'low']
+        :param max_count: max number of periods (default 20)
+        :return: pd.DataFrame
         """
-        url = f"instruments/kpis/metadata"
-        json_data = self._call_api(url)
-        return json_data
+        json_data = self.get_kpi_history_json(ins_id, kpi_id, report_type, price_type, max_count)
+        url = f"instruments/{ins_id}/kpis/{kpi_id}/{report_type}/{price_type}/history"
+        return self._observe('process', url, kpi_history_frame, json_data)
 
     """
     Reports
     """
-    def get_instrument_report(self, ins_id, report_type):
+    @single_flight
+    def get_instrument_report(self, ins_id, report_type, max_count=None):
         """
         get specific report data
         :param ins_id: instrument id
         :param report_type: ['quarter', 'year', 'r12']
+        :param max_count: max number of reports (default 20)
         :return: pd.DataFrame of report data
         """
-        url = f"instruments/{ins_id}/reports/{report_type}"
-        json_data = self._call_api(url)
+        json_data = self.get_instrument_report_json(ins_id, report_type, max_count)
         reports = pd.DataFrame.from_dict(json_data['reports'], orient='columns')
         return reports
 
-    def get_instrument_reports(self, ins_id):
+    @single_flight
+    def get_instrument_reports(self, ins_id, max_year_count=None, max_r12q_count=None):
         """
         get all report data
         :param ins_id:
+        :param max_year_count: max number of year reports (default 20)
+        :param max_r12q_count: max number of quarter and r12 reports (default 40)
         :return: [pd.DataFrame(), pd.DataFrame(), pd.DataFrame()]
         """
-        # constructing url for api-call, adding ins_id
-        url = f'instruments/{ins_id}/reports'
-        json_data = self._call_api(url)
-        # creating dataframes from json-data
-        reports_year = pd.DataFrame.from_dict(json_data['reportsYear'], orient='columns')
-        reports_quarter = pd.DataFrame.from_dict(json_data['reportsQuarter'], orient='columns')
-        reports_r12 = pd.DataFrame.from_dict(json_data['reportsR12'], orient='columns')
-        # making the columns lower-case in all dataframes
-        reports_year.columns = [x.lower() for x in reports_year.columns]
-        reports_quarter.columns = [x.lower() for x in reports_quarter.columns]
-        reports_r12.columns = [x.lower() for x in reports_r12.columns]
-        # replacing all nans with a 0
-        reports_year.fillna(0, inplace=True)
-        reports_quarter.fillna(0, inplace=True)
-        reports_r12.fillna(0, inplace=True)
-        # sort data ascending
-        reports_year = reports_year.sort_values(['year', 'period'], ascending=True)
-        reports_quarter = reports_quarter.sort_values(['year', 'period'], ascending=True)
-        reports_r12 = reports_r12.sort_values(['year', 'period'], ascending=True)
-        return reports_quarter, reports_year, reports_r12
+        json_data = self.get_instrument_reports_json(ins_id, max_year_count, max_r12q_count)
+        return self._observe('process', f'instruments/{ins_id}/reports', reports_frames, json_data)
 
+    @single_flight
     def get_reports_metadata(self):
         """
         get report metadata
         :return: pd.DataFrame with metadata
         """
-        url = f"instruments/reports/metadata"
-        json_data = self._call_api(url)
+        json_data = self.get_reports_metadata_json()
         metadata = pd.DataFrame.from_dict(json_data['reportMetadatas'], orient='columns')
         return metadata
 
     """
     Stockprices
     """
-    def get_instrument_stock_prices(self, ins_id):
+    @single_flight
+    def get_instrument_stock_prices(self, ins_id, from_date=None, to_date=None, max_count=None, adjusted=False):
         """
         get stock prices for ins_id
         :param ins_id:
+        :param from_date: first date, e.g. '2020-01-01' (default the full history)
+        :param to_date: last date (default the latest)
+        :param max_count: max number of days
+        :param adjusted: adjust the prices and volumes for stock splits, see get_split_index
         :return: pd.DataFrame()
         """
+        columns = self.get_instrument_stock_price_arrays(ins_id, from_date, to_date, max_count, adjusted)
+        return self._observe('process', f'instruments/{ins_id}/stockprices', stock_prices_frame, columns)
+
+    @single_flight
+    def get_instrument_stock_price_arrays(self, ins_id, from_date=None, to_date=None, max_count=None, adjusted=False):
+        """
+        get stock prices for ins_id as typed numpy columns, without creating a data frame
+        :param ins_id: instrument id
+        :param from_date: first date, e.g. '2020-01-01' (default the full history)
+        :param to_date: last date (default the latest)
+        :param max_count: max number of days
+        :param adjusted: adjust the prices and volumes for stock splits, see get_split_index
+        :return: dict with 'date' (datetime64[D]), 'high', 'low', 'close', 'open' (float32) and 'volume' (int64)
+        """
         url = f'instruments/{ins_id}/stockprices'
-        json_data = self._call_api(url)
-        stock_prices = pd.json_normalize(json_data['stockPricesList'])
-        # re-naming the columns
-        stock_prices.rename(columns={'d': 'date', 'c': 'close', 'h': 'high', 'l': 'low',
-                                     'o': 'open', 'v': 'volume'}, inplace=True)
-        # converting the date to a datetime-object
-        stock_prices.date = pd.to_datetime(stock_prices.date)
-        stock_prices.fillna(0, inplace=True)
-        # setting the 'date'-column in dataframe (table/spreadsheet) as index
-        stock_prices.set_index('date', inplace=True)
-        # sorting by the new index (date)
-        stock_prices = stock_prices.sort_index()
-        return stock_prices
+        if adjusted:
+            columns = self.get_instrument_stock_price_arrays(ins_id, from_date, to_date, max_count)
+            return self._observe('process', url, self.get_split_index().adjust_arrays, ins_id, columns)
+        content = self._get_content(url, self._date_range(from_date, to_date, max_count))
+        # decoding the response body straight into typed columns instead of json objects
+        return self._observe('decode', url, decode_stock_prices, content)
 
+    @single_flight
     def get_instruments_stock_prices_last(self):
         """
         get last days' stock prices for all instruments
         :return: pd.DataFrame()
         """
-        url = f'/instruments/stockprices/last'
-        json_data = self._call_api(url)
-        stock_prices = pd.json_normalize(json_data['stockPricesList'])
-        stock_prices.rename(columns={'d': 'date', 'i': 'ins_id', 'c': 'close', 'h': 'high', 'l': 'low',
-                                     'o': 'open', 'v': 'volume'}, inplace=True)
+        url = 'instruments/stockprices/last'
+        columns = self._observe('decode', url, decode_stock_prices, self._get_content(url))
+        stock_prices = self._observe('process', url, stock_prices_all_frame, columns)
         stock_prices.fillna(0, inplace=True)
         return stock_prices
 
-    def get_stock_prices_date(self, date):
+    @single_flight
+    def get_stock_prices_date(self, date, adjusted=False):
         """
         get all instrument stock prices for passed date
         :param date: date in string format, e.g. '2000-01-01'
+        :param adjusted: adjust the prices and volumes for stock splits, see get_split_index
         :return:
         """
-        url = f'/instruments/stockprices/date'
-        self._params['date'] = date
-        json_data = self._call_api(url)
-        stock_prices = pd.json_normalize(json_data['stockPricesList'])
-        stock_prices.rename(columns={'d': 'date', 'i': 'ins_id', 'c': 'close', 'h': 'high', 'l': 'low',
-                                     'o': 'open', 'v': 'volume'}, inplace=True)
+        url = 'instruments/stockprices/date'
+        columns = self._observe('decode', url, decode_stock_prices, self._get_content(url, {'date': date_param(date)}))
+        stock_prices = self._observe('process', url, stock_prices_all_frame, columns)
+        if adjusted:
+            stock_prices = self._observe('process', url, self.get_split_index().adjust_frame, stock_prices)
         return stock_prices
 
     """
     Stocksplits
     """
+    @single_flight
     def get_stock_splits(self):
         """
         get stock splits
         :return:
         """
-        url = f'/instruments/stocksplits'
-        json_data = self._call_api(url)
-        stock_splits = pd.json_normalize(json_data['stockSplitList'])
-        stock_splits['splitDate'] = pd.to_datetime(stock_splits['splitDate'] )
-        return stock_splits
-    
+        json_data = self.get_stock_splits_json()
+        return self._observe('process', 'instruments/stocksplits', stock_splits_frame, json_data)
+
+    def get_split_index(self, refresh=False):
+        """
+        cumulative split factors of all instruments, used by the adjusted stock prices.
+        built from get_stock_splits on first use and updated by refresh_cache when instruments have been updated,
+        an update only recomputes the factors of instruments with new splits.
+        :param refresh: fetch the stock splits and update the index now
+        :return: SplitIndex
+        """
+        if self._split_index is None:
+            self._split_index = SplitIndex.from_frame(self.get_stock_splits())
+        elif refresh:
+            self._split_index.update(self.get_stock_splits())
+        return self._split_index
+
+    """
+    Bulk Functions
+    """
+    def get_instruments_stock_prices_many(self, ins_ids, max_workers=8, from_date=None, to_date=None,
+                                          adjusted=False, max_in_flight=None):
+        """
+        get stock prices for several instruments concurrently
+        :param ins_ids: iterable of instrument ids
+        :param max_workers: number of concurrent api-calls
+        :param from_date: first date (default the full history)
+        :param to_date: last date (default the latest)
+        :param adjusted: adjust the prices and volumes for stock splits
+        :param max_in_flight: max number of pending api-calls (see fetch_many)
+        :return: generator of (ins_id, pd.DataFrame(), error)
+        """
+        if adjusted:
+            # building the split index once before the workers start
+            self.get_split_index()
+        return self.fetch_many(lambda ins_id: self.get_instrument_stock_prices(ins_id, from_date, to_date,
+                                                                               adjusted=adjusted),
+                               ins_ids, max_workers, max_in_flight)
+
+    def get_instrument_reports_many(self, ins_ids, max_workers=8, max_in_flight=None):
+        """
+        get all report data for several instruments concurrently
+        :param ins_ids: iterable of instrument ids
+        :param max_workers: number of concurrent api-calls
+        :param max_in_flight: max number of pending api-calls (see fetch_many)
+        :return: generator of (ins_id, (reports_quarter, reports_year, reports_r12), error)
+        """
+        return self.fetch_many(self.get_instrument_reports, ins_ids, max_workers, max_in_flight)
+
+    def get_kpi_history_many(self, ins_ids, kpi_id, report_type, price_type, max_workers=8, max_in_flight=None):
+        """
+        get kpi history for several instruments concurrently
+        :param ins_ids: iterable of instrument ids
+        :param kpi_id: kpi id
+        :param report_type: ['quarter', 'year', 'r12']
+        :param price_type: ['mean', 'high', 'low']
+        :param max_workers: number of concurrent api-calls
+        :param max_in_flight: max number of pending api-calls (see fetch_many)
+        :return: generator of (ins_id, pd.DataFrame(), error)
+        """
+        return self.fetch_many(lambda ins_id: self.get_kpi_history(ins_id, kpi_id, report_type, price_type),
+                               ins_ids, max_workers, max_in_flight)
+
+    def get_price_panel(self, ins_ids, fields=FIELDS, max_workers=8, path=None, from_date=None, to_date=None,
+                        adjusted=False):
+        """
+        get stock prices for several instruments as aligned date x ins_id float32 matrices
+        :param ins_ids: iterable of instrument ids
+        :param fields: fields to keep, default ('open', 'high', 'low', 'close', 'volume')
+        :param max_workers: number of concurrent api-calls
+        :param path: directory for memory-mapped matrices, None keeps them in memory
+        :param from_date: first date (default the full history)
+        :param to_date: last date (default the latest)
+        :param adjusted: adjust the prices and volumes for stock splits
+        :return: PricePanel
+        """
+        if adjusted:
+            self.get_split_index()
+
+        def fetch(ins_id):
+            return self.get_instrument_stock_price_arrays(ins_id, from_date, to_date, adjusted=adjusted)
+
+        def arrays():
+            for ins_id, columns, error in self.fetch_many(fetch, ins_ids, max_workers):
+                if error is not None:
+                    print(f"BorsdataAPI >> get_price_panel could not fetch ins_id {ins_id}: {error}")
+                    continue
+                yield int(ins_id), columns['date'], columns
+        return PricePanel.from_arrays(arrays(), fields, path)
+
     """
     Helper Functions
     """
@@ -308,15 +337,24 @@ class BorsdataAPI:
         :param ins_id:
         :return: name of instrument (string)
         """
-        df = self.get_instruments()
         try:
-            name = df[df['insId'] == ins_id]['name'].values[0]
+            name = self.get_instrument_names()[ins_id]
         except Exception as e:
             print("BorsdataAPI >> get_instrument_name Error")
             print(e)
             name = "Name could not be found!"
         return name
 
+    def get_instrument_names(self):
+        """
+        returns a dict of ins_id: name, built once and kept until refresh_cache() finds updated instruments
+        :return: dict
+        """
+        if self._instrument_names is None:
+            instruments = self.get_instruments()
+            self._instrument_names = dict(zip(instruments['insId'], instruments['name']))
+        return self._instrument_names
+
 
 if __name__ == "__main__":
     # Main, call functions here.
@@ -2,24 +2,85 @@
 from borsdata.borsdata_api import *
 # pandas is a data-analysis library for python (data frames)
 import pandas as pd
-# matplotlib for visual-presentations (plots)
-import matplotlib.pylab as plt
 # datetime for date- and time-stuff
 import datetime as dt
 # user constants
 from borsdata import constants as constants
+from borsdata.response_cache import ResponseCache
+# the analytics (kpi screener, close window, valuation, streaming, indicators) are imported on first use,
+# like matplotlib, so that importing the client only loads the api
 import numpy as np
 import os
 
-# pandas options for string representation of data frames (print)
-pd.set_option('display.max_columns', None)
-pd.set_option('display.max_rows', None)
+
+def _print_frame(df):
+    # printing all rows and columns, without changing the global pandas options
+    with pd.option_context('display.max_columns', None, 'display.max_rows', None):
+        print(df)
+
+
+def _kpi_value_2019(kpi_history):
+    # the kpi value of 2019 of an instrument's yearly kpi history, None if it has none
+    values = kpi_history.loc[kpi_history['year'] == 2019, 'kpi_value']
+    return values.iloc[-1] if len(values) > 0 else None
 
 
 class BorsdataClient:
-    def __init__(self):
-        self._borsdata_api = BorsdataAPI(constants.API_KEY)
+    def __init__(self, borsdata_api=None, warehouse=None, compute_pool=None):
+        """
+        :param borsdata_api: BorsdataAPI to use, default one with API_KEY and a response cache in CACHE_PATH
+        :param warehouse: Warehouse to read history_kpi, get_latest_pe and breadth_large_cap_sweden from
+                          instead of the api, see fill_warehouse
+        :param compute_pool: ComputePool computing the breadth of breadth_large_cap_sweden across processes,
+                             None computes it in this process
+        """
+        if borsdata_api is None:
+            borsdata_api = BorsdataAPI(constants.API_KEY, cache=ResponseCache(constants.CACHE_PATH + 'responses.sqlite'))
+        self._borsdata_api = borsdata_api
+        self._warehouse = warehouse
+        self._compute_pool = compute_pool
         self._instruments_with_meta_data = pd.DataFrame()
+        # positional row-indices per (market, country), built together with _instruments_with_meta_data
+        self._market_country_index = {}
+        # created on first use, see _get_kpi_screener, _get_close_window and _get_valuation
+        self._kpi_screener = None
+        # recent closes of all instruments for top_performers
+        self._close_window = None
+        # valuation ratios from the last prices and the report store
+        self._valuation = None
+
+    def refresh_cache(self):
+        """
+        see BorsdataAPI.refresh_cache, also drops the instrument meta data if instruments have been updated
+        and the kpi values of the kpi screener if the kpis have been re-calculated
+        :return: list of updated instrument ids
+        """
+        kpis_updated = self._borsdata_api.kpis_updated
+        updated = self._borsdata_api.refresh_cache()
+        if updated:
+            self._instruments_with_meta_data = pd.DataFrame()
+            self._market_country_index = {}
+        if self._borsdata_api.kpis_updated != kpis_updated and self._kpi_screener is not None:
+            self._kpi_screener.clear()
+        return updated
+
+    def _get_kpi_screener(self):
+        if self._kpi_screener is None:
+            from borsdata.kpi_screener import KpiScreener
+            self._kpi_screener = KpiScreener(self._borsdata_api)
+        return self._kpi_screener
+
+    def _get_close_window(self):
+        if self._close_window is None:
+            from borsdata.close_window import CloseWindow
+            self._close_window = CloseWindow(self._borsdata_api)
+        return self._close_window
+
+    def _get_valuation(self):
+        if self._valuation is None:
+            from borsdata.valuation import Valuation
+            self._valuation = Valuation(self._borsdata_api)
+        return self._valuation
 
     def instruments_with_meta_data(self):
         """
@@ -30,8 +91,7 @@ class BorsdataClient:
         if len(self._instruments_with_meta_data) > 0:
             return self._instruments_with_meta_data
         else:
-            self._borsdata_api = BorsdataAPI(constants.API_KEY)
-            # fetching data from api
+            # fetching data from api (meta data is served from the response cache if possible)
             countries = self._borsdata_api.get_countries()
             branches = self._borsdata_api.get_branches()
             sectors = self._borsdata_api.get_sectors()
@@ -39,31 +99,22 @@ class BorsdataClient:
             instruments = self._borsdata_api.get_instruments()
             # instrument type dict for conversion (https://github.com/Borsdata-Sweden/API/wiki/Instruments)
             instrument_type_dict = {0: 'Aktie', 1: 'Pref', 2: 'Index', 3: 'Stocks2', 4: 'SectorIndex', 5: 'BranschIndex'}
-            # creating an empty dataframe
-            instrument_df = pd.DataFrame()
-            # loop through the whole dataframe (table) i.e. row-wise-iteration.
-            for index, instrument in instruments.iterrows():
-                name = instrument['name']
-                ins_id = instrument['insId']
-                ticker = instrument['ticker']
-                isin = instrument['isin']
-                # locating meta-data in various ways
-                # dictionary-lookup
-                instrument_type = instrument_type_dict[instrument['instrument']]
-                # .loc locates the rows where the criteria (inside the brackets, []) is fulfilled
-                # located rows (should be only one) get the column 'name' and return its value-array
-                # take the first value in that array ([0], should be only one value)
-                market = markets.loc[markets['id'] == instrument['marketId']]['name'].values[0]
-                country = countries.loc[countries['id'] == instrument['countryId']]['name'].values[0]
-                sector = 'N/A'
-                branch = 'N/A'
-                # index-typed instruments does not have a sector or branch
-                if market.lower() != 'index':
-                    sector = sectors.loc[sectors['id'] == instrument['sectorId']]['name'].values[0]
-                    branch = branches.loc[branches['id'] == instrument['branchId']]['name'].values[0]
-                # appending current data to dataframe, i.e. adding a row to the table.
-                instrument_df = instrument_df.append({'name': name, 'ins_id': ins_id, 'ticker': ticker, 'isin': isin, 'instrument_type': instrument_type,
-                                                                    'market': market, 'country': country, 'sector': sector, 'branch': branch}, ignore_index=True)
+            # creating the dataframe column-wise from the instrument-data
+            instrument_df = pd.DataFrame({'name': instruments['name'], 'ins_id': instruments['insId'],
+                                          'ticker': instruments['ticker'], 'isin': instruments['isin']})
+            # locating meta-data by mapping the id-columns on id-indexed name-series (one hash-join per column)
+            instrument_df['instrument_type'] = instruments['instrument'].map(instrument_type_dict)
+            instrument_df['market'] = instruments['marketId'].map(markets.set_index('id')['name'])
+            instrument_df['country'] = instruments['countryId'].map(countries.set_index('id')['name'])
+            instrument_df['sector'] = instruments['sectorId'].map(sectors.set_index('id')['name'])
+            instrument_df['branch'] = instruments['branchId'].map(branches.set_index('id')['name'])
+            # index-typed instruments does not have a sector or branch
+            is_index = instrument_df['market'].str.lower() == 'index'
+            instrument_df.loc[is_index, ['sector', 'branch']] = 'N/A'
+            instrument_df[['sector', 'branch']] = instrument_df[['sector', 'branch']].fillna('N/A')
+            # categorical columns store each distinct name once
+            for column in ['instrument_type', 'market', 'country', 'sector', 'branch']:
+                instrument_df[column] = instrument_df[column].astype('category')
             # create directory if it do not exist
             if not os.path.exists(constants.EXPORT_PATH):
                 os.makedirs(constants.EXPORT_PATH)
@@ -75,9 +126,47 @@ class BorsdataClient:
             instrument_df.to_excel(excel_writer, 'instruments_with_meta_data')
             # saving the document
             excel_writer.save()
+            self._market_country_index = instrument_df.groupby(['market', 'country'], observed=True).indices
             self._instruments_with_meta_data = instrument_df
             return instrument_df
 
+    def instruments_in(self, market, country):
+        """
+        instruments with meta-data for market and country, looked up in the (market, country)-index
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :return: pd.DataFrame of instrument-data with meta-data
+        """
+        instruments = self.instruments_with_meta_data()
+        return instruments.iloc[self._market_country_index.get((market, country), [])]
+
+    def _names(self, market, country):
+        # ins_id: name of the instruments in market and country, from the warehouse if there is one
+        if self._warehouse is not None:
+            instruments = self._warehouse.instruments(market, country)
+        else:
+            instruments = self.instruments_in(market, country)
+        return dict(zip(instruments['ins_id'].astype(int), instruments['name']))
+
+    def fill_warehouse(self, market=None, country=None, kpis=((2, 'year', 'mean'),), ins_ids=(643,), max_workers=8):
+        """
+        fetches instruments, stock prices, reports, kpi history and stock splits into the warehouse
+        :param market: market e.g. 'Large Cap', None fills all markets
+        :param country: country e.g. 'Sverige', None fills all countries
+        :param kpis: list of (kpi_id, report_type, price_type) to fetch the kpi history of
+        :param ins_ids: instruments to fill in addition to market and country, e.g. indexes (643 is OMXSLCPI)
+        :param max_workers: number of concurrent api-calls
+        """
+        instruments = self.instruments_with_meta_data()
+        filtered_instruments = instruments
+        if market is not None:
+            filtered_instruments = filtered_instruments[filtered_instruments['market'] == market]
+        if country is not None:
+            filtered_instruments = filtered_instruments[filtered_instruments['country'] == country]
+        fill_ins_ids = set(filtered_instruments['ins_id'].astype(int)) | set(ins_ids)
+        self._warehouse.fill(self._borsdata_api, sorted(fill_ins_ids), kpis=kpis, instruments=instruments,
+                             max_workers=max_workers)
+
     def plot_stock_prices(self, ins_id):
         """
         Plotting a matplotlib chart for ins_id
@@ -87,9 +176,12 @@ class BorsdataClient:
         # creating api-object
         # using api-object to get stock prices from API
         stock_prices = self._borsdata_api.get_instrument_stock_prices(ins_id)
+        from borsdata import indicators as indicators
         # calculating/creating a new column named 'sma50' in the table and
         # assigning the 50 day rolling mean to it
-        stock_prices['sma50'] = stock_prices['close'].rolling(window=50).mean()
+        stock_prices['sma50'] = indicators.sma(stock_prices['close'], 50)
+        # matplotlib for visual-presentations (plots), imported on first use as it is slow to import
+        import matplotlib.pyplot as plt
         # filtering out data after 2015 for plot
         filtered_data = stock_prices[stock_prices.index > dt.datetime(2015, 1, 1)]
         # plotting 'close' (with 'date' as index)
@@ -110,57 +202,81 @@ class BorsdataClient:
         :param percent_change: number of days for percent change calculation
         :return: pd.DataFrame
         """
-        # creating api-object
-        # using defined function above to retrieve dataframe of all instruments
-        instruments = self.instruments_with_meta_data()
-        # filtering out the instruments with correct market and country
-        filtered_instruments = instruments.loc[(instruments['market'] == market) & (instruments['country'] == country)]
-        # creating new, empty dataframe
-        stock_prices = pd.DataFrame()
-        # looping through all rows in filtered dataframe
-        for index, instrument in filtered_instruments.iterrows():
-            # fetching the stock prices for the current instrument
-            instrument_stock_price = self._borsdata_api.get_instrument_stock_prices(int(instrument['ins_id']))
-            # calculating the current instruments percent change
-            instrument_stock_price['pct_change'] = instrument_stock_price['close'].pct_change(percent_change)
-            # getting the last row of the dataframe, i.e. the last days values
-            last_row = instrument_stock_price.iloc[[-1]]
-            # appending the instruments name and last days percent change to new dataframe
-            stock_prices = stock_prices.append({'stock': instrument['name'], 'pct_change': round(last_row['pct_change'].values[0]*100, 2)}, ignore_index=True)
-        # printing the top sorted by pct_change-column
-        print(stock_prices.sort_values('pct_change', ascending=False).head(number_of_stocks))
+        # the instruments with correct market and country
+        filtered_instruments = self.instruments_in(market, country)
+        names = dict(zip(filtered_instruments['ins_id'].astype(int), filtered_instruments['name']))
+        from borsdata.close_window import top_k
+        # the window of recent closes of all instruments is refreshed with one api-call per missing day
+        close_window = self._get_close_window()
+        close_window.refresh(days=percent_change + 1)
+        returns = close_window.returns(percent_change, names.keys())
+        # the instruments' name and percent change over the last percent_change days
+        stock_prices = pd.DataFrame({'stock': returns.index.map(names), 'pct_change': (returns.values * 100).round(2)})
+        # printing the top, ranked without sorting all instruments
+        _print_frame(stock_prices.iloc[top_k(stock_prices['pct_change'].values, number_of_stocks)])
         return stock_prices
 
-    def history_kpi(self, kpi, market, country):
+    def history_kpi(self, kpi, market, country, keep_history=True):
         """
         gathers and concatenates historical kpi-values for provided kpi, market and country
         :param kpi: kpi id see https://github.com/Borsdata-Sweden/API/wiki/KPI-History
         :param market: market to gather kpi-values from
         :param country: country to gather kpi-values from
-        :return: pd.DataFrame of historical kpi-values
+        :param keep_history: False only keeps the printed top 5 while streaming the instruments (constant memory)
+        :return: pd.DataFrame of historical kpi-values (the top 5 if not keep_history)
         """
-        # creating api-object
-        # using defined function above to retrieve data frame of all instruments
-        instruments = self.instruments_with_meta_data()
-        # filtering out the instruments with correct market and country
-        filtered_instruments = instruments.loc[(instruments['market'] == market) & (instruments['country'] == country)]
+        # the instruments with correct market and country
+        names = self._names(market, country)
+        if self._warehouse is not None:
+            # one query, filtered on market and country in the warehouse
+            symbols_df = self._warehouse.kpi_history(kpi, 'year', 'mean', market=market, country=country)
+            symbols_df['name'] = symbols_df.pop('ins_id').map(names)
+        elif keep_history:
+            symbols_df = self._fetch_history_kpi(kpi, names)
+        else:
+            # folding the instruments into the top 5 as they arrive, no history is kept
+            from borsdata.streaming import fold, TopK
+            top, = fold(self._borsdata_api.get_kpi_history_many(names.keys(), kpi, 'year', 'mean'),
+                        [TopK(5, _kpi_value_2019)])
+            symbols_df = pd.DataFrame({'year': 2019, 'kpi_value': top.values, 'name': top.index.map(names)})
+        # the data frame has the columns ['year', 'period', 'kpi_value', 'name']
+        # get the last year ranked from highest to lowest, show top 5
+        _print_frame(symbols_df[symbols_df['year'] == 2019].sort_values('kpi_value', ascending=False).head(5))
+        return symbols_df
+
+    def _fetch_history_kpi(self, kpi, names):
         # creating empty array (to hold data frames)
         frames = []
-        # looping through all rows in filtered data frame
-        for index, instrument in filtered_instruments.iterrows():
-            # fetching the stock prices for the current instrument
-            instrument_kpi_history = self._borsdata_api.get_kpi_history(int(instrument['ins_id']), kpi, 'year', 'mean')
-            instrument_kpi_history['name'] = instrument['name']
+        # fetching the kpi history for all filtered instruments concurrently
+        for ins_id, instrument_kpi_history, error in self._borsdata_api.get_kpi_history_many(names.keys(), kpi, 'year', 'mean'):
+            if error is not None:
+                print(f"BorsdataClient >> could not fetch kpi history for {names[ins_id]}: {error}")
+                continue
+            instrument_kpi_history['name'] = names[ins_id]
             # check to see if response holds any data.
             if len(instrument_kpi_history) > 0:
                 # appending data frame to array
-                frames.append(instrument_kpi_history.copy())
+                frames.append(instrument_kpi_history)
         # creating concatenated data frame with concat
-        symbols_df = pd.concat(frames)
-        # the data frame has the columns ['year', 'period', 'kpi_value', 'name']
-        # get the last year ranked from highest to lowest, show top 5
-        print(symbols_df[symbols_df['year'] == 2019].sort_values('kpi_value', ascending=False).head(5))
-        return symbols_df
+        return pd.concat(frames)
+
+    def kpi_screen(self, kpis, market, country, where=None, rank=None, number_of_stocks=10):
+        """
+        screens the instruments of market and country on several kpis, one api-call per kpi
+        :param kpis: dict of column name: (kpi_id, calc_group, calc), e.g. {'pe': (2, 'last', 'latest')}
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param where: filter expression on the column names, e.g. 'pe > 0 and pe < 15'
+        :param rank: dict of column name: weight, a negative weight favours low values (e.g. {'pe': -1})
+        :param number_of_stocks: number of instruments to return
+        :return: pd.DataFrame of kpis (and score) with the instrument names
+        """
+        filtered_instruments = self.instruments_in(market, country)
+        names = dict(zip(filtered_instruments['ins_id'].astype(int), filtered_instruments['name']))
+        screen = self._get_kpi_screener().screen(kpis, where, rank, number_of_stocks, list(names))
+        screen.insert(0, 'name', screen.index.map(names))
+        _print_frame(screen)
+        return screen
 
     def get_latest_pe(self, ins_id):
         """
@@ -168,54 +284,107 @@ class BorsdataClient:
         :param ins_id: ins_id which PE-ratio will be calculated for
         :return:
         """
-        # creating api-object
-        # fetching all instrument data
-        reports_quarter, reports_year, reports_r12 = self._borsdata_api.get_instrument_reports(3)
-        # getting the last reported eps-value
-        last_eps = reports_r12['earnings_per_share'].values[-1]
-        # getting the stock prices
-        stock_prices = self._borsdata_api.get_instrument_stock_prices(ins_id)
-        # getting the last close
-        last_close = stock_prices['close'].values[-1]
-        # getting the last date
-        last_date = stock_prices.index.values[-1]
-        # using help-function to retrieve the name of the instrument
-        instrument_name = self._borsdata_api.get_instrument_name(3)
+        if self._warehouse is not None:
+            # reading the r12 eps and the closes of the instrument from the warehouse
+            reports_r12 = self._warehouse.reports([ins_id], report_type='r12', fields=['earnings_per_share'])
+            stock_prices = self._warehouse.prices([ins_id], columns=['close'])
+            instruments = self._warehouse.instruments(ins_ids=[ins_id])
+            instrument_name = instruments['name'].values[0] if len(instruments) > 0 else "Name could not be found!"
+            if len(stock_prices) == 0 or len(reports_r12) == 0:
+                print(f"BorsdataClient >> PE for ins_id {ins_id} could not be found!")
+                return
+            # the last reported eps-value and the last close
+            pe = stock_prices['close'].values[-1] / reports_r12['earnings_per_share'].values[-1]
+            last_date = stock_prices['date'].values[-1]
+        else:
+            # the last close (of all instruments, one api-call) and the r12 eps from the report store
+            valuation = self._get_valuation().table([ins_id]).loc[ins_id]
+            pe = valuation['pe']
+            last_date = valuation['date']
+            # using help-function to retrieve the name of the instrument
+            instrument_name = self._borsdata_api.get_instrument_name(ins_id)
+        if not np.isfinite(pe):
+            # no last close or no r12 eps (or an eps of zero)
+            print(f"BorsdataClient >> PE for {instrument_name} could not be found!")
+            return
         # printing the name and calculated PE-ratio with the corresponding date. (array slicing, [:10])
-        print(f"PE for {instrument_name} is {round(last_close/last_eps, 1)} with data from {str(last_date)[:10]}")
+        print(f"PE for {instrument_name} is {round(pe, 1)} with data from {str(last_date)[:10]}")
+
+    def valuation(self, market, country, sort_by='pe', number_of_stocks=10):
+        """
+        prints and returns the valuation ratios (pe, ps, pb, ev_ebit, ev_s) of all instruments in market and country
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param sort_by: ratio to sort by (ascending), only positive ratios are printed
+        :param number_of_stocks: number of instruments to print
+        :return: pd.DataFrame of the valuation ratios with the instrument names
+        """
+        names = self._names(market, country)
+        valuation = self._get_valuation().table(names.keys())
+        valuation.insert(0, 'name', valuation.index.map(names))
+        _print_frame(valuation[valuation[sort_by] > 0].sort_values(sort_by).head(number_of_stocks).round(2))
+        return valuation
+
+    def price_panel(self, market, country, fields=('close',)):
+        """
+        stock prices for all instruments in market and country as aligned date x ins_id matrices
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param fields: fields to keep, e.g. ('open', 'high', 'low', 'close', 'volume')
+        :return: PricePanel
+        """
+        filtered_instruments = self.instruments_in(market, country)
+        return self._borsdata_api.get_price_panel(filtered_instruments['ins_id'].astype(int), fields)
+
+    def stream_stock_prices(self, market, country, adjusted=False, max_in_flight=None):
+        """
+        stock prices of all instruments in market and country, one instrument at a time as they arrive,
+        e.g. for streaming.fold. at most max_in_flight frames are fetched ahead of the consumer.
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param adjusted: adjust the prices and volumes for stock splits
+        :param max_in_flight: max number of pending api-calls (see BorsdataRawAPI.fetch_many)
+        :return: generator of (ins_id, pd.DataFrame(), error)
+        """
+        names = self._names(market, country)
+        return self._borsdata_api.get_instruments_stock_prices_many(names.keys(), adjusted=adjusted,
+                                                                    max_in_flight=max_in_flight)
 
     def breadth_large_cap_sweden(self):
         """
         plots the breadth (number of stocks above moving-average 40) for Large Cap Sweden compared
         to Large Cap Sweden Index
         """
-        # creating api-object
-        # using defined function above to retrieve data frame of all instruments
-        instruments = self.instruments_with_meta_data()
-        # filtering out the instruments with correct market and country
-        filtered_instruments = instruments.loc[(instruments['market'] == "Large Cap") & (instruments['country'] == "Sverige")]
-        # creating empty array (to hold data frames)
-        frames = []
-        # looping through all rows in filtered data frame
-        for index, instrument in filtered_instruments.iterrows():
-            # fetching the stock prices for the current instrument
-            instrument_stock_prices = self._borsdata_api.get_instrument_stock_prices(int(instrument['ins_id']))
-            # using numpy's where function to create a 1 if close > ma40, else a 0
-            instrument_stock_prices[f'above_ma40'] = np.where(instrument_stock_prices['close'] > instrument_stock_prices['close'].rolling(window=40).mean(), 1, 0)
-            instrument_stock_prices['name'] = instrument['name']
-            # check to see if response holds any data.
-            if len(instrument_stock_prices) > 0:
-                # appending data frame to array
-                frames.append(instrument_stock_prices.copy())
-        # creating concatenated data frame with concat
-        symbols_df = pd.concat(frames)
-        symbols_df = symbols_df.groupby('date').sum()
-        # fetching OMXSLCPI data from api
-        omx = self._borsdata_api.get_instrument_stock_prices(643)
+        # close prices of all Large Cap Sweden instruments as one date x instrument table
+        # OMXSLCPI data from the warehouse (see fill_warehouse) or the api
+        omx = self._warehouse.prices([643]).set_index('date') if self._warehouse is not None else None
+        if omx is None or len(omx) == 0:
+            omx = self._borsdata_api.get_instrument_stock_prices(643)
+        if self._warehouse is None and self._compute_pool is None:
+            # streaming the instruments from the api into a running count per date of the index,
+            # one instrument is held in memory at a time
+            from borsdata.streaming import fold, BreadthCount
+            breadth = BreadthCount(40, calendar=omx.index)
+            fold(self.stream_stock_prices("Large Cap", "Sverige"), [breadth])
+            symbols_df = pd.DataFrame({'above_ma40': breadth.result()})
+        else:
+            if self._warehouse is not None:
+                close = self._warehouse.price_frame('close', market="Large Cap", country="Sverige")
+            else:
+                close = self.price_panel("Large Cap", "Sverige").frame('close')
+            from borsdata import indicators as indicators
+            # comparing every close to its ma40 in one operation over the whole table and counting
+            # the stocks above ma40 per date, the instruments are sharded across processes if there is a pool
+            if self._compute_pool is not None:
+                above_ma40 = self._compute_pool.map_columns(indicators.breadth, close, 40, merge=sum)
+            else:
+                above_ma40 = indicators.breadth(close.values, 40)
+            symbols_df = pd.DataFrame({'above_ma40': above_ma40}, index=close.index)
         # aligning data frames
         omx = omx[omx.index > '2015-01-01']
         symbols_df = symbols_df[symbols_df.index > '2015-01-01']
         # creating subplot
+        import matplotlib.pyplot as plt
         fig, (ax1, ax2) = plt.subplots(2, sharex=True)
         # plotting
         ax1.plot(omx['close'], label="OMXSLCPI")
@@ -236,6 +405,8 @@ if __name__ == "__main__":
     borsdata_client.instruments_with_meta_data()
     borsdata_client.plot_stock_prices(3)  # ABB
     borsdata_client.history_kpi(2, 'Large Cap', 'Sverige')  # 2 == Price/Earnings (PE)
+    borsdata_client.kpi_screen({'pe': (2, 'last', 'latest'), 'roe': (33, 'last', 'latest')}, 'Large Cap', 'Sverige',
+                               'pe > 0', {'pe': -1, 'roe': 1})  # 2 == PE, 33 == ROE
     borsdata_client.top_performers('Large Cap', 'Sverige', 10, 5)  # showing top10 performers based on 5 day return (1 week) for Large Cap Sverige.
 
 
@@ -0,0 +1,513 @@
+import requests
+from requests.adapters import HTTPAdapter
+import time
+import json
+import email.utils
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from borsdata import constants as constants
+from borsdata.api_utils import date_param
+from borsdata.rate_limiter import TokenBucketRateLimiter
+from borsdata.response_cache import ResponseCache, CacheEntry
+from borsdata.single_flight import SingleFlight
+
+
+class BorsdataRawAPI:
+    """
+    the api-calls of BorsdataAPI (rate limiting, retries, caching, metrics) returning the json-responses as received.
+    does not import pandas/numpy, e.g. for short-lived scripts that only need raw data.
+    """
+    # status codes that are worth retrying (rate limited or temporary server errors)
+    _retry_status_codes = (429, 500, 502, 503, 504)
+
+    def __init__(self, _api_key, verbose=False, pool_size=10, max_retries=5, backoff_factor=0.5, max_backoff=30,
+                 rate_limiter=None, url_root='https://apiservice.borsdata.se/v1/', cache=None, metrics=None,
+                 timeout=30):
+        """
+        :param _api_key: Börsdata API key
+        :param verbose: trace api-calls in terminal
+        :param rate_limiter: rate limiter shared by all api-calls, e.g. a FileRateLimiter to share
+                             the quota between processes (default TokenBucketRateLimiter())
+        :param url_root: root url of the api, e.g. a local stub server for testing
+        :param pool_size: number of keep-alive connections kept in the session pool
+        :param max_retries: number of retries on 429/5xx responses and connection errors
+        :param backoff_factor: base delay in seconds for exponential backoff between retries
+        :param max_backoff: upper limit in seconds for a single backoff delay
+        :param cache: ResponseCache for the responses, None disables caching
+        :param metrics: Metrics collecting counters and stage latencies per endpoint, None disables metrics
+        :param timeout: seconds to wait for the connection and for each read of a response (or a tuple
+                        (connect, read)), a timed out api-call is retried like a connection error
+        """
+        self._api_key = _api_key
+        # default query parameters of every api-call, never changed after __init__ (shared by all threads)
+        self._params = {'authKey': self._api_key, 'maxYearCount': 20, 'maxR12QCount': 40, 'maxCount': 20, 'version': 1}
+        self._url_root = url_root
+        self._rate_limiter = rate_limiter if rate_limiter is not None else TokenBucketRateLimiter()
+        self._cache = cache
+        self._metrics = metrics
+        # concurrent identical api-calls share one request
+        self._content_flights = SingleFlight(copy_function=None)
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._max_backoff = max_backoff
+        self._timeout = timeout
+        # kpisCalcUpdated seen by the last refresh_cache
+        self._kpis_updated = None
+        # http-requests sent, see request_count
+        self._request_count = 0
+        self._request_count_lock = threading.Lock()
+        # persistent session, re-uses tcp/tls-connections between api-calls (keep-alive)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        # responses are transparently decompressed by requests
+        self._session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Accept': 'application/json'})
+        # used for tracing (api-calls in terminal)
+        self._verbose = verbose
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        closes the underlying http-session and its pooled connections
+        """
+        self._session.close()
+
+    def _debug_trace(self, string):
+        if self._verbose:
+            print(string)
+
+    def _observe(self, stage, url, function, *args):
+        """
+        calls function(*args) and records its duration as stage of the api-call to url, if metrics are enabled
+        :param stage: 'rate_limit', 'network', 'decode' or 'process'
+        :param url: url of the api-call
+        :return: return value of function
+        """
+        if self._metrics is None:
+            return function(*args)
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._metrics.observe(stage, url, time.perf_counter() - start)
+
+    def _count(self, name, url, value=1):
+        if self._metrics is not None:
+            self._metrics.increment(name, url, value)
+
+    def _backoff_delay(self, attempt, response=None):
+        """
+        delay before next retry, honours the Retry-After header if the server sent one
+        :param attempt: number of the failed attempt (0-based)
+        :param response: failed response (None on connection errors)
+        :return: delay in seconds
+        """
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after is not None:
+                try:
+                    return min(float(retry_after), self._max_backoff)
+                except ValueError:
+                    # Retry-After can also be a http-date, a malformed value falls back to exponential backoff
+                    try:
+                        retry_date = email.utils.parsedate_to_datetime(retry_after)
+                        return min(max(retry_date.timestamp() - time.time(), 0), self._max_backoff)
+                    except (TypeError, ValueError):
+                        pass
+        return min(self._backoff_factor * (2 ** attempt), self._max_backoff)
+
+    def _request(self, url, params, headers=None):
+        """
+        internal function for http-requests, retries with exponential backoff on 429/5xx
+        :param url: url to be added to _url_root
+        :param params: query parameters
+        :param headers: extra http-headers, e.g. for conditional requests
+        :return: requests.Response with status code 200 (or 304 for conditional requests)
+        """
+        attempt = 0
+        while True:
+            # wait for the rate limiter to prevent error 429.
+            self._observe('rate_limit', url, self._rate_limiter.acquire)
+            self._debug_trace("BorsdataRawAPI >> calling API: " + self._url_root + url)
+            self._count('requests', url)
+            with self._request_count_lock:
+                self._request_count += 1
+            try:
+                response = self._observe('network', url, self._get, url, params, headers)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self._max_retries:
+                    self._count('errors', url)
+                    raise
+                delay = self._backoff_delay(attempt)
+                self._debug_trace(f"BorsdataRawAPI >> connection error ({e}), retrying in {delay:.2f}s")
+            else:
+                # status_code == 200 SUCCESS!
+                self._count('bytes', url, len(response.content))
+                if response.status_code == 200 or (response.status_code == 304 and headers):
+                    return response
+                if response.status_code == 429:
+                    self._count('throttled', url)
+                if response.status_code not in self._retry_status_codes or attempt >= self._max_retries:
+                    self._count('errors', url)
+                    print(f"BorsdataRawAPI >> API-Error, status code: {response.status_code}")
+                    raise requests.HTTPError(f"BorsdataRawAPI >> API-Error, status code: {response.status_code}",
+                                             response=response)
+                delay = self._backoff_delay(attempt, response)
+                self._debug_trace(f"BorsdataRawAPI >> status code: {response.status_code}, retrying in {delay:.2f}s")
+            self._count('retries', url)
+            time.sleep(delay)
+            attempt += 1
+
+    def _get(self, url, params, headers):
+        return self._session.get(self._url_root + url, params=params, headers=headers, timeout=self._timeout)
+
+    def _get_content(self, url, params=None):
+        """
+        internal function returning the raw response body, served from the cache if possible.
+        identical calls in flight at the same time share one request.
+        :param url: url to be added to _url_root
+        :param params: query parameters of this call, e.g. {'from': '2020-01-01', 'maxCount': 10},
+                       override the defaults, None-values are not sent
+        :return: response body (bytes)
+        """
+        params = dict(self._params, **{key: value for key, value in (params or {}).items() if value is not None})
+        return self._content_flights.do(ResponseCache.key(url, params), self._fetch_content, url, params)
+
+    def _fetch_content(self, url, params):
+        if self._cache is None or self._cache.ttl(url) is None:
+            return self._request(url, params).content
+        key = ResponseCache.key(url, params)
+        entry = self._cache.get(key)
+        if entry is not None and self._cache.is_fresh(entry):
+            self._debug_trace("BorsdataRawAPI >> cache hit: " + url)
+            self._count('cache_hits', url)
+            return entry.content
+        # revalidating a stale entry with a conditional request
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        response = self._request(url, params, headers)
+        if response.status_code == 304:
+            self._count('cache_revalidated', url)
+            self._cache.touch(key, entry)
+            return entry.content
+        self._count('cache_misses', url)
+        self._cache.set(key, CacheEntry(url, response.content, response.headers.get('ETag'),
+                                        response.headers.get('Last-Modified')))
+        return response.content
+
+    def _call_api(self, url, params=None):
+        """
+        internal function for api-calls
+        :param url: url to be added to _url_root
+        :param params: query parameters of this call (see _get_content)
+        :return: json-encoded content if any
+        """
+        content = self._get_content(url, params)
+        return self._observe('decode', url, json.loads, content)
+
+    def refresh_cache(self):
+        """
+        invalidation hook for the response cache, removes cached data (incl. the instrument and split lists)
+        of instruments that have been updated (instruments/updated) and kpi-data if the kpis have been re-calculated (kpis/updated)
+        since the last refresh. costs two api-calls.
+        :return: list of updated instrument ids
+        """
+        if self._cache is None:
+            return []
+        instruments = self._call_api('instruments/updated')['instruments']
+        kpis_updated = self._call_api('instruments/kpis/updated')['kpisCalcUpdated']
+        return self._invalidate_updated(instruments, kpis_updated)
+
+    def _invalidate_updated(self, instruments, kpis_updated):
+        """
+        invalidates the cached responses changed since the last refresh, shared with AsyncBorsdataAPI
+        :param instruments: list of {'insId', 'updatedAt'} from instruments/updated
+        :param kpis_updated: kpisCalcUpdated from kpis/updated
+        :return: list of updated instrument ids
+        """
+        last_update = self._cache.get_marker('instruments_updated')
+        updated = [instrument['insId'] for instrument in instruments
+                   if last_update is None or instrument['updatedAt'] > last_update]
+        if updated:
+            self._cache.invalidate('instruments?')
+            self._cache.invalidate('instruments/stocksplits?')
+            for ins_id in updated if last_update is not None else []:
+                self._cache.invalidate(f'instruments/{ins_id}/')
+            self._cache.set_marker('instruments_updated', max(instrument['updatedAt'] for instrument in instruments))
+        if kpis_updated != self._cache.get_marker('kpis_updated'):
+            self._cache.invalidate('instruments/kpis/')
+            self._cache.set_marker('kpis_updated', kpis_updated)
+        self._kpis_updated = kpis_updated
+        return updated
+
+    @property
+    def kpis_updated(self):
+        """
+        the kpi calculation time (kpisCalcUpdated) seen by the last refresh_cache, None before the first one,
+        e.g. to drop kpi values decoded from the cache before a re-calculation (see BorsdataClient.refresh_cache)
+        """
+        return self._kpis_updated
+
+    @property
+    def request_count(self):
+        """
+        number of http-requests sent (incl. retries and conditional requests, excl. responses served
+        from the cache), e.g. to keep a budget of api-calls (see SyncScheduler.run_once)
+        """
+        return self._request_count
+
+    def invalidate_cache(self, prefix=''):
+        """
+        removes cached responses whose key starts with prefix, see ResponseCache.invalidate (no-op without a cache)
+        :param prefix: key prefix, e.g. 'instruments/kpis/2/last/latest?'
+        """
+        if self._cache is not None:
+            self._cache.invalidate(prefix)
+
+    """
+    Instrument Meta
+    """
+    def get_branches_json(self):
+        """
+        :return: json object with 'branches'
+        """
+        return self._call_api('branches')
+
+    def get_countries_json(self):
+        """
+        :return: json object with 'countries'
+        """
+        return self._call_api('countries')
+
+    def get_markets_json(self):
+        """
+        :return: json object with 'markets'
+        """
+        return self._call_api('markets')
+
+    def get_sectors_json(self):
+        """
+        :return: json object with 'sectors'
+        """
+        return self._call_api('sectors')
+
+    def get_translation_meta_data_json(self):
+        """
+        :return: json object with 'translationMetadatas'
+        """
+        return self._call_api('translationmetadata')
+
+    """
+    Instruments
+    """
+    def get_instruments_json(self):
+        """
+        :return: json object with 'instruments'
+        """
+        return self._call_api('instruments')
+
+    def get_instruments_updated_json(self):
+        """
+        :return: json object with 'instruments' [{'insId', 'updatedAt'}]
+        """
+        return self._call_api('instruments/updated')
+
+    """
+    KPIs
+    """
+    def get_kpi_history_json(self, ins_id, kpi_id, report_type, price_type, max_count=None):
+        """
+        :param ins_id: instrument id
+        :param kpi_id: kpi id
+        :param report_type: ['quarter', 'year', 'r12']
+        :param price_type: ['mean', 'high', 'low']
+        :param max_count: max number of periods (default 20)
+        :return: json object with 'values' [{'y': year, 'p': period, 'v': value}]
+        """
+        url = f"instruments/{ins_id}/kpis/{kpi_id}/{report_type}/{price_type}/history"
+        return self._call_api(url, {'maxCount': max_count})
+
+    def get_kpi_summary(self, ins_id, report_type):
+        """
+        returns kpi summary for instrument
+        :param ins_id: instrument id
+        :param report_type: report type ['quarter', 'year', 'r12']
+        :return: json object
+        """
+        url = f"instruments/{ins_id}/kpis/{report_type}/summary"
+        json_data = self._call_api(url)
+        return json_data
+
+    def get_kpi_data_instrument(self, ins_id, kpi_id, calc_group, calc):
+        """
+        get screener data, for more information: https://github.com/Borsdata-Sweden/API/wiki/KPI-Screener
+        :param ins_id: instrument id
+        :param kpi_id: kpi id
+        :param calc_group: ['1year', '3year', '5year', '7year', '10year', '15year']
+        :param calc: ['high', 'latest', 'mean', 'low', 'sum', 'cagr']
+        :return: json object
+        """
+        url = f"instruments/{ins_id}/kpis/{kpi_id}/{calc_group}/{calc}"
+        json_data = self._call_api(url)
+        print(json_data)
+        return json_data
+
+    def get_kpi_data_all_instruments(self, kpi_id, calc_group, calc):
+        """
+        get kpi data for all instruments
+        :param kpi_id: kpi id
+        :param calc_group: ['1year', '3year', '5year', '7year', '10year', '15year']
+        :param calc: ['high', 'latest', 'mean', 'low', 'sum', 'cagr']
+        :return: json object
+        """
+        url = f"instruments/kpis/{kpi_id}/{calc_group}/{calc}"
+        json_data = self._call_api(url)
+        return json_data
+
+    def get_updated_kpis(self):
+        """
+        get latest calculation time for kpis
+        :return: json object
+        """
+        url = f"instruments/kpis/updated"
+        json_data = self._call_api(url)
+        return json_data
+
+    def get_kpi_metadata(self):
+        """
+        get kpi metadata
+        :return: json object
+        """
+        url = f"instruments/kpis/metadata"
+        json_data = self._call_api(url)
+        return json_data
+
+    """
+    Reports
+    """
+    def get_instrument_report_json(self, ins_id, report_type, max_count=None):
+        """
+        :param ins_id: instrument id
+        :param report_type: ['quarter', 'year', 'r12']
+        :param max_count: max number of reports (default 20)
+        :return: json object with 'reports'
+        """
+        return self._call_api(f"instruments/{ins_id}/reports/{report_type}", {'maxCount': max_count})
+
+    def get_instrument_reports_json(self, ins_id, max_year_count=None, max_r12q_count=None):
+        """
+        get all report data as received, without creating data frames
+        :param ins_id: instrument id
+        :param max_year_count: max number of year reports (default 20)
+        :param max_r12q_count: max number of quarter and r12 reports (default 40)
+        :return: json object with 'reportsQuarter', 'reportsYear' and 'reportsR12'
+        """
+        url = f'instruments/{ins_id}/reports'
+        return self._call_api(url, {'maxYearCount': max_year_count, 'maxR12QCount': max_r12q_count})
+
+    def get_reports_metadata_json(self):
+        """
+        :return: json object with 'reportMetadatas'
+        """
+        return self._call_api('instruments/reports/metadata')
+
+    """
+    Stockprices
+    """
+    def get_instrument_stock_prices_json(self, ins_id, from_date=None, to_date=None, max_count=None):
+        """
+        :param ins_id: instrument id
+        :param from_date: first date, e.g. '2020-01-01' (default the full history)
+        :param to_date: last date (default the latest)
+        :param max_count: max number of days
+        :return: json object with 'stockPricesList' [{'d', 'h', 'l', 'c', 'o', 'v'}]
+        """
+        url = f'instruments/{ins_id}/stockprices'
+        return self._call_api(url, self._date_range(from_date, to_date, max_count))
+
+    def get_instruments_stock_prices_last_json(self):
+        """
+        :return: json object with 'stockPricesList' [{'i', 'd', 'h', 'l', 'c', 'o', 'v'}]
+        """
+        return self._call_api('instruments/stockprices/last')
+
+    def get_stock_prices_date_json(self, date):
+        """
+        :param date: date in string format, e.g. '2000-01-01'
+        :return: json object with 'stockPricesList' [{'i', 'd', 'h', 'l', 'c', 'o', 'v'}]
+        """
+        return self._call_api('instruments/stockprices/date', {'date': date_param(date)})
+
+    @staticmethod
+    def _date_range(from_date=None, to_date=None, max_count=None):
+        # query parameters of the stock price endpoints
+        return {'from': date_param(from_date), 'to': date_param(to_date), 'maxCount': max_count}
+
+    """
+    Stocksplits
+    """
+    def get_stock_splits_json(self):
+        """
+        :return: json object with 'stockSplitList'
+        """
+        return self._call_api('instruments/stocksplits')
+
+    """
+    Bulk Functions
+    """
+    def fetch_many(self, function, ins_ids, max_workers=8, max_in_flight=None):
+        """
+        calls function(ins_id) for every ins_id in a thread pool, the calls share the rate limiter.
+        results are yielded as they complete, a failing instrument does not abort the others.
+        at most max_in_flight calls are pending (running or queued) besides the finished ones being yielded,
+        i.e. a slow consumer holds a bounded number of results in memory and ins_ids can be a (lazy) generator.
+        :param function: function taking an ins_id, e.g. self.get_instrument_stock_prices
+        :param ins_ids: iterable of instrument ids
+        :param max_workers: number of concurrent api-calls
+        :param max_in_flight: max number of pending calls (default 2 * max_workers)
+        :return: generator of (ins_id, result, error), error is None on success and result is None on error
+        """
+        max_in_flight = max_in_flight if max_in_flight is not None else 2 * max_workers
+        ins_ids = iter(ins_ids)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = {}
+
+        def submit(count):
+            for ins_id in itertools.islice(ins_ids, count):
+                pending[executor.submit(function, ins_id)] = ins_id
+        try:
+            submit(max_in_flight)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [(future, pending.pop(future)) for future in done]
+                # the finished calls are replaced before they are yielded, so the workers keep busy
+                submit(len(done))
+                for future, ins_id in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self._debug_trace(f"BorsdataRawAPI >> fetch_many Error for ins_id {ins_id}: {e}")
+                        yield ins_id, None, e
+                        continue
+                    yield ins_id, result, None
+        finally:
+            # the caller may stop iterating early, do not start any remaining calls
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    # Main, call functions here.
+    api = BorsdataRawAPI(constants.API_KEY)
+    print(api.get_instruments_json()['instruments'][:5])
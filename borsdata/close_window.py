@@ -0,0 +1,192 @@
+import os
+import datetime as dt
+import numpy as np
+import pandas as pd
+from borsdata import constants as constants
+
+
+def top_k(values, k):
+    """
+    positions of the k largest values without sorting all of them (argpartition), NaN is never ranked
+    :param values: 1d np.array
+    :param k: number of positions
+    :return: np.array of positions, largest value first
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+    k = min(k, len(valid))
+    if k == 0:
+        return np.array([], dtype=np.int64)
+    if k < len(valid):
+        valid = valid[np.argpartition(-values[valid], k - 1)[:k]]
+    # only the k selected values are sorted
+    return valid[np.argsort(-values[valid], kind='stable')]
+
+
+class CloseWindow:
+    """
+    rolling window of the recent closes of all instruments as a date x ins_id matrix, kept on disk.
+    a refresh costs one api-call for the latest bars (instruments/stockprices/last) plus one api-call
+    per missing trading day (instruments/stockprices/date), independent of the number of instruments.
+    the closes are stored as reported and split-adjusted when returns are computed,
+    so the window does not go stale when a split is announced.
+    """
+    def __init__(self, api, days=30, path=constants.CACHE_PATH + 'closes/'):
+        """
+        :param api: BorsdataAPI
+        :param days: number of trading days in the window
+        :param path: directory of the window file
+        """
+        self._api = api
+        self.days = days
+        self._path = path
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        self.dates = np.array([], dtype='datetime64[D]')
+        self.ins_ids = np.array([], dtype=np.int64)
+        self.close = np.empty((0, 0))
+        # business days without prices (holidays), they are not fetched again
+        self._closed_days = np.array([], dtype='datetime64[D]')
+        self._refreshed = None
+        self._load()
+
+    def _file(self):
+        return os.path.join(self._path, 'window.npz')
+
+    def _load(self):
+        if not os.path.exists(self._file()):
+            return
+        with np.load(self._file()) as arrays:
+            self.dates = arrays['dates']
+            self.ins_ids = arrays['ins_ids']
+            self.close = arrays['close']
+            self._closed_days = arrays['closed_days']
+            self._refreshed = arrays['refreshed'][0] if len(arrays['refreshed']) else None
+
+    def _save(self):
+        # writing to a temporary file first, so a crash never leaves a half written file
+        tmp_file = self._file() + '.tmp.npz'
+        refreshed = np.array([] if self._refreshed is None else [self._refreshed], dtype='datetime64[D]')
+        np.savez(tmp_file, dates=self.dates, ins_ids=self.ins_ids, close=self.close,
+                 closed_days=self._closed_days, refreshed=refreshed)
+        os.replace(tmp_file, self._file())
+
+    def refresh(self, today=None, days=None):
+        """
+        brings the window up to date, fetching only the trading days it does not hold
+        :param today: date to refresh up to (default today)
+        :param days: grow the window to at least this number of trading days
+        :return: number of api-calls made
+        """
+        today = np.datetime64(today if today is not None else dt.date.today(), 'D')
+        grow = days is not None and days > self.days
+        if grow:
+            self.days = days
+        if self._refreshed == today and not grow:
+            return 0
+        # the latest bar of every instrument in one call
+        last_prices = self._api.get_instruments_stock_prices_last()
+        calls = 1
+        frames = [last_prices]
+        if len(last_prices) > 0:
+            last_day = np.datetime64(pd.to_datetime(last_prices['date']).max(), 'D')
+        else:
+            last_day = np.busday_offset(today, 0, roll='backward')
+        fetched = np.array([last_day], dtype='datetime64[D]')
+        first_day = np.busday_offset(last_day, -(self.days - 1), roll='backward')
+        # holidays inside the window are not trading days, the window reaches further back until it is full
+        for _ in range(10):
+            days_in_window = np.arange(first_day, last_day, dtype='datetime64[D]')
+            days_in_window = days_in_window[np.is_busday(days_in_window)]
+            known = np.concatenate([self.dates, self._closed_days, fetched])
+            for day in days_in_window[~np.isin(days_in_window, known)]:
+                stock_prices = self._api.get_stock_prices_date(str(day))
+                calls += 1
+                fetched = np.append(fetched, day)
+                if len(stock_prices) == 0:
+                    self._closed_days = np.append(self._closed_days, day)
+                else:
+                    frames.append(stock_prices)
+            trading_days = np.union1d(self.dates[self.dates >= first_day],
+                                      fetched[~np.isin(fetched, self._closed_days)])
+            missing = self.days - len(trading_days)
+            if missing <= 0:
+                break
+            first_day = np.busday_offset(first_day, -missing, roll='backward')
+        self._merge(frames, first_day)
+        self._refreshed = today
+        self._save()
+        return calls
+
+    def _merge(self, frames, first_day):
+        frames = [frame for frame in frames if len(frame) > 0]
+        if not frames:
+            return
+        rows = pd.concat(frames, ignore_index=True)
+        # the latest bar of an instrument that has not traded for a long time is outside the window
+        rows = rows[rows['date'].values.astype('datetime64[D]') >= first_day]
+        dates = rows['date'].values.astype('datetime64[D]')
+        ins_ids = rows['ins_id'].values.astype(np.int64)
+        all_dates = np.union1d(self.dates, dates)
+        if len(all_dates) == 0:
+            # nothing fetched inside the window and no window yet
+            return
+        all_ins_ids = np.union1d(self.ins_ids, ins_ids)
+        close = np.full((len(all_dates), len(all_ins_ids)), np.nan)
+        close[np.ix_(np.searchsorted(all_dates, self.dates), np.searchsorted(all_ins_ids, self.ins_ids))] = self.close
+        close[np.searchsorted(all_dates, dates), np.searchsorted(all_ins_ids, ins_ids)] = rows['close'].values
+        # keeping the last self.days trading days
+        self.dates = all_dates[-self.days:]
+        self.ins_ids = all_ins_ids
+        self.close = close[-self.days:]
+        self._closed_days = self._closed_days[self._closed_days >= self.dates[0]]
+
+    def _columns(self, ins_ids):
+        if ins_ids is None:
+            return np.arange(len(self.ins_ids))
+        ins_ids = np.asarray(list(ins_ids), dtype=np.int64)
+        return np.searchsorted(self.ins_ids, ins_ids[np.isin(ins_ids, self.ins_ids)])
+
+    def returns(self, periods, ins_ids=None, adjusted=True):
+        """
+        returns over the last periods trading days, from the close periods days before the last date to the
+        last close of every instrument (days without a bar keep the previous close)
+        :param periods: number of trading days, has to be less than the number of days in the window
+        :param ins_ids: instrument ids to compute returns for (default all in the window)
+        :param adjusted: adjust the closes for stock splits, see BorsdataAPI.get_split_index
+        :return: pd.Series of returns (0.05 is 5%) indexed by ins_id, NaN if an instrument has no close to compare
+        """
+        columns = self._columns(ins_ids)
+        if periods >= len(self.dates):
+            print(f"CloseWindow >> {len(self.dates)} days in the window, too few for {periods} day returns")
+            return pd.Series(np.nan, index=pd.Index(self.ins_ids[columns], name='ins_id'), dtype=np.float64)
+        close = self.close[:, columns]
+        # forward filling the closes down every column, the row-position of the last bar of each cell
+        positions = np.where(np.isnan(close), 0, np.arange(len(close))[:, None])
+        np.maximum.accumulate(positions, axis=0, out=positions)
+        filled = close[positions, np.arange(close.shape[1])]
+        last = filled[-1]
+        first = filled[-1 - periods]
+        if adjusted:
+            split_index = self._api.get_split_index()
+            dates = self.dates[[-1 - periods, -1]]
+            for column in np.flatnonzero(np.isin(self.ins_ids[columns], split_index.ins_ids)):
+                first_factor, last_factor = split_index.factors(self.ins_ids[columns][column], dates)
+                first[column] *= first_factor
+                last[column] *= last_factor
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = last / first - 1
+        returns[~np.isfinite(returns)] = np.nan
+        return pd.Series(returns, index=pd.Index(self.ins_ids[columns], name='ins_id'))
+
+    def top(self, periods, k, ins_ids=None, adjusted=True):
+        """
+        the k instruments with the highest returns over the last periods trading days
+        :param periods: number of trading days
+        :param k: number of instruments
+        :param ins_ids: instrument ids to rank (default all in the window)
+        :param adjusted: adjust the closes for stock splits
+        :return: pd.Series of returns indexed by ins_id, highest first
+        """
+        returns = self.returns(periods, ins_ids, adjusted)
+        return returns.iloc[top_k(returns.values, k)]
@@ -0,0 +1,128 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+
+def concatenate_columns(results):
+    """
+    default merge of ComputePool.map_columns, the shard results side by side (last axis)
+    :param results: list of np.arrays in shard order
+    :return: np.array
+    """
+    return np.concatenate(results, axis=-1)
+
+
+def _attach(source):
+    # the matrix of a shard task, from a shared memory block or a .npy-file, without copying it
+    kind, location, shape, dtype = source
+    if kind == 'memmap':
+        return None, np.load(location, mmap_mode='r')
+    block = shared_memory.SharedMemory(name=location)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _run_shard(function, source, start, stop, args):
+    block, matrix = _attach(source)
+    try:
+        # the result is copied out of the shared memory before it is closed
+        return np.array(function(matrix[:, start:stop], *args))
+    finally:
+        del matrix
+        if block is not None:
+            block.close()
+
+
+class ComputePool:
+    """
+    process pool for per-instrument analytics on date x ins_id matrices (e.g. PricePanel or Warehouse.price_frame),
+    the instruments (columns) are split into one shard per worker. the matrix is not pickled: memory-mapped
+    .npy-files (PricePanel with a path) are opened by the workers, other matrices are copied once into
+    shared memory. the shard results are merged in shard order, i.e. the result does not depend on
+    which worker finishes first.
+
+        with ComputePool() as pool:
+            counts = pool.map_columns(indicators.breadth, close, 40, merge=sum)
+
+    functions have to be defined at module level (picklable) and take the shard (dates x shard instruments)
+    followed by args.
+    """
+    def __init__(self, max_workers=None, min_columns=16):
+        """
+        :param max_workers: number of processes (default number of cpus)
+        :param min_columns: min number of columns per shard, smaller matrices are computed in this process
+        """
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count() or 1
+        self._min_columns = min_columns
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def executor(self):
+        """
+        the ProcessPoolExecutor of the pool (started on first use)
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self):
+        """
+        shuts the worker processes down
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def shards(self, columns):
+        """
+        :param columns: number of columns (instruments)
+        :return: list of (start, stop) column ranges, one per worker
+        """
+        count = max(min(self.max_workers, columns // max(self._min_columns, 1)), 1)
+        bounds = np.linspace(0, columns, count + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    @staticmethod
+    def _is_npy_file(matrix):
+        # a memory-mapped .npy-file as a whole (not a slice of it), the workers can open it by its path
+        if not isinstance(matrix, np.memmap) or matrix.filename is None or not str(matrix.filename).endswith('.npy'):
+            return False
+        whole = np.load(matrix.filename, mmap_mode='r')
+        return whole.shape == matrix.shape and whole.dtype == matrix.dtype
+
+    def map_columns(self, function, matrix, *args, merge=concatenate_columns):
+        """
+        computes function(shard, *args) for column shards of matrix in the worker processes
+        :param function: module-level function taking a 2d np.array (dates x instruments) and args
+        :param matrix: 2d np.array, np.memmap or pd.DataFrame (dates x instruments)
+        :param args: further arguments of function
+        :param merge: function merging the list of shard results (in shard order), e.g. sum for counts
+        :return: merge(results)
+        """
+        matrix = getattr(matrix, 'values', matrix)
+        shards = self.shards(matrix.shape[1])
+        if len(shards) == 1:
+            return merge([np.array(function(matrix, *args))])
+        block = None
+        if self._is_npy_file(matrix):
+            source = ('memmap', matrix.filename, matrix.shape, matrix.dtype.str)
+        else:
+            # everything else is copied once into a shared memory block
+            matrix = np.ascontiguousarray(matrix)
+            block = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+            np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=block.buf)[:] = matrix
+            source = ('shm', block.name, matrix.shape, matrix.dtype.str)
+        try:
+            futures = [self.executor.submit(_run_shard, function, source, start, stop, args)
+                       for start, stop in shards]
+            return merge([future.result() for future in futures])
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
@@ -2,4 +2,5 @@
 User constants
 """
 API_KEY = 'xxxx'
-EXPORT_PATH = 'file_exports/'
\ No newline at end of file
+EXPORT_PATH = 'file_exports/'
+CACHE_PATH = 'cache/'
@@ -1,42 +1,201 @@
 from borsdata.borsdata_api import *
 import pandas as pd
 import os
+import json
+import importlib.util
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from borsdata import constants as constants
+from borsdata.response_cache import ResponseCache
+
+# supported export formats and their file extension
+FILE_FORMATS = {'xlsx': '.xlsx', 'csv': '', 'parquet': '', 'feather': ''}
+# packages of which one has to be installed to write the format
+FORMAT_ENGINES = {'parquet': ('pyarrow', 'fastparquet'), 'feather': ('pyarrow',)}
+
+
+def _write_files(export_file, sheets, file_format, engine=None):
+    """
+    writes the sheets (name: pd.DataFrame) of one instrument, runs in a writer thread or process
+    :param export_file: path of the xlsx-file, or directory for the one-file-per-sheet formats
+    :param sheets: dict of sheet name: pd.DataFrame
+    :param file_format: 'xlsx', 'csv', 'parquet' or 'feather'
+    :param engine: xlsx engine, e.g. 'xlsxwriter' or 'openpyxl'
+    :return: export_file
+    """
+    if file_format == 'xlsx':
+        with pd.ExcelWriter(export_file, engine=engine) as excel_writer:
+            for name, df in sheets.items():
+                df.to_excel(excel_writer, sheet_name=name)
+        return export_file
+    if not os.path.exists(export_file):
+        os.makedirs(export_file, exist_ok=True)
+    for name, df in sheets.items():
+        if file_format == 'csv':
+            df.to_csv(os.path.join(export_file, name + '.csv'))
+        elif file_format == 'parquet':
+            df.to_parquet(os.path.join(export_file, name + '.parquet'))
+        elif file_format == 'feather':
+            # feather does not store an index
+            df.reset_index().to_feather(os.path.join(export_file, name + '.feather'))
+    return export_file
 
 
 class ExcelExporter:
     """
     A small example class that uses the BorsdataAPI to fetch and concatenate
-    instrument data into excel-files.
+    instrument data into excel-files (or csv/parquet/feather-files).
+    Fetching and writing overlap, and a manifest in EXPORT_PATH records what has been exported,
+    so an interrupted (or next-day) run skips the instruments whose data has not changed.
     """
-    def __init__(self):
-        self._api = BorsdataAPI(constants.API_KEY)
+    def __init__(self, api=None):
+        """
+        :param api: BorsdataAPI to use, default one with API_KEY and a response cache in CACHE_PATH
+        """
+        if api is None:
+            api = BorsdataAPI(constants.API_KEY, cache=ResponseCache(constants.CACHE_PATH + 'responses.sqlite'))
+        self._api = api
         self._instruments = self._api.get_instruments()
         self._markets = self._api.get_markets()
         self._countries = self._api.get_countries()
 
-    def create_excel_files(self):
-        # looping through all instruments
-        for index, instrument in self._instruments.iterrows():
-            stock_prices = self._api.get_instrument_stock_prices(instrument['insId'])
-            reports_quarter, reports_year, reports_r12 = self._api.get_instrument_reports(instrument['insId'])
-            # map the instruments market/country id (integer) to its string representation in the market/country-table
-            market = self._markets.loc[self._markets['id'] == instrument['marketId']]['name'].values[0].lower().replace(' ', '_')
-            country = self._countries.loc[self._countries['id'] == instrument['countryId']]['name'].values[0].lower().replace(' ', '_')
-            export_path = constants.EXPORT_PATH + f"{dt.datetime.now().date()}/{country}/{market}/"
-            instrument_name = instrument['name'].lower().replace(' ', '_')
-            # creating necessary folders if they do not exist
-            if not os.path.exists(export_path):
-                os.makedirs(export_path)
-            # creating the writer with export location
-            excel_writer = pd.ExcelWriter(export_path + instrument_name + ".xlsx")
-            stock_prices.to_excel(excel_writer, 'stock_prices')
-            reports_quarter.to_excel(excel_writer, 'reports_quarter')
-            reports_year.to_excel(excel_writer, 'reports_year')
-            reports_r12.to_excel(excel_writer, 'reports_r12')
-            excel_writer.save()
-            print(f'Excel exported: {export_path + instrument_name + ".xlsx"}')
+    def _fetch_instrument(self, ins_id):
+        """
+        fetches stock prices and all reports for one instrument
+        :param ins_id: instrument id
+        :return: (stock_prices, reports_quarter, reports_year, reports_r12)
+        """
+        stock_prices = self._api.get_instrument_stock_prices(ins_id)
+        reports_quarter, reports_year, reports_r12 = self._api.get_instrument_reports(ins_id)
+        return stock_prices, reports_quarter, reports_year, reports_r12
+
+    @staticmethod
+    def _manifest_file():
+        return constants.EXPORT_PATH + 'manifest.json'
+
+    def _load_manifest(self):
+        if not os.path.exists(self._manifest_file()):
+            return {}
+        with open(self._manifest_file()) as file:
+            return json.load(file)
+
+    def _save_manifest(self, manifest):
+        if not os.path.exists(constants.EXPORT_PATH):
+            os.makedirs(constants.EXPORT_PATH, exist_ok=True)
+        tmp_file = self._manifest_file() + '.tmp'
+        with open(tmp_file, 'w') as file:
+            json.dump(manifest, file)
+        os.replace(tmp_file, self._manifest_file())
+
+    def _versions(self):
+        """
+        current data version of every instrument, i.e. its last stock price date and
+        the time its data (reports) was last updated. costs two api-calls.
+        :return: dict of ins_id (string): version (string)
+        """
+        last_prices = self._api.get_instruments_stock_prices_last()
+        price_dates = dict(zip(last_prices['ins_id'].astype(int), pd.to_datetime(last_prices['date']).dt.date.astype(str)))
+        updated = self._api.get_instruments_updated()
+        updated_at = dict(zip(updated['insId'].astype(int), updated['updatedAt'].astype(str)))
+        return {str(ins_id): f"{price_dates.get(ins_id)}|{updated_at.get(ins_id)}" for ins_id in self._instruments['insId']}
+
+    @staticmethod
+    def default_engine():
+        # xlsxwriter is considerably faster than openpyxl, it is used if it is installed
+        return 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') is not None else 'openpyxl'
+
+    def export(self, file_format='xlsx', max_workers=8, writer_workers=None, use_processes=False, engine=None,
+               force=False):
+        """
+        exports stock prices and reports of all instruments, one file (xlsx) or directory (csv, parquet, feather)
+        per instrument in EXPORT_PATH/country/market/
+        :param file_format: 'xlsx', 'csv', 'parquet' or 'feather' (parquet/feather require pyarrow)
+        :param max_workers: number of concurrent api-calls
+        :param writer_workers: number of concurrent file writers (default number of cpus)
+        :param use_processes: write in processes instead of threads, the data frames are pickled to the
+                              writer processes, i.e. only worth it for large xlsx-exports (cpu-bound)
+        :param engine: xlsx engine (default xlsxwriter if installed, otherwise openpyxl)
+        :param force: export all instruments, also the unchanged ones
+        :return: number of exported instruments
+        """
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"ExcelExporter >> unknown file format: {file_format}")
+        # checking the engine before anything is fetched
+        engines = FORMAT_ENGINES.get(file_format, ())
+        if engines and not any(importlib.util.find_spec(package) is not None for package in engines):
+            raise ImportError(f"ExcelExporter >> {file_format} requires {' or '.join(engines)}")
+        engine = engine if engine is not None else self.default_engine()
+        instruments = self._instruments.set_index('insId')
+        # id -> name lookups for the market/country-tables
+        markets = dict(zip(self._markets['id'], self._markets['name']))
+        countries = dict(zip(self._countries['id'], self._countries['name']))
+        manifest = self._load_manifest()
+        versions = self._versions()
+        # skipping the instruments that are already exported with the current data
+        ins_ids = [ins_id for ins_id in instruments.index
+                   if force or not self._is_exported(manifest.get(str(ins_id)), versions[str(ins_id)], file_format)]
+        print(f"ExcelExporter >> exporting {len(ins_ids)} of {len(instruments)} instruments")
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        writer_workers = writer_workers if writer_workers is not None else os.cpu_count() or 1
+        exported = 0
+        with executor_class(max_workers=writer_workers) as writer:
+            pending = {}
+            # fetching the instruments concurrently, the files are written as the data arrives
+            for ins_id, data, error in self._api.fetch_many(self._fetch_instrument, ins_ids, max_workers):
+                instrument = instruments.loc[ins_id]
+                if error is not None:
+                    print(f"ExcelExporter >> could not fetch data for {instrument['name']}: {error}")
+                    continue
+                stock_prices, reports_quarter, reports_year, reports_r12 = data
+                # map the instruments market/country id (integer) to its string representation
+                market = markets[instrument['marketId']].lower().replace(' ', '_')
+                country = countries[instrument['countryId']].lower().replace(' ', '_')
+                export_path = constants.EXPORT_PATH + f"{country}/{market}/"
+                instrument_name = instrument['name'].lower().replace(' ', '_').replace('/', '_')
+                # creating necessary folders if they do not exist
+                if not os.path.exists(export_path):
+                    os.makedirs(export_path, exist_ok=True)
+                sheets = {'stock_prices': stock_prices, 'reports_quarter': reports_quarter,
+                          'reports_year': reports_year, 'reports_r12': reports_r12}
+                export_file = export_path + instrument_name + FILE_FORMATS[file_format]
+                future = writer.submit(_write_files, export_file, sheets, file_format, engine)
+                pending[future] = ins_id
+                # limiting the number of fetched, not yet written instruments held in memory
+                if len(pending) >= 2 * writer_workers:
+                    exported += self._collect(wait(pending, return_when=FIRST_COMPLETED).done, pending, manifest,
+                                              versions, file_format)
+            exported += self._collect(wait(pending).done, pending, manifest, versions, file_format)
+        return exported
+
+    def _collect(self, done, pending, manifest, versions, file_format):
+        # recording finished writes in the manifest, so that an interrupted run can resume
+        exported = 0
+        for future in done:
+            ins_id = pending.pop(future)
+            try:
+                export_file = future.result()
+            except Exception as e:
+                print(f"ExcelExporter >> could not write ins_id {ins_id}: {e}")
+                continue
+            manifest[str(ins_id)] = {'file': export_file, 'format': file_format, 'version': versions[str(ins_id)],
+                                     'exported_at': str(dt.datetime.now())}
+            print(f'{file_format} exported: {export_file}')
+            exported += 1
+        if exported:
+            self._save_manifest(manifest)
+        return exported
+
+    @staticmethod
+    def _is_exported(entry, version, file_format):
+        return entry is not None and entry['version'] == version and entry['format'] == file_format \
+            and os.path.exists(entry['file'])
+
+    def create_excel_files(self, max_workers=8):
+        """
+        exports all (changed) instruments to one excel-file each
+        :param max_workers: number of concurrent api-calls
+        """
+        return self.export('xlsx', max_workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,342 @@
+"""
+vectorized technical indicators over the prices of one instrument (1d, e.g. the 'close'-column of
+get_instrument_stock_prices) or many instruments (2d, dates x instruments, e.g. PricePanel.frame('close')).
+all instruments, and all windows of a call, are computed in one numpy pass. the result has the type of
+the input (np.array, pd.Series or pd.DataFrame), a sequence of windows gives a dict of window: result.
+NaN (no bar) is handled as in pandas rolling: a window containing a NaN is NaN.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import as_strided
+
+
+def _as_2d(values):
+    """
+    :param values: np.array (1d or 2d), pd.Series or pd.DataFrame
+    :return: (2d float64 np.array of shape (dates, instruments), function restoring the type of values)
+    """
+    if isinstance(values, pd.DataFrame):
+        return values.values.astype(np.float64), \
+            lambda result: pd.DataFrame(result, index=values.index, columns=values.columns)
+    if isinstance(values, pd.Series):
+        return values.values.astype(np.float64)[:, None], \
+            lambda result: pd.Series(result[:, 0], index=values.index, name=values.name)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        return values[:, None], lambda result: result[:, 0]
+    return values, lambda result: result
+
+
+def _per_window(windows, function):
+    # one result for an int, a dict of window: result for a sequence of windows
+    if np.ndim(windows) == 0:
+        return function(int(windows))
+    return {int(window): function(int(window)) for window in windows}
+
+
+def _cumsum0(values):
+    # cumulative sum with a leading zero row, the sum of rows i..j-1 is cumsum[j] - cumsum[i]
+    cumsum = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumsum[1:])
+    return cumsum
+
+
+def _sliding_windows(values, window):
+    # read-only view of shape (dates - window + 1, window, instruments), no copy
+    dates, instruments = values.shape
+    return as_strided(values, shape=(dates - window + 1, window, instruments),
+                      strides=(values.strides[0], values.strides[0], values.strides[1]), writeable=False)
+
+
+def sma(values, window):
+    """
+    simple moving average
+    :param values: prices, 1d or 2d (dates x instruments)
+    :param window: window in days, or a sequence of windows
+    :return: moving average(s), NaN for the first window - 1 days
+    """
+    x, restore = _as_2d(values)
+    missing = np.isnan(x)
+    # one cumulative sum for all windows
+    sums = _cumsum0(np.where(missing, 0, x))
+    missing_counts = _cumsum0(missing)
+
+    def moving_average(window):
+        result = np.full(x.shape, np.nan)
+        if 0 < window <= len(x):
+            window_sums = (sums[window:] - sums[:-window]) / window
+            window_missing = missing_counts[window:] - missing_counts[:-window]
+            result[window - 1:] = np.where(window_missing > 0, np.nan, window_sums)
+        return restore(result)
+    return _per_window(window, moving_average)
+
+
+def _ewm(x, alphas, state=None):
+    """
+    exponentially weighted mean (adjust=False) for several alphas, NaN-values keep the previous mean
+    :param x: 2d np.array (dates x instruments)
+    :param alphas: 1d np.array of smoothing factors
+    :param state: means after the previous bar, shape (alphas, instruments), None starts at the first value
+    :return: (means of shape (alphas, dates, instruments), state after the last bar)
+    """
+    alphas = np.asarray(alphas, dtype=np.float64)[:, None]
+    state = np.full((len(alphas), x.shape[1]), np.nan) if state is None else state.copy()
+    result = np.full((len(alphas),) + x.shape, np.nan)
+    # the recursion runs over the dates, all instruments and alphas are vectorized
+    for row in range(len(x)):
+        value = x[row]
+        valid = ~np.isnan(value)
+        updated = np.where(np.isnan(state), value, state + alphas * (value - state))
+        state = np.where(valid, updated, state)
+        result[:, row] = np.where(valid, state, np.nan)
+    return result, state
+
+
+def ema(values, span):
+    """
+    exponential moving average, alpha = 2 / (span + 1) (as pandas ewm(span=span, adjust=False))
+    :param values: prices, 1d or 2d (dates x instruments)
+    :param span: span in days, or a sequence of spans
+    :return: exponential moving average(s)
+    """
+    x, restore = _as_2d(values)
+    spans = [int(span)] if np.ndim(span) == 0 else [int(s) for s in span]
+    means, _ = _ewm(x, [2 / (s + 1) for s in spans])
+    results = {s: restore(means[i]) for i, s in enumerate(spans)}
+    return results[spans[0]] if np.ndim(span) == 0 else results
+
+
+def _diff(x):
+    diff = np.full(x.shape, np.nan)
+    diff[1:] = x[1:] - x[:-1]
+    return diff
+
+
+def _rsi_from_means(gain, loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), 100 - 100 / (1 + gain / loss))
+
+
+def rsi(close, window=14):
+    """
+    relative strength index with Wilder's smoothing (ewm with alpha = 1 / window)
+    :param close: close prices, 1d or 2d (dates x instruments)
+    :param window: window in days, or a sequence of windows
+    :return: rsi (0-100)
+    """
+    x, restore = _as_2d(close)
+    windows = [int(window)] if np.ndim(window) == 0 else [int(w) for w in window]
+    change = _diff(x)
+    # gains and losses of all windows in one pass
+    means, _ = _ewm(np.concatenate([np.clip(change, 0, None), np.clip(-change, 0, None)], axis=1),
+                    [1 / w for w in windows])
+    instruments = x.shape[1]
+    results = {w: restore(_rsi_from_means(means[i][:, :instruments], means[i][:, instruments:]))
+               for i, w in enumerate(windows)}
+    return results[windows[0]] if np.ndim(window) == 0 else results
+
+
+def true_range(high, low, close):
+    """
+    :param high: high prices, 1d or 2d (dates x instruments)
+    :param low: low prices
+    :param close: close prices
+    :return: true range, max(high - low, |high - previous close|, |low - previous close|)
+    """
+    h, restore = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    previous_close = np.full(c.shape, np.nan)
+    previous_close[1:] = c[:-1]
+    ranges = np.stack([h - l, np.abs(h - previous_close), np.abs(l - previous_close)])
+    # the first day has no previous close
+    ranges[1:, 0] = 0
+    return restore(np.max(ranges, axis=0))
+
+
+def atr(high, low, close, window=14):
+    """
+    average true range with Wilder's smoothing (ewm with alpha = 1 / window)
+    :param high: high prices, 1d or 2d (dates x instruments)
+    :param low: low prices
+    :param close: close prices
+    :param window: window in days, or a sequence of windows
+    :return: average true range(s)
+    """
+    ranges, restore = _as_2d(true_range(high, low, close))
+    windows = [int(window)] if np.ndim(window) == 0 else [int(w) for w in window]
+    means, _ = _ewm(ranges, [1 / w for w in windows])
+    results = {w: restore(means[i]) for i, w in enumerate(windows)}
+    return results[windows[0]] if np.ndim(window) == 0 else results
+
+
+def rolling_max(values, window):
+    """
+    highest value over window days, e.g. the 52-week high of the high prices (window 250)
+    :param values: prices, 1d or 2d (dates x instruments)
+    :param window: window in days, or a sequence of windows
+    :return: rolling max(es), NaN for the first window - 1 days
+    """
+    x, restore = _as_2d(values)
+
+    def highest(window):
+        result = np.full(x.shape, np.nan)
+        if 0 < window <= len(x):
+            result[window - 1:] = np.max(_sliding_windows(x, window), axis=1)
+        return restore(result)
+    return _per_window(window, highest)
+
+
+def rolling_min(values, window):
+    """
+    lowest value over window days
+    :param values: prices, 1d or 2d (dates x instruments)
+    :param window: window in days, or a sequence of windows
+    :return: rolling min(s), NaN for the first window - 1 days
+    """
+    x, restore = _as_2d(values)
+
+    def lowest(window):
+        result = np.full(x.shape, np.nan)
+        if 0 < window <= len(x):
+            result[window - 1:] = np.min(_sliding_windows(x, window), axis=1)
+        return restore(result)
+    return _per_window(window, lowest)
+
+
+def returns(values, periods):
+    """
+    return over periods days, e.g. 0.05 for +5%
+    :param values: prices, 1d or 2d (dates x instruments)
+    :param periods: number of days, or a sequence of numbers of days
+    :return: return(s), NaN for the first periods days
+    """
+    x, restore = _as_2d(values)
+
+    def period_return(periods):
+        result = np.full(x.shape, np.nan)
+        if 0 < periods < len(x):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[periods:] = x[periods:] / x[:-periods] - 1
+        return restore(result)
+    return _per_window(periods, period_return)
+
+
+def breadth(close, window):
+    """
+    number of instruments closing above their simple moving average, per date. days an instrument has
+    no bar inside its history keep the previous close, so a shared calendar does not interrupt its average
+    :param close: closes, 2d (dates x instruments), e.g. PricePanel.frame('close')
+    :param window: window in days
+    :return: 1d np.array of counts per date
+    """
+    x, _ = _as_2d(close)
+    valid = ~np.isnan(x)
+    # forward filling every column, the row-position of the last bar of each cell
+    positions = np.where(valid, np.arange(len(x))[:, None], 0)
+    np.maximum.accumulate(positions, axis=0, out=positions)
+    filled = x[positions, np.arange(x.shape[1])]
+    # the previous close is not carried past the last bar of an instrument
+    last_rows = len(x) - 1 - np.argmax(valid[::-1], axis=0)
+    filled[np.arange(len(x))[:, None] > last_rows] = np.nan
+    with np.errstate(invalid='ignore'):
+        above = (filled > sma(filled, window)) & valid
+    return above.sum(axis=1)
+
+
+class IndicatorState:
+    """
+    incremental indicators: fit on the history once, then update with one new bar at a time
+    (e.g. the instruments' bars from get_instruments_stock_prices_last) without recomputing the history.
+
+        state = IndicatorState(sma_windows=(50, 200), rsi_windows=(14,))
+        state.fit(close)
+        latest = state.update(new_close)  # {'sma50': np.array, 'sma200': ..., 'rsi14': ...}
+    """
+    def __init__(self, sma_windows=(), ema_spans=(), rsi_windows=(), atr_windows=(), high_low_windows=(),
+                 return_periods=()):
+        """
+        :param sma_windows: windows of the simple moving averages
+        :param ema_spans: spans of the exponential moving averages
+        :param rsi_windows: windows of the rsi
+        :param atr_windows: windows of the average true range (requires high and low)
+        :param high_low_windows: windows of the rolling highs and lows (of the close)
+        :param return_periods: periods of the returns
+        """
+        self.sma_windows = tuple(sma_windows)
+        self.ema_spans = tuple(ema_spans)
+        self.rsi_windows = tuple(rsi_windows)
+        self.atr_windows = tuple(atr_windows)
+        self.high_low_windows = tuple(high_low_windows)
+        self.return_periods = tuple(return_periods)
+        # the last closes needed by the windowed indicators
+        self._history = max(self.sma_windows + self.high_low_windows + tuple(p + 1 for p in self.return_periods) +
+                            (2,))
+        self._closes = None
+        self._ema = None
+        self._rsi = None
+        self._atr = None
+
+    def fit(self, close, high=None, low=None):
+        """
+        initializes the state from the price history
+        :param close: close prices, 2d (dates x instruments) or 1d
+        :param high: high prices, required for atr
+        :param low: low prices, required for atr
+        :return: self
+        """
+        x, _ = _as_2d(close)
+        self._closes = x[-self._history:].copy()
+        if self.ema_spans:
+            _, self._ema = _ewm(x, [2 / (s + 1) for s in self.ema_spans])
+        if self.rsi_windows:
+            change = _diff(x)
+            _, self._rsi = _ewm(np.concatenate([np.clip(change, 0, None), np.clip(-change, 0, None)], axis=1),
+                                [1 / w for w in self.rsi_windows])
+        if self.atr_windows:
+            ranges, _ = _as_2d(true_range(high, low, close))
+            _, self._atr = _ewm(ranges, [1 / w for w in self.atr_windows])
+        return self
+
+    def update(self, close, high=None, low=None):
+        """
+        appends one bar and returns the indicators of that bar
+        :param close: close prices of the new bar, one per instrument (NaN if no bar)
+        :param high: high prices of the new bar, required for atr
+        :param low: low prices of the new bar, required for atr
+        :return: dict of indicator name (e.g. 'sma50', 'ema12', 'rsi14', 'atr14', 'high20', 'low20', 'return5'):
+                 np.array with one value per instrument
+        """
+        close = np.atleast_1d(np.asarray(close, dtype=np.float64))
+        previous_close = self._closes[-1]
+        self._closes = np.concatenate([self._closes, close[None, :]])[-self._history:]
+        latest = {}
+        for window in self.sma_windows:
+            latest[f'sma{window}'] = np.mean(self._closes[-window:], axis=0) if len(self._closes) >= window \
+                else np.full(close.shape, np.nan)
+        for window in self.high_low_windows:
+            enough = len(self._closes) >= window
+            latest[f'high{window}'] = np.max(self._closes[-window:], axis=0) if enough else np.full(close.shape, np.nan)
+            latest[f'low{window}'] = np.min(self._closes[-window:], axis=0) if enough else np.full(close.shape, np.nan)
+        for periods in self.return_periods:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                latest[f'return{periods}'] = close / self._closes[-periods - 1] - 1 \
+                    if len(self._closes) > periods else np.full(close.shape, np.nan)
+        if self.ema_spans:
+            means, self._ema = _ewm(close[None, :], [2 / (s + 1) for s in self.ema_spans], self._ema)
+            for i, span in enumerate(self.ema_spans):
+                latest[f'ema{span}'] = means[i, 0]
+        if self.rsi_windows:
+            change = close - previous_close
+            means, self._rsi = _ewm(np.concatenate([np.clip(change, 0, None), np.clip(-change, 0, None)])[None, :],
+                                    [1 / w for w in self.rsi_windows], self._rsi)
+            for i, window in enumerate(self.rsi_windows):
+                latest[f'rsi{window}'] = _rsi_from_means(means[i, 0, :len(close)], means[i, 0, len(close):])
+        if self.atr_windows:
+            high = np.atleast_1d(np.asarray(high, dtype=np.float64))
+            low = np.atleast_1d(np.asarray(low, dtype=np.float64))
+            ranges = np.max([high - low, np.abs(high - previous_close), np.abs(low - previous_close)], axis=0)
+            means, self._atr = _ewm(ranges[None, :], [1 / w for w in self.atr_windows], self._atr)
+            for i, window in enumerate(self.atr_windows):
+                latest[f'atr{window}'] = means[i, 0]
+        return latest
@@ -0,0 +1,126 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+def kpi_values(json_data):
+    """
+    decodes the response of instruments/kpis/{kpi_id}/{calc_group}/{calc}
+    :param json_data: json object with 'values' [{'i': ins_id, 'n': numeric value, 's': string value}]
+    :return: pd.Series of float64 values indexed by ins_id, missing values are NaN
+    """
+    values = json_data['values']
+    ins_ids = np.fromiter((value['i'] for value in values), dtype=np.int64, count=len(values))
+    # None (no value) becomes NaN
+    numbers = np.array([value['n'] for value in values], dtype=np.float64)
+    return pd.Series(numbers, index=pd.Index(ins_ids, name='ins_id'))
+
+
+class KpiScreener:
+    """
+    screens the whole universe with the bulk kpi-endpoint, one api-call per (kpi_id, calc_group, calc)
+    instead of one per instrument. the kpis are pivoted into an ins_id x kpi matrix that
+    filter- and rank-expressions are evaluated on.
+
+        screener = KpiScreener(api)
+        kpis = {'pe': (2, 'last', 'latest'), 'roe': (33, '1year', 'mean')}
+        screener.screen(kpis, where='pe > 0 and pe < 15 and roe > 10', rank={'pe': -1, 'roe': 1}, top=20)
+    """
+    def __init__(self, api, max_workers=8):
+        """
+        :param api: BorsdataAPI
+        :param max_workers: number of concurrent api-calls
+        """
+        self._api = api
+        self._max_workers = max_workers
+        # decoded kpi values per (kpi_id, calc_group, calc)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """
+        drops the decoded kpi values, e.g. after the kpis have been re-calculated (see BorsdataClient.refresh_cache)
+        """
+        with self._lock:
+            self._values.clear()
+
+    def refresh(self, specs):
+        """
+        re-fetches kpis, e.g. after the kpis have been re-calculated (see SyncScheduler)
+        :param specs: iterable of (kpi_id, calc_group, calc)
+        :return: list of the re-fetched specs
+        """
+        specs = list(dict.fromkeys(tuple(spec) for spec in specs))
+        for kpi_id, calc_group, calc in specs:
+            # the bulk kpi-data is kept in the response cache
+            self._api.invalidate_cache(f'instruments/kpis/{kpi_id}/{calc_group}/{calc}?')
+        refreshed = []
+        for spec, values, error in self._api.fetch_many(self._fetch, specs, self._max_workers):
+            if error is not None:
+                print(f"KpiScreener >> could not fetch kpi {spec}: {error}")
+                continue
+            refreshed.append(spec)
+        return refreshed
+
+    def _fetch(self, spec):
+        kpi_id, calc_group, calc = spec
+        values = kpi_values(self._api.get_kpi_data_all_instruments(kpi_id, calc_group, calc))
+        with self._lock:
+            self._values[spec] = values
+        return values
+
+    def matrix(self, kpis, ins_ids=None):
+        """
+        ins_id x kpi matrix, the kpis not fetched before are fetched concurrently
+        :param kpis: dict of column name: (kpi_id, calc_group, calc), e.g. {'pe': (2, 'last', 'latest')}
+        :param ins_ids: instrument ids to keep (rows), None keeps all instruments
+        :return: pd.DataFrame of float64 kpi values, NaN where an instrument has no value
+        """
+        specs = {name: tuple(spec) for name, spec in kpis.items()}
+        with self._lock:
+            missing = [spec for spec in set(specs.values()) if spec not in self._values]
+        for spec, values, error in self._api.fetch_many(self._fetch, missing, self._max_workers):
+            if error is not None:
+                raise error
+        with self._lock:
+            columns = {name: self._values[spec] for name, spec in specs.items()}
+        # aligning all kpis on the union of their ins_ids
+        matrix = pd.DataFrame(columns)
+        matrix.index.name = 'ins_id'
+        if ins_ids is not None:
+            matrix = matrix.reindex(pd.Index(ins_ids, name='ins_id'))
+        return matrix
+
+    @staticmethod
+    def score(matrix, rank):
+        """
+        multi-factor score, the weighted sum of the kpis' percentile ranks
+        :param matrix: ins_id x kpi matrix
+        :param rank: dict of column name: weight, a negative weight favours low values (e.g. {'pe': -1, 'roe': 1})
+        :return: pd.Series of scores (NaN if any ranked kpi is missing)
+        """
+        percentiles = matrix[list(rank)].rank(pct=True)
+        weights = np.array(list(rank.values()), dtype=np.float64)
+        # a low value ranked by a negative weight gives a high score
+        scores = np.where(weights > 0, percentiles.values, 1 - percentiles.values) * np.abs(weights)
+        return pd.Series(scores.sum(axis=1), index=matrix.index)
+
+    def screen(self, kpis, where=None, rank=None, top=None, ins_ids=None):
+        """
+        filters and ranks instruments on kpis
+        :param kpis: dict of column name: (kpi_id, calc_group, calc)
+        :param where: filter expression on the column names, e.g. 'pe > 0 and roe > 10' (see pd.DataFrame.query)
+        :param rank: dict of column name: weight for the multi-factor score, None keeps the order of ins_id
+        :param top: number of instruments to return, None returns all that pass the filter
+        :param ins_ids: instrument ids to screen, None screens all instruments
+        :return: pd.DataFrame of kpis (and 'score' if ranked) indexed by ins_id
+        """
+        matrix = self.matrix(kpis, ins_ids)
+        if where is not None:
+            matrix = matrix.query(where)
+        if rank is not None:
+            matrix = matrix.assign(score=self.score(matrix, rank))
+            matrix = matrix[matrix['score'].notna()].sort_values('score', ascending=False)
+        if top is not None:
+            matrix = matrix.head(top)
+        return matrix
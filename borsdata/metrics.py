@@ -0,0 +1,172 @@
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left
+
+# stages of an api-call that are timed
+STAGES = ('rate_limit', 'network', 'decode', 'process')
+# upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_ID_SEGMENT = re.compile(r'(?<=/)\d+(?=/|$)')
+
+
+class Histogram:
+    """
+    latency histogram with fixed bucket bounds (cumulative as in the prometheus text format)
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # the last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        counts = []
+        total = 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class Metrics:
+    """
+    per-endpoint counters and stage latency histograms of BorsdataAPI, e.g.
+
+        metrics = Metrics(sinks=[LoggingSink()])
+        api = BorsdataAPI(constants.API_KEY, metrics=metrics)
+        print(metrics.to_prometheus())
+
+    endpoints are the urls with the instrument/kpi ids replaced by {id}, e.g. 'instruments/{id}/stockprices'.
+    counters: requests, bytes, cache_hits, cache_revalidated, cache_misses, throttled (429), retries, errors.
+    sinks are callables receiving every event as sink(kind, name, endpoint, value),
+    kind is 'counter' or 'histogram'.
+    """
+    def __init__(self, sinks=None, buckets=DEFAULT_BUCKETS):
+        """
+        :param sinks: list of callables called with (kind, name, endpoint, value) for every event
+        :param buckets: upper bounds in seconds of the latency histogram buckets
+        """
+        self._sinks = list(sinks) if sinks is not None else []
+        self._buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self._sinks.append(sink)
+
+    def endpoint(self, url):
+        """
+        :param url: url (without root), e.g. 'instruments/3/stockprices'
+        :return: endpoint of url, e.g. 'instruments/{id}/stockprices'
+        """
+        endpoint = self._endpoints.get(url)
+        if endpoint is None:
+            endpoint = _ID_SEGMENT.sub('{id}', '/' + url.strip('/'))[1:]
+            self._endpoints[url] = endpoint
+        return endpoint
+
+    def increment(self, name, url, value=1):
+        """
+        :param name: counter name, e.g. 'requests'
+        :param url: url (without root) of the api-call
+        :param value: increment
+        """
+        endpoint = self.endpoint(url)
+        with self._lock:
+            key = (name, endpoint)
+            self._counters[key] = self._counters.get(key, 0) + value
+        for sink in self._sinks:
+            sink('counter', name, endpoint, value)
+
+    def observe(self, stage, url, seconds):
+        """
+        :param stage: one of STAGES
+        :param url: url (without root) of the api-call
+        :param seconds: duration of the stage
+        """
+        endpoint = self.endpoint(url)
+        with self._lock:
+            histogram = self._histograms.get((stage, endpoint))
+            if histogram is None:
+                histogram = self._histograms[(stage, endpoint)] = Histogram(self._buckets)
+            histogram.observe(seconds)
+        for sink in self._sinks:
+            sink('histogram', stage, endpoint, seconds)
+
+    def snapshot(self):
+        """
+        :return: dict with 'counters' {(name, endpoint): value} and
+                 'histograms' {(stage, endpoint): {'count', 'sum', 'buckets': {upper bound: cumulative count}}}
+        """
+        with self._lock:
+            histograms = {key: {'count': histogram.count, 'sum': histogram.sum,
+                                'buckets': dict(zip(self._buckets + (float('inf'),), histogram.cumulative_counts()))}
+                          for key, histogram in self._histograms.items()}
+            return {'counters': dict(self._counters), 'histograms': histograms}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self, prefix='borsdata'):
+        """
+        :param prefix: prefix of the metric names
+        :return: the metrics in the prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name in sorted(set(name for name, _ in snapshot['counters'])):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            for (counter, endpoint), value in sorted(snapshot['counters'].items()):
+                if counter == name:
+                    lines.append(f'{prefix}_{name}_total{{endpoint="{endpoint}"}} {value}')
+        if snapshot['histograms']:
+            lines.append(f'# TYPE {prefix}_stage_seconds histogram')
+        for (stage, endpoint), histogram in sorted(snapshot['histograms'].items()):
+            labels = f'stage="{stage}",endpoint="{endpoint}"'
+            for bound, count in histogram['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {histogram["sum"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='borsdata'):
+        """
+        writes the prometheus text to path (atomically), e.g. for the node exporter textfile collector
+        :param path: path of the .prom-file
+        :param prefix: prefix of the metric names
+        """
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as file:
+            file.write(self.to_prometheus(prefix))
+        os.replace(tmp_file, path)
+
+
+class LoggingSink:
+    """
+    metrics sink logging every event
+    """
+    def __init__(self, logger=None, level=logging.DEBUG):
+        """
+        :param logger: logging.Logger (default logger 'borsdata.metrics')
+        :param level: log level of the events
+        """
+        self._logger = logger if logger is not None else logging.getLogger('borsdata.metrics')
+        self._level = level
+
+    def __call__(self, kind, name, endpoint, value):
+        if self._logger.isEnabledFor(self._level):
+            self._logger.log(self._level, '%s %s %s %s', kind, name, endpoint, value)
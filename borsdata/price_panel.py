@@ -0,0 +1,164 @@
+import os
+import numpy as np
+import pandas as pd
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class PricePanel:
+    """
+    stock prices of many instruments as aligned date x ins_id float32 matrices, one per field.
+    the dates are the union of the instruments' trading days, missing bars are NaN.
+    the matrices can be memory-mapped .npy-files (see save/load).
+    """
+    def __init__(self, dates, ins_ids, data):
+        """
+        :param dates: np.array of datetime64[D], sorted
+        :param ins_ids: np.array of instrument ids (columns)
+        :param data: dict of field: 2d np.array with shape (len(dates), len(ins_ids))
+        """
+        self.dates = dates
+        self.ins_ids = ins_ids
+        self.data = data
+        self._columns = {ins_id: position for position, ins_id in enumerate(ins_ids)}
+
+    @property
+    def fields(self):
+        return list(self.data.keys())
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.ins_ids)
+
+    def __getitem__(self, field):
+        return self.data[field]
+
+    @classmethod
+    def from_arrays(cls, arrays, fields=FIELDS, path=None):
+        """
+        creates a panel from per-instrument arrays
+        :param arrays: iterable of (ins_id, dates, {field: np.array})
+        :param fields: fields to keep
+        :param path: directory for memory-mapped matrices, None keeps them in memory
+        :return: PricePanel
+        """
+        arrays = sorted(arrays, key=lambda item: item[0])
+        ins_ids = np.array([ins_id for ins_id, _, _ in arrays], dtype=np.int64)
+        # the shared trading calendar
+        if arrays:
+            dates = np.unique(np.concatenate([instrument_dates for _, instrument_dates, _ in arrays]))
+        else:
+            dates = np.array([], dtype='datetime64[D]')
+        shape = (len(dates), len(ins_ids))
+        if path is not None and not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        data = {}
+        for field in fields:
+            if path is None:
+                data[field] = np.full(shape, np.nan, dtype=np.float32)
+            else:
+                data[field] = np.lib.format.open_memmap(os.path.join(path, field + '.npy'), mode='w+',
+                                                        dtype=np.float32, shape=shape)
+                data[field][:] = np.nan
+        for column, (ins_id, instrument_dates, values) in enumerate(arrays):
+            # row-positions of the instrument's dates in the calendar
+            rows = np.searchsorted(dates, instrument_dates)
+            for field in fields:
+                data[field][rows, column] = values[field]
+        panel = cls(dates, ins_ids, data)
+        if path is not None:
+            panel._save_index(path)
+        return panel
+
+    @classmethod
+    def from_frames(cls, frames, fields=FIELDS, path=None):
+        """
+        creates a panel from stock price frames in the format of BorsdataAPI.get_instrument_stock_prices
+        :param frames: iterable of (ins_id, pd.DataFrame)
+        :param fields: fields to keep
+        :param path: directory for memory-mapped matrices, None keeps them in memory
+        :return: PricePanel
+        """
+        return cls.from_arrays(_frame_arrays(frames, fields), fields, path)
+
+    @classmethod
+    def from_store(cls, price_store, ins_ids, fields=FIELDS, path=None):
+        """
+        creates a panel from a PriceStore without any api-calls
+        :param price_store: PriceStore
+        :param ins_ids: iterable of instrument ids
+        :param fields: fields to keep
+        :param path: directory for memory-mapped matrices, None keeps them in memory
+        :return: PricePanel
+        """
+        arrays = []
+        for ins_id in ins_ids:
+            stored = price_store.load_arrays(ins_id)
+            if stored is not None:
+                arrays.append((int(ins_id), stored['date'], stored))
+        return cls.from_arrays(arrays, fields, path)
+
+    def _save_index(self, path):
+        np.save(os.path.join(path, 'dates.npy'), self.dates)
+        np.save(os.path.join(path, 'ins_ids.npy'), self.ins_ids)
+
+    def save(self, path):
+        """
+        saves the panel as .npy-files in path
+        :param path: directory
+        """
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        self._save_index(path)
+        for field, values in self.data.items():
+            np.save(os.path.join(path, field + '.npy'), values)
+
+    @classmethod
+    def load(cls, path, fields=FIELDS, mmap=True):
+        """
+        loads a saved panel
+        :param path: directory
+        :param fields: fields to load
+        :param mmap: memory-map the matrices instead of reading them
+        :return: PricePanel
+        """
+        mmap_mode = 'r' if mmap else None
+        dates = np.load(os.path.join(path, 'dates.npy'))
+        ins_ids = np.load(os.path.join(path, 'ins_ids.npy'))
+        data = {field: np.load(os.path.join(path, field + '.npy'), mmap_mode=mmap_mode) for field in fields
+                if os.path.exists(os.path.join(path, field + '.npy'))}
+        return cls(dates, ins_ids, data)
+
+    def column(self, ins_id):
+        """
+        :param ins_id: instrument id
+        :return: position of ins_id in the matrices
+        """
+        return self._columns[ins_id]
+
+    def frame(self, field):
+        """
+        :param field: e.g. 'close'
+        :return: pd.DataFrame with date-index and one column per ins_id
+        """
+        return pd.DataFrame(self.data[field], index=pd.DatetimeIndex(self.dates.astype('datetime64[ns]'), name='date'),
+                            columns=self.ins_ids, copy=False)
+
+    def instrument(self, ins_id):
+        """
+        :param ins_id: instrument id
+        :return: pd.DataFrame of the instruments' fields, without the dates it has no bar for
+        """
+        column = self.column(ins_id)
+        df = pd.DataFrame({field: values[:, column] for field, values in self.data.items()},
+                          index=pd.DatetimeIndex(self.dates.astype('datetime64[ns]'), name='date'))
+        return df.dropna(how='all')
+
+
+def _frame_arrays(frames, fields):
+    # keeping only the arrays of each frame, so the frames can be released while the panel is built
+    for ins_id, stock_prices in frames:
+        if len(stock_prices) == 0:
+            continue
+        values = {field: stock_prices[field].values.astype(np.float32) for field in fields}
+        yield int(ins_id), stock_prices.index.values.astype('datetime64[D]'), values
@@ -0,0 +1,230 @@
+import json
+import os
+import datetime as dt
+import numpy as np
+import pandas as pd
+from borsdata import constants as constants
+
+
+class PriceStore:
+    """
+    local stock price history, one directory per instrument holding one memory-mappable
+    numpy-file per column (date.npy, high.npy, ...). a refresh only fetches the bars newer than
+    the last stored date, using the all-instrument endpoints (one api-call per day for the whole universe),
+    instruments lagging more than a few days fetch only the missing date range.
+    instruments with a new stock split are re-pulled in full.
+    """
+    _columns = ['high', 'low', 'close', 'open', 'volume']
+    _dtypes = {'high': np.float64, 'low': np.float64, 'close': np.float64, 'open': np.float64, 'volume': np.int64}
+
+    def __init__(self, api, path=constants.CACHE_PATH + 'prices/', max_delta_days=10):
+        """
+        :param api: BorsdataAPI
+        :param path: directory of the store
+        :param max_delta_days: max number of missing trading days fetched with one call per day,
+                               instruments lagging more than that fetch their missing date range
+        """
+        self._api = api
+        self._path = path
+        self._max_delta_days = max_delta_days
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        self._state = self._load_state()
+
+    def _state_file(self):
+        return os.path.join(self._path, 'state.json')
+
+    def _load_state(self):
+        if not os.path.exists(self._state_file()):
+            return {'splits': {}}
+        with open(self._state_file()) as file:
+            return json.load(file)
+
+    def _save_state(self):
+        tmp_file = self._state_file() + '.tmp'
+        with open(tmp_file, 'w') as file:
+            json.dump(self._state, file)
+        os.replace(tmp_file, self._state_file())
+
+    def _instrument_path(self, ins_id):
+        return os.path.join(self._path, str(int(ins_id)))
+
+    def has(self, ins_id):
+        """
+        :param ins_id: instrument id
+        :return: True if the store holds prices for ins_id
+        """
+        return os.path.exists(os.path.join(self._instrument_path(ins_id), 'date.npy'))
+
+    def load_arrays(self, ins_id, mmap=True):
+        """
+        :param ins_id: instrument id
+        :param mmap: memory-map the files instead of reading them
+        :return: dict of column: np.array (incl. 'date' as datetime64[D]), None if not stored
+        """
+        if not self.has(ins_id):
+            return None
+        mmap_mode = 'r' if mmap else None
+        return {column: np.load(os.path.join(self._instrument_path(ins_id), column + '.npy'), mmap_mode=mmap_mode)
+                for column in ['date'] + self._columns}
+
+    def last_date(self, ins_id):
+        """
+        :param ins_id: instrument id
+        :return: last stored date (np.datetime64) or None
+        """
+        arrays = self.load_arrays(ins_id)
+        if arrays is None or len(arrays['date']) == 0:
+            return None
+        return arrays['date'][-1]
+
+    def get(self, ins_id, adjusted=False):
+        """
+        stock prices for ins_id from the store, same format as BorsdataAPI.get_instrument_stock_prices
+        :param ins_id: instrument id
+        :param adjusted: adjust the stored prices and volumes for stock splits, see BorsdataAPI.get_split_index
+        :return: pd.DataFrame()
+        """
+        arrays = self.load_arrays(ins_id, mmap=False)
+        if arrays is None:
+            return None
+        if adjusted:
+            arrays = self._api.get_split_index().adjust_arrays(ins_id, arrays)
+        index = pd.DatetimeIndex(arrays.pop('date').astype('datetime64[ns]'), name='date')
+        return pd.DataFrame(arrays, index=index, columns=self._columns)
+
+    def _write(self, ins_id, arrays):
+        path = self._instrument_path(ins_id)
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        # writing to a temporary file first, so a crash never leaves a half written column
+        for column, values in arrays.items():
+            tmp_file = os.path.join(path, column + '.tmp.npy')
+            np.save(tmp_file, values)
+            os.replace(tmp_file, os.path.join(path, column + '.npy'))
+
+    def _store_frame(self, ins_id, stock_prices):
+        # stock_prices has the format of get_instrument_stock_prices, i.e. the date as index
+        arrays = {'date': stock_prices.index.values.astype('datetime64[D]')}
+        for column in self._columns:
+            arrays[column] = stock_prices[column].values.astype(self._dtypes[column])
+        self._write(ins_id, arrays)
+
+    def _append_rows(self, ins_id, rows):
+        # rows is a data frame with the columns date (datetime64[D]) + self._columns, sorted by date
+        arrays = self.load_arrays(ins_id, mmap=False)
+        rows = rows[rows['date'].values > arrays['date'][-1]]
+        if len(rows) == 0:
+            return
+        arrays['date'] = np.concatenate([arrays['date'], rows['date'].values.astype('datetime64[D]')])
+        for column in self._columns:
+            arrays[column] = np.concatenate([arrays[column], rows[column].values.astype(self._dtypes[column])])
+        self._write(ins_id, arrays)
+
+    def _new_splits(self, ins_ids):
+        """
+        the last stock split of the instruments in ins_ids that has not been seen by the store
+        :param ins_ids: set of instrument ids
+        :return: dict of ins_id: date of its last split, recorded as seen once the instrument is re-pulled
+        """
+        stock_splits = self._api.get_stock_splits()
+        if len(stock_splits) == 0:
+            return {}
+        last_splits = stock_splits.groupby('instrumentId')['splitDate'].max()
+        new_splits = {}
+        for ins_id, split_date in last_splits.items():
+            split_date = str(split_date.date())
+            if int(ins_id) in ins_ids and self._state['splits'].get(str(ins_id)) != split_date:
+                new_splits[int(ins_id)] = split_date
+        return new_splits
+
+    def _full_pull(self, ins_ids, max_workers):
+        stored = []
+        for ins_id, stock_prices, error in self._api.get_instruments_stock_prices_many(ins_ids, max_workers):
+            if error is not None:
+                print(f"PriceStore >> could not fetch stock prices for ins_id {ins_id}: {error}")
+                continue
+            self._store_frame(ins_id, stock_prices)
+            stored.append(ins_id)
+        return stored
+
+    def _range_pull(self, last_dates, max_workers):
+        def fetch(ins_id):
+            return self._api.get_instrument_stock_prices(ins_id, from_date=last_dates[ins_id] + 1)
+        stored = []
+        for ins_id, stock_prices, error in self._api.fetch_many(fetch, last_dates.keys(), max_workers):
+            if error is not None:
+                print(f"PriceStore >> could not fetch stock prices for ins_id {ins_id}: {error}")
+                continue
+            rows = stock_prices.reset_index()
+            rows['date'] = rows['date'].values.astype('datetime64[D]')
+            self._append_rows(ins_id, rows)
+            stored.append(ins_id)
+        return stored
+
+    def refresh(self, ins_ids, today=None, max_workers=8):
+        """
+        brings the store up to date for ins_ids
+        :param ins_ids: iterable of instrument ids
+        :param today: date to refresh up to (default today)
+        :param max_workers: number of concurrent api-calls for full and range pulls
+        :return: dict with the number of instruments 'full' (re-)pulled, the number of instruments
+                 'range' pulled from their last date, the number of 'delta' days fetched and the
+                 list of instruments 'stored' (brought up to date, i.e. without the failed api-calls)
+        """
+        ins_ids = set(int(ins_id) for ins_id in ins_ids)
+        today = np.datetime64(today if today is not None else dt.date.today(), 'D')
+        new_splits = self._new_splits(ins_ids)
+        # instruments already in the store are re-pulled in full after a split, the others are pulled anyway
+        full = set(ins_id for ins_id in new_splits if self.has(ins_id))
+        last_dates = {}
+        lagging = {}
+        for ins_id in ins_ids - full:
+            last_date = self.last_date(ins_id)
+            if last_date is None:
+                full.add(ins_id)
+            elif np.busday_count(last_date + 1, today + 1) > self._max_delta_days:
+                lagging[ins_id] = last_date
+            else:
+                last_dates[ins_id] = last_date
+        stored = self._full_pull(full, max_workers)
+        # a split is only seen once the instrument's prices after it have been stored,
+        # an instrument whose pull failed is re-pulled by the next refresh
+        for ins_id in stored:
+            if ins_id in new_splits:
+                self._state['splits'][str(ins_id)] = new_splits[ins_id]
+        stored += self._range_pull(lagging, max_workers)
+        delta_days = 0
+        if last_dates:
+            # trading days missing in the store for at least one instrument
+            start = min(last_dates.values()) + 1
+            days = np.arange(start, today + 1, dtype='datetime64[D]')
+            days = days[np.is_busday(days)]
+            frames = []
+            if len(days) > 0:
+                # the latest bar of every instrument in one call
+                last_prices = self._api.get_instruments_stock_prices_last()
+                frames.append(last_prices)
+                last_day = np.datetime64(pd.to_datetime(last_prices['date']).max(), 'D') if len(last_prices) else None
+                for day in days:
+                    if last_day is not None and day >= last_day:
+                        continue
+                    frames.append(self._api.get_stock_prices_date(str(day)))
+                delta_days = len(frames)
+            self._append_frames(frames, last_dates)
+            # the all-instrument calls raise on errors, i.e. every instrument is up to date here
+            stored += list(last_dates)
+        self._state['last_refresh'] = str(today)
+        self._save_state()
+        return {'full': len(full), 'range': len(lagging), 'delta': delta_days, 'stored': stored}
+
+    def _append_frames(self, frames, last_dates):
+        frames = [frame for frame in frames if len(frame) > 0]
+        if not frames:
+            return
+        rows = pd.concat(frames, ignore_index=True)
+        rows = rows[rows['ins_id'].isin(list(last_dates.keys()))].copy()
+        rows['date'] = pd.to_datetime(rows['date']).values.astype('datetime64[D]')
+        rows = rows.drop_duplicates(['ins_id', 'date'], keep='last').sort_values(['ins_id', 'date'])
+        for ins_id, instrument_rows in rows.groupby('ins_id'):
+            self._append_rows(ins_id, instrument_rows.fillna(0))
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+
+class _BucketState:
+    """
+    token-bucket combined with a rolling-window quota.
+    the bucket gives short bursts (capacity) at a sustained rate, the window
+    makes sure no more than window_calls are made during window_seconds.
+    """
+    def __init__(self, rate, capacity, window_calls, window_seconds):
+        self.rate = rate
+        self.capacity = capacity
+        self.window_calls = window_calls
+        self.window_seconds = window_seconds
+        self.tokens = capacity
+        self.updated = None
+        # start times of the calls made (or scheduled) during the current window
+        self.calls = []
+
+    def reserve(self, now):
+        """
+        reserves a slot for one api-call
+        :param now: current time (epoch seconds)
+        :return: delay in seconds until the reserved slot starts
+        """
+        if self.updated is None:
+            self.updated = now
+        # refill tokens for the time passed since last reservation
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # a negative balance means the slot lies in the future
+        self.tokens -= 1
+        start = now if self.tokens >= 0 else now + (-self.tokens) / self.rate
+        # rolling-window quota
+        self.calls = [call for call in self.calls if call > now - self.window_seconds]
+        if self.window_calls and len(self.calls) >= self.window_calls:
+            start = max(start, self.calls[-self.window_calls] + self.window_seconds)
+        self.calls.append(start)
+        return start - now
+
+    def to_dict(self):
+        return {'tokens': self.tokens, 'updated': self.updated, 'calls': self.calls}
+
+    def load(self, state):
+        self.tokens = state.get('tokens', self.capacity)
+        self.updated = state.get('updated')
+        self.calls = state.get('calls', [])
+
+
+class TokenBucketRateLimiter:
+    """
+    thread-safe token-bucket rate limiter with a rolling-window quota.
+    Börsdata allows 100 calls per 10 seconds, which is the default window.
+    """
+    def __init__(self, rate=10, capacity=10, window_calls=100, window_seconds=10):
+        """
+        :param rate: sustained number of calls per second
+        :param capacity: max number of calls in a burst
+        :param window_calls: max number of calls during window_seconds (0 disables the window)
+        :param window_seconds: length of the rolling window in seconds
+        """
+        self._state = _BucketState(rate, capacity, window_calls, window_seconds)
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        reserves a slot for one api-call without sleeping
+        :return: delay in seconds before the call may be made
+        """
+        with self._lock:
+            return self._state.reserve(time.time())
+
+    def acquire(self):
+        """
+        blocks until an api-call may be made
+        :return: time slept in seconds
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0)
+
+    async def acquire_async(self):
+        """
+        waits (without blocking the event loop) until an api-call may be made
+        :return: time waited in seconds
+        """
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return max(delay, 0)
+
+
+class FileRateLimiter(TokenBucketRateLimiter):
+    """
+    token-bucket rate limiter whose state is kept in a file guarded by an exclusive file-lock,
+    so that several processes on one machine can share one API key.
+    file-locking uses fcntl, i.e. it is only available on POSIX systems.
+    """
+    def __init__(self, path, rate=10, capacity=10, window_calls=100, window_seconds=10):
+        """
+        :param path: path to the shared state file, created if it does not exist
+        """
+        super().__init__(rate, capacity, window_calls, window_seconds)
+        import fcntl
+        self._fcntl = fcntl
+        self._path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+    def reserve(self):
+        # the in-process lock serializes threads, the file lock serializes processes
+        with self._lock:
+            with open(self._path, 'a+') as file:
+                self._fcntl.flock(file.fileno(), self._fcntl.LOCK_EX)
+                try:
+                    file.seek(0)
+                    try:
+                        self._state.load(json.loads(file.read() or '{}'))
+                    except ValueError:
+                        # unreadable state, start over with a full bucket
+                        self._state.load({})
+                    delay = self._state.reserve(time.time())
+                    file.seek(0)
+                    file.truncate()
+                    file.write(json.dumps(self._state.to_dict()))
+                    file.flush()
+                finally:
+                    self._fcntl.flock(file.fileno(), self._fcntl.LOCK_UN)
+            return delay
@@ -0,0 +1,194 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from borsdata import constants as constants
+
+# report types in the order of their codes in the store
+REPORT_TYPES = ('quarter', 'year', 'r12')
+_REPORT_KEYS = {'quarter': 'reportsQuarter', 'year': 'reportsYear', 'r12': 'reportsR12'}
+_DATE_COLUMNS = ('report_end_date', 'report_date')
+
+
+def _date(value):
+    # the api sends dates as '2019-12-31T00:00:00', missing dates become NaT
+    return np.datetime64(value[:10], 'D') if isinstance(value, str) else np.datetime64('NaT', 'D')
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else None
+
+
+def decode_reports(json_data, fields):
+    """
+    decodes the response of instruments/{ins_id}/reports into typed arrays
+    :param json_data: json object with 'reportsQuarter', 'reportsYear' and 'reportsR12'
+    :param fields: lower-case report fields (the schema), e.g. ['revenues', 'gross_income', ...]
+    :return: dict with 'report_type' (int8 code in REPORT_TYPES), 'year' (int16), 'period' (int8),
+             'report_end_date', 'report_date' (datetime64[D]) and 'values' (float32, rows x fields, NaN if missing)
+    """
+    rows = []
+    report_types = []
+    for code, report_type in enumerate(REPORT_TYPES):
+        for row in json_data.get(_REPORT_KEYS[report_type]) or []:
+            # the api mixes the case of the keys, e.g. 'gross_Income'
+            rows.append({key.lower(): value for key, value in row.items()})
+            report_types.append(code)
+    values = np.array([[_number(row.get(field)) for field in fields] for row in rows],
+                      dtype=np.float32).reshape(len(rows), len(fields))
+    arrays = {'report_type': np.array(report_types, dtype=np.int8),
+              'year': np.array([row['year'] for row in rows], dtype=np.int16),
+              'period': np.array([row['period'] for row in rows], dtype=np.int8),
+              'values': values}
+    for column in _DATE_COLUMNS:
+        arrays[column] = np.array([_date(row.get(column)) for row in rows], dtype='datetime64[D]')
+    # sorting by report type, year and period
+    order = np.lexsort((arrays['period'], arrays['year'], arrays['report_type']))
+    return {key: array[order] for key, array in arrays.items()}
+
+
+class ReportStore:
+    """
+    local report data (quarter, year and r12) of many instruments, one .npz-file per instrument.
+    the values are float32 with NaN for missing values (get_instrument_reports replaces them with 0),
+    in a column schema shared by all instruments, taken from the report metadata (reportPropery).
+    instruments are loaded lazily, only when they are asked for.
+    """
+    def __init__(self, api, path=constants.CACHE_PATH + 'reports/'):
+        """
+        :param api: BorsdataAPI
+        :param path: directory of the store
+        """
+        self._api = api
+        self._path = path
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        self._fields = None
+        # instruments loaded from disk, ins_id: pd.DataFrame
+        self._loaded = {}
+
+    @property
+    def fields(self):
+        """
+        :return: the lower-case report fields (columns) of the store
+        """
+        if self._fields is None:
+            self._fields = self._load_fields()
+        return self._fields
+
+    def _load_fields(self):
+        schema_file = os.path.join(self._path, 'schema.json')
+        if os.path.exists(schema_file):
+            with open(schema_file) as file:
+                return json.load(file)
+        metadata = self._api.get_reports_metadata()
+        fields = list(dict.fromkeys(field.lower() for field in metadata['reportPropery']
+                                    if field.lower() not in _DATE_COLUMNS + ('year', 'period', 'currency')))
+        with open(schema_file, 'w') as file:
+            json.dump(fields, file)
+        return fields
+
+    def _instrument_file(self, ins_id):
+        return os.path.join(self._path, f'{int(ins_id)}.npz')
+
+    def has(self, ins_id):
+        """
+        :param ins_id: instrument id
+        :return: True if the store holds reports for ins_id
+        """
+        return os.path.exists(self._instrument_file(ins_id))
+
+    def refresh(self, ins_ids, only_missing=False, max_workers=8):
+        """
+        fetches and stores the reports of ins_ids, e.g. the ids returned by BorsdataAPI.refresh_cache
+        :param ins_ids: iterable of instrument ids
+        :param only_missing: only fetch the instruments not in the store
+        :param max_workers: number of concurrent api-calls
+        :return: list of the stored instruments (without the failed api-calls)
+        """
+        ins_ids = [int(ins_id) for ins_id in ins_ids if not (only_missing and self.has(ins_id))]
+        fields = self.fields
+        stored = []
+        for ins_id, json_data, error in self._api.fetch_many(self._api.get_instrument_reports_json, ins_ids,
+                                                             max_workers):
+            if error is not None:
+                print(f"ReportStore >> could not fetch reports for ins_id {ins_id}: {error}")
+                continue
+            arrays = decode_reports(json_data, fields)
+            # writing to a temporary file first, so a crash never leaves a half written file
+            tmp_file = self._instrument_file(ins_id) + '.tmp.npz'
+            np.savez(tmp_file, fields=np.array(fields), **arrays)
+            os.replace(tmp_file, self._instrument_file(ins_id))
+            self._loaded.pop(ins_id, None)
+            stored.append(ins_id)
+        return stored
+
+    def get(self, ins_id):
+        """
+        reports of one instrument, loaded from disk on first use
+        :param ins_id: instrument id
+        :return: pd.DataFrame indexed by (report_type, year, period), None if not stored
+        """
+        ins_id = int(ins_id)
+        reports = self._loaded.get(ins_id)
+        if reports is None:
+            if not self.has(ins_id):
+                return None
+            with np.load(self._instrument_file(ins_id)) as arrays:
+                index = pd.MultiIndex.from_arrays(
+                    [pd.Categorical.from_codes(arrays['report_type'], REPORT_TYPES), arrays['year'], arrays['period']],
+                    names=['report_type', 'year', 'period'])
+                reports = pd.DataFrame(arrays['values'], index=index, columns=list(arrays['fields']))
+                for column in _DATE_COLUMNS:
+                    reports[column] = arrays[column]
+            # files written with an older schema get the current columns (NaN if missing)
+            if list(reports.columns[:-len(_DATE_COLUMNS)]) != self.fields:
+                reports = reports.reindex(columns=self.fields + list(_DATE_COLUMNS))
+            self._loaded[ins_id] = reports
+        return reports
+
+    def frame(self, ins_ids, report_type=None):
+        """
+        reports of several instruments in one long data frame
+        :param ins_ids: iterable of instrument ids
+        :param report_type: 'quarter', 'year' or 'r12', None keeps all report types
+        :return: pd.DataFrame indexed by (ins_id, report_type, year, period)
+        """
+        frames = {}
+        for ins_id in ins_ids:
+            reports = self.get(ins_id)
+            if reports is None:
+                continue
+            if report_type is not None:
+                # instruments without reports of report_type (e.g. indices or new listings) are left out
+                reports = reports[reports.index.get_level_values('report_type') == report_type]
+            if len(reports) == 0:
+                continue
+            frames[int(ins_id)] = reports
+        if not frames:
+            return pd.DataFrame(columns=self.fields + list(_DATE_COLUMNS))
+        return pd.concat(frames, names=['ins_id'])
+
+    def latest(self, ins_ids, report_type='r12'):
+        """
+        the last report of each instrument
+        :param ins_ids: iterable of instrument ids
+        :param report_type: 'quarter', 'year' or 'r12'
+        :return: pd.DataFrame indexed by ins_id (with 'year' and 'period' as columns), a NaN row for
+                 instruments without reports of report_type
+        """
+        ins_ids = pd.Index([int(ins_id) for ins_id in ins_ids], name='ins_id')
+        reports = self.frame(ins_ids, report_type)
+        if len(reports) == 0:
+            latest = pd.DataFrame(columns=['year', 'period'] + self.fields + list(_DATE_COLUMNS))
+        else:
+            # the frames are sorted by year and period, the last row per instrument is the latest report
+            latest = reports.reset_index(['report_type', 'year', 'period']).groupby(level='ins_id').tail(1)
+            latest = latest.drop(columns='report_type')
+        return latest.reindex(ins_ids)
+
+    def clear(self):
+        """
+        drops the instruments loaded into memory
+        """
+        self._loaded.clear()
@@ -0,0 +1,197 @@
+import fnmatch
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# time to live in seconds per endpoint (fnmatch-pattern), endpoints not listed are not cached.
+# the meta data changes at most daily.
+DEFAULT_TTLS = {
+    'branches': 24 * 3600,
+    'countries': 24 * 3600,
+    'markets': 24 * 3600,
+    'sectors': 24 * 3600,
+    'translationmetadata': 24 * 3600,
+    'instruments': 24 * 3600,
+    'instruments/kpis/metadata': 24 * 3600,
+    'instruments/reports/metadata': 24 * 3600,
+    # split list (split index of the adjusted stock prices), invalidated by refresh_cache when instruments are updated
+    'instruments/stocksplits': 24 * 3600,
+    # bulk kpi data (screener), invalidated by refresh_cache when the kpis are re-calculated
+    'instruments/kpis/*/*/*': 24 * 3600,
+}
+
+
+class CacheEntry:
+    def __init__(self, url, content, etag=None, last_modified=None, stored_at=None):
+        self.url = url.strip('/')
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at if stored_at is not None else time.time()
+
+
+class ResponseCache:
+    """
+    two-level response cache, an in-memory LRU in front of an (optional) SQLite-file.
+    entries are raw response bodies, stale entries are kept for conditional revalidation
+    (If-None-Match/If-Modified-Since) until they are evicted.
+    """
+    def __init__(self, path=None, ttls=None, max_memory_entries=256, max_disk_bytes=512 * 1024 * 1024):
+        """
+        :param path: path to the SQLite-file, None keeps the cache in memory only
+        :param ttls: dict of endpoint-pattern: ttl in seconds (default DEFAULT_TTLS)
+        :param max_memory_entries: max number of entries in the in-memory LRU
+        :param max_disk_bytes: max total size of the stored responses on disk
+        """
+        self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._max_memory_entries = max_memory_entries
+        self._max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, url TEXT, content BLOB, '
+                             'etag TEXT, last_modified TEXT, stored_at REAL, size INTEGER)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS markers (name TEXT PRIMARY KEY, value TEXT)')
+            self._db.commit()
+        # markers are used by the invalidation hooks, e.g. the last seen kpi calculation time
+        self._markers = {}
+
+    @staticmethod
+    def key(url, params):
+        """
+        cache key for an api-call, the api key is not part of the cache key
+        :param url: url (without root)
+        :param params: query parameters
+        :return: key (string)
+        """
+        params = sorted((k, str(v)) for k, v in params.items() if k != 'authKey' and v is not None)
+        return url.strip('/') + '?' + '&'.join(f'{k}={v}' for k, v in params)
+
+    def ttl(self, url):
+        """
+        :param url: url (without root)
+        :return: ttl in seconds for url, None if url is not cached
+        """
+        url = url.strip('/')
+        for pattern, ttl in self._ttls.items():
+            if fnmatch.fnmatchcase(url, pattern):
+                return ttl
+        return None
+
+    def set_ttl(self, pattern, ttl):
+        """
+        adds (or changes) the ttl of an endpoint-pattern, None stops caching it
+        :param pattern: fnmatch-pattern of the url, e.g. 'instruments/kpis/*/*/*'
+        :param ttl: ttl in seconds
+        """
+        if ttl is None:
+            self._ttls.pop(pattern, None)
+        else:
+            self._ttls[pattern] = ttl
+
+    def get(self, key):
+        """
+        :param key: cache key
+        :return: CacheEntry (possibly stale) or None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            if self._db is None:
+                return None
+            row = self._db.execute('SELECT url, content, etag, last_modified, stored_at FROM responses WHERE key = ?',
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            entry = CacheEntry(row[0], bytes(row[1]), row[2], row[3], row[4])
+            self._remember(key, entry)
+            return entry
+
+    def is_fresh(self, entry):
+        """
+        :param entry: CacheEntry
+        :return: True if entry is younger than the ttl of its endpoint
+        """
+        ttl = self.ttl(entry.url)
+        return ttl is not None and time.time() - entry.stored_at < ttl
+
+    def set(self, key, entry):
+        """
+        stores an entry in memory and on disk
+        :param key: cache key
+        :param entry: CacheEntry
+        """
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                 (key, entry.url, entry.content, entry.etag, entry.last_modified, entry.stored_at,
+                                  len(entry.content)))
+                self._evict_disk()
+                self._db.commit()
+
+    def touch(self, key, entry):
+        """
+        marks an entry as fresh again, e.g. after a 304 Not Modified response
+        :param key: cache key
+        :param entry: CacheEntry
+        """
+        entry.stored_at = time.time()
+        self.set(key, entry)
+
+    def invalidate(self, prefix=''):
+        """
+        removes all entries whose key starts with prefix (all entries if prefix is empty).
+        keys are the url followed by '?' and the parameters, i.e. 'instruments?' only matches the instrument list
+        while 'instruments/3/' matches everything cached for instrument 3.
+        :param prefix: key prefix, e.g. 'instruments/3/'
+        """
+        prefix = prefix.lstrip('/')
+        with self._lock:
+            for key in [key for key in self._memory if key.startswith(prefix)]:
+                del self._memory[key]
+            if self._db is not None:
+                escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                self._db.execute("DELETE FROM responses WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',))
+                self._db.commit()
+
+    def get_marker(self, name):
+        with self._lock:
+            if name not in self._markers and self._db is not None:
+                row = self._db.execute('SELECT value FROM markers WHERE name = ?', (name,)).fetchone()
+                self._markers[name] = row[0] if row is not None else None
+            return self._markers.get(name)
+
+    def set_marker(self, name, value):
+        with self._lock:
+            self._markers[name] = value
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO markers VALUES (?, ?)', (name, value))
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        # removing the oldest entries until the total size is below max_disk_bytes
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self._max_disk_bytes:
+            return
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY stored_at').fetchall():
+            if total <= self._max_disk_bytes:
+                break
+            self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._memory.pop(key, None)
+            total -= size
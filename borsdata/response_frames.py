@@ -0,0 +1,102 @@
+"""
+parsing of the api responses into data frames, shared by BorsdataAPI and AsyncBorsdataAPI
+"""
+import pandas as pd
+
+STOCK_PRICE_COLUMNS = ['high', 'low', 'close', 'open', 'volume']
+
+
+def json_frame(json_data, key):
+    """
+    :param json_data: json object
+    :param key: key of the list of json objects, e.g. 'branches'
+    :return: pd.DataFrame with one row per json object
+    """
+    return pd.json_normalize(json_data[key])
+
+
+def instruments_frame(json_data):
+    """
+    :param json_data: json object with 'instruments'
+    :return: pd.DataFrame of instruments with a parsed listingDate
+    """
+    instruments = pd.json_normalize(json_data['instruments'])
+    instruments['listingDate'] = pd.to_datetime(instruments['listingDate'])
+    return instruments
+
+
+def kpi_history_frame(json_data):
+    """
+    :param json_data: json object with 'values' [{'y', 'p', 'v'}]
+    :return: pd.DataFrame with the columns ['year', 'period', 'kpi_value']
+    """
+    # creating dataframes from json-data
+    kpi_history = pd.DataFrame.from_dict(json_data['values'], orient='columns')
+    # the structure of the data-columns received are; 'y' year, 'p' period, 'v' value (kpi).
+    # renaming the columns
+    kpi_history.rename(columns={"y": "year", "p": "period", "v": "kpi_value"}, inplace=True)
+    kpi_history.fillna(0, inplace=True)
+    return kpi_history
+
+
+def reports_frames(json_data):
+    """
+    :param json_data: json object with 'reportsYear', 'reportsQuarter' and 'reportsR12'
+    :return: (reports_quarter, reports_year, reports_r12) pd.DataFrames with lower-case columns
+    """
+    # creating dataframes from json-data
+    reports_year = pd.DataFrame.from_dict(json_data['reportsYear'], orient='columns')
+    reports_quarter = pd.DataFrame.from_dict(json_data['reportsQuarter'], orient='columns')
+    reports_r12 = pd.DataFrame.from_dict(json_data['reportsR12'], orient='columns')
+    # making the columns lower-case in all dataframes
+    reports_year.columns = [x.lower() for x in reports_year.columns]
+    reports_quarter.columns = [x.lower() for x in reports_quarter.columns]
+    reports_r12.columns = [x.lower() for x in reports_r12.columns]
+    # replacing all nans with a 0
+    reports_year.fillna(0, inplace=True)
+    reports_quarter.fillna(0, inplace=True)
+    reports_r12.fillna(0, inplace=True)
+    # sort data ascending
+    reports_year = reports_year.sort_values(['year', 'period'], ascending=True)
+    reports_quarter = reports_quarter.sort_values(['year', 'period'], ascending=True)
+    reports_r12 = reports_r12.sort_values(['year', 'period'], ascending=True)
+    return reports_quarter, reports_year, reports_r12
+
+
+def stock_prices_frame(columns):
+    """
+    :param columns: typed columns of one instrument from decode_stock_prices
+    :return: pd.DataFrame indexed by date
+    """
+    columns = dict(columns)
+    columns.pop('ins_id', None)
+    # setting the 'date'-column in dataframe (table/spreadsheet) as index
+    dates = pd.DatetimeIndex(columns.pop('date').astype('datetime64[ns]'), name='date')
+    stock_prices = pd.DataFrame(columns, index=dates, columns=STOCK_PRICE_COLUMNS)
+    stock_prices.fillna(0, inplace=True)
+    # sorting by the index (date) if the api did not
+    if not stock_prices.index.is_monotonic_increasing:
+        stock_prices = stock_prices.sort_index()
+    return stock_prices
+
+
+def stock_prices_all_frame(columns):
+    """
+    :param columns: typed columns of all instruments from decode_stock_prices
+    :return: pd.DataFrame with the columns ['date', 'high', 'low', 'close', 'open', 'volume', 'ins_id']
+    """
+    columns = dict(columns)
+    columns['date'] = columns['date'].astype('datetime64[ns]')
+    return pd.DataFrame(columns, columns=['date'] + STOCK_PRICE_COLUMNS + ['ins_id'])
+
+
+def stock_splits_frame(json_data):
+    """
+    :param json_data: json object with 'stockSplitList'
+    :return: pd.DataFrame with a parsed splitDate
+    """
+    if not json_data['stockSplitList']:
+        return pd.DataFrame(columns=['instrumentId', 'splitType', 'ratio', 'splitDate'])
+    stock_splits = pd.json_normalize(json_data['stockSplitList'])
+    stock_splits['splitDate'] = pd.to_datetime(stock_splits['splitDate'])
+    return stock_splits
@@ -0,0 +1,91 @@
+import copy
+import functools
+import sys
+import threading
+
+
+def copy_result(result):
+    """
+    copy of a result handed to a caller, so that callers sharing one api-call can not change each others data
+    :param result: pd.DataFrame, pd.Series, tuple of those or a json object / dict of np.arrays
+    :return: copy of result
+    """
+    # pandas is only imported by the callers that return data frames
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(copy_result(item) for item in result)
+    if isinstance(result, (bytes, str, int, float)) or result is None:
+        # immutable
+        return result
+    return copy.deepcopy(result)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    coalesces concurrent calls with the same key into one call. the first caller (leader) runs the function,
+    callers arriving while it runs (followers) wait for and share its result. calls are only shared while
+    they are in flight, nothing is cached.
+    """
+    def __init__(self, copy_function=copy_result):
+        """
+        :param copy_function: function copying the shared result for every caller, None shares the result as is
+        """
+        self._copy = copy_function
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        :param key: hashable key of the call, e.g. (url, parameters)
+        :param function: function to call
+        :return: function(*args, **kwargs), the result of the leader's call if an identical call is in flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return self._copy(call.result) if self._copy is not None else call.result
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # no follower can join once the call is removed
+                del self._calls[key]
+                followers = call.followers
+            call.done.set()
+        # the shared result is only read (copied) by the followers, the leader gets its own copy
+        if followers > 0 and self._copy is not None:
+            return self._copy(call.result)
+        return call.result
+
+
+def single_flight(method):
+    """
+    decorator coalescing concurrent calls of a BorsdataAPI-method with the same arguments,
+    the instance has to have a SingleFlight in _flights
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return self._flights.do(key, method, self, *args, **kwargs)
+    return wrapper
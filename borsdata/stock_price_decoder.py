@@ -0,0 +1,65 @@
+import json
+import re
+import numpy as np
+
+# price keys of the response and their column names
+_PRICE_KEYS = (('h', 'high'), ('l', 'low'), ('c', 'close'), ('o', 'open'))
+# the start of the list of price rows and the separator between two rows
+_LIST_START = re.compile(rb'"stockPricesList"\s*:\s*\[')
+_ROW_SEPARATOR = re.compile(rb'}\s*,\s*{')
+# bytes of the response parsed at a time (about 1000 rows)
+_CHUNK_SIZE = 65536
+
+
+def _decode_rows(rows):
+    # typed columns of a list of parsed price rows
+    columns = {'date': np.array([row['d'][:10] for row in rows], dtype='datetime64[D]')}
+    for key, column in _PRICE_KEYS:
+        # None becomes NaN in a float array
+        columns[column] = np.array([row.get(key) for row in rows], dtype=np.float64).astype(np.float32)
+    volume = np.array([row.get('v') for row in rows], dtype=np.float64)
+    columns['volume'] = np.nan_to_num(volume).astype(np.int64)
+    # an empty response keeps an (empty) ins_id column, e.g. stock prices of all instruments on a holiday
+    if all('i' in row for row in rows):
+        columns['ins_id'] = np.array([row['i'] for row in rows], dtype=np.int64)
+    return columns
+
+
+def _chunks(content):
+    # the price rows in chunks of about _CHUNK_SIZE bytes, the rows are flat objects of numbers
+    # and a date, i.e. they contain no brackets, braces or commas inside strings
+    match = _LIST_START.search(content)
+    if match is None:
+        return
+    position, end = match.end(), content.index(b']', match.end())
+    while position < end:
+        separator = _ROW_SEPARATOR.search(content, min(position + _CHUNK_SIZE, end), end)
+        cut = separator.start() + 1 if separator is not None else end
+        yield json.loads(b'[' + content[position:cut] + b']')
+        position = separator.end() - 1 if separator is not None else end
+
+
+def decode_stock_prices(content):
+    """
+    decodes the stockPricesList of a stockprices-response straight into typed numpy columns, without an
+    intermediate data frame. the rows are parsed a chunk (about 1000 rows) at a time, so only the dicts
+    of one chunk are alive instead of one per row of the response.
+    missing prices become NaN, a missing volume becomes 0.
+    :param content: response body (bytes or str)
+    :return: dict with 'date' (datetime64[D]), 'high', 'low', 'close', 'open' (float32),
+             'volume' (int64) and 'ins_id' (int64, only for all-instrument responses)
+    """
+    # the chunks are cut from the bytes as received, the response is not decoded into one string
+    content = content.encode() if isinstance(content, str) else content
+    try:
+        chunks = [_decode_rows(rows) for rows in _chunks(content)]
+    except ValueError:
+        # not in the expected format, parsing the whole response
+        chunks = [_decode_rows(json.loads(content).get('stockPricesList') or [])]
+    if not chunks:
+        return _decode_rows([])
+    columns = {column: np.concatenate([chunk[column] for chunk in chunks]) for column in chunks[0]
+               if column != 'ins_id'}
+    if all('ins_id' in chunk for chunk in chunks):
+        columns['ins_id'] = np.concatenate([chunk['ins_id'] for chunk in chunks])
+    return columns
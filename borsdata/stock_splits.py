@@ -0,0 +1,165 @@
+import numpy as np
+
+# price columns multiplied by the split factor, the volume is divided by it
+PRICE_COLUMNS = ('high', 'low', 'close', 'open')
+
+
+def parse_ratio(ratio, split_type=None):
+    """
+    price factor of a split, i.e. the factor applied to the prices before the split date
+    :param ratio: 'new:old', e.g. '2:1' (two new shares for one old share)
+    :param split_type: 'Split' or 'Reverse Split', a reverse split always gets a factor >= 1
+                       whichever way round its ratio is written
+    :return: float factor (0.5 for '2:1'), None if ratio can not be parsed
+    """
+    try:
+        new, old = (float(part) for part in str(ratio).replace(',', '.').split(':'))
+    except ValueError:
+        return None
+    if new <= 0 or old <= 0:
+        return None
+    factor = old / new
+    if split_type is not None and 'reverse' in str(split_type).lower() and factor < 1:
+        factor = 1 / factor
+    return factor
+
+
+class SplitIndex:
+    """
+    cumulative split factors per instrument, for split-adjusting stock prices locally:
+    prices before a split are multiplied by the product of the factors of all later splits
+    and the volume is divided by it, prices on and after the last split are unchanged.
+    the factors of an instrument are only recomputed by update() when its splits change.
+    """
+    def __init__(self):
+        # ins_id: tuple of (split date, ratio, split type), to find the instruments with new splits
+        self._splits = {}
+        # ins_id: (split dates datetime64[D], cumulative factors with one more element than dates)
+        self._factors = {}
+
+    @classmethod
+    def from_frame(cls, stock_splits):
+        """
+        :param stock_splits: pd.DataFrame in the format of BorsdataAPI.get_stock_splits
+        :return: SplitIndex
+        """
+        split_index = cls()
+        split_index.update(stock_splits)
+        return split_index
+
+    @property
+    def ins_ids(self):
+        return list(self._factors.keys())
+
+    def __contains__(self, ins_id):
+        return int(ins_id) in self._factors
+
+    def __len__(self):
+        return len(self._factors)
+
+    def update(self, stock_splits):
+        """
+        brings the index up to date with the split list, recomputing only instruments whose splits changed
+        :param stock_splits: pd.DataFrame in the format of BorsdataAPI.get_stock_splits
+        :return: set of instrument ids whose factors were (re)computed or removed
+        """
+        splits = {}
+        if len(stock_splits) > 0:
+            dates = stock_splits['splitDate'].values.astype('datetime64[D]')
+            split_types = stock_splits['splitType'] if 'splitType' in stock_splits else [None] * len(stock_splits)
+            for ins_id, date, ratio, split_type in zip(stock_splits['instrumentId'], dates, stock_splits['ratio'],
+                                                       split_types):
+                splits.setdefault(int(ins_id), []).append((date, ratio, split_type))
+        changed = set(self._splits) - set(splits)
+        for ins_id in changed:
+            del self._splits[ins_id]
+            self._factors.pop(ins_id, None)
+        for ins_id, instrument_splits in splits.items():
+            instrument_splits = tuple(sorted(instrument_splits, key=lambda split: split[0]))
+            if self._splits.get(ins_id) == instrument_splits:
+                continue
+            self._splits[ins_id] = instrument_splits
+            self._compute(ins_id, instrument_splits)
+            changed.add(ins_id)
+        return changed
+
+    def _compute(self, ins_id, instrument_splits):
+        dates = []
+        factors = []
+        for date, ratio, split_type in instrument_splits:
+            factor = parse_ratio(ratio, split_type)
+            if factor is None or np.isnat(date):
+                print(f"SplitIndex >> ignoring split {ratio} of ins_id {ins_id}")
+                continue
+            dates.append(date)
+            factors.append(factor)
+        if not dates:
+            self._factors.pop(ins_id, None)
+            return
+        # cumulative[i] is the product of the factors of split i and all later splits, cumulative[-1] is 1
+        cumulative = np.append(np.cumprod(np.array(factors)[::-1])[::-1], 1.0)
+        self._factors[ins_id] = (np.array(dates, dtype='datetime64[D]'), cumulative)
+
+    def factors(self, ins_id, dates):
+        """
+        :param ins_id: instrument id
+        :param dates: np.array of dates (datetime64)
+        :return: np.array of the price factor of every date (float64, ones if ins_id has no splits)
+        """
+        entry = self._factors.get(int(ins_id))
+        if entry is None:
+            return np.ones(len(dates))
+        split_dates, cumulative = entry
+        # number of splits on or before each date, a split date already has the new prices
+        return cumulative[np.searchsorted(split_dates, dates.astype('datetime64[D]'), side='right')]
+
+    @staticmethod
+    def _apply(columns, factors):
+        adjusted = dict(columns)
+        for column in PRICE_COLUMNS:
+            if column in adjusted:
+                adjusted[column] = (adjusted[column] * factors).astype(adjusted[column].dtype)
+        if 'volume' in adjusted:
+            volume = adjusted['volume'] / factors
+            if np.issubdtype(adjusted['volume'].dtype, np.integer):
+                volume = np.rint(volume)
+            adjusted['volume'] = volume.astype(adjusted['volume'].dtype)
+        return adjusted
+
+    def adjust_arrays(self, ins_id, columns):
+        """
+        split-adjusts stock price columns of one instrument
+        :param ins_id: instrument id
+        :param columns: dict with 'date' and the price columns, e.g. from BorsdataAPI.get_instrument_stock_price_arrays
+        :return: dict with the adjusted columns (new arrays, columns is not changed)
+        """
+        if int(ins_id) not in self._factors:
+            return columns
+        return self._apply(columns, self.factors(ins_id, columns['date']))
+
+    def adjust_frame(self, stock_prices, ins_id=None):
+        """
+        split-adjusts a stock price frame
+        :param stock_prices: pd.DataFrame in the format of BorsdataAPI.get_instrument_stock_prices (dates as index)
+                             or, with ins_id None, of BorsdataAPI.get_stock_prices_date ('date' and 'ins_id' columns)
+        :param ins_id: instrument id of the frame, None for a frame of several instruments
+        :return: adjusted copy of stock_prices
+        """
+        if ins_id is not None:
+            if int(ins_id) not in self._factors:
+                return stock_prices
+            factors = self.factors(ins_id, stock_prices.index.values)
+        else:
+            factors = np.ones(len(stock_prices))
+            ins_ids = stock_prices['ins_id'].values
+            dates = stock_prices['date'].values
+            # only the rows of instruments with splits are looked up
+            for split_ins_id in np.intersect1d(np.unique(ins_ids), np.array(self.ins_ids, dtype=np.int64)):
+                rows = ins_ids == split_ins_id
+                factors[rows] = self.factors(split_ins_id, dates[rows])
+        stock_prices = stock_prices.copy()
+        columns = self._apply({column: stock_prices[column].values for column in stock_prices.columns
+                               if column in PRICE_COLUMNS or column == 'volume'}, factors)
+        for column, values in columns.items():
+            stock_prices[column] = values
+        return stock_prices
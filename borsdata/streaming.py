@@ -0,0 +1,148 @@
+"""
+reductions folding a stream of (ins_id, frame) into a result incrementally, e.g. over
+BorsdataAPI.get_instruments_stock_prices_many, so that an analysis of the whole universe holds one
+instrument (and the fold state) in memory instead of all frames:
+
+    breadth = BreadthCount(window=40)
+    top = TopK(5, lambda frame: frame['close'].pct_change(5).iloc[-1])
+    fold(api.get_instruments_stock_prices_many(ins_ids), [breadth, top])
+    breadth.result(), top.result()
+"""
+import heapq
+import numpy as np
+import pandas as pd
+from borsdata import indicators as indicators
+
+
+def fold(stream, reducers, on_error=None):
+    """
+    feeds every (ins_id, frame) of stream to all reducers
+    :param stream: iterable of (ins_id, frame) or (ins_id, frame, error) as yielded by BorsdataAPI.fetch_many
+    :param reducers: list of reducers (objects with update(ins_id, frame) and result())
+    :param on_error: function called with (ins_id, error) for failed instruments (default prints them)
+    :return: list of the reducers' results
+    """
+    for item in stream:
+        ins_id, frame = item[0], item[1]
+        error = item[2] if len(item) > 2 else None
+        if error is not None:
+            if on_error is not None:
+                on_error(ins_id, error)
+            else:
+                print(f"fold >> skipping ins_id {ins_id}: {error}")
+            continue
+        for reducer in reducers:
+            reducer.update(ins_id, frame)
+    return [reducer.result() for reducer in reducers]
+
+
+class BreadthCount:
+    """
+    running number of instruments closing above their simple moving average, per date.
+    with a calendar (e.g. the dates of an index) days an instrument has no bar inside its history keep the
+    previous close, as in indicators.breadth over a date x instrument table, without a calendar the average
+    is over the instrument's own bars.
+    """
+    def __init__(self, window=40, column='close', calendar=None):
+        """
+        :param window: window of the moving average in days
+        :param column: price column
+        :param calendar: dates (sorted) the counts are reported for, None uses the dates of the instruments
+        """
+        self._window = window
+        self._column = column
+        self._calendar = pd.DatetimeIndex(calendar) if calendar is not None else None
+        self._counts = np.zeros(len(calendar), dtype=np.int64) if calendar is not None else pd.Series(dtype=np.int64)
+
+    def update(self, ins_id, frame):
+        close = frame[self._column]
+        if len(close) == 0:
+            return
+        if self._calendar is None:
+            above = close > indicators.sma(close, self._window)
+            self._counts = self._counts.add(above.astype(np.int64), fill_value=0).astype(np.int64)
+            return
+        # the instrument's closes on the calendar, between its first and last bar
+        inside = (self._calendar >= close.index[0]) & (self._calendar <= close.index[-1])
+        aligned = close.reindex(self._calendar[inside])
+        traded = aligned.notna().values
+        filled = aligned.ffill()
+        above = (filled > indicators.sma(filled, self._window)).values & traded
+        self._counts[inside] += above
+
+    def result(self):
+        """
+        :return: pd.Series of counts indexed by date
+        """
+        if self._calendar is None:
+            return self._counts.sort_index()
+        return pd.Series(self._counts, index=self._calendar)
+
+
+class TopK:
+    """
+    the k instruments with the highest (or lowest) value, keeping only k values in a heap
+    """
+    def __init__(self, k, value, largest=True):
+        """
+        :param k: number of instruments
+        :param value: function frame -> float (NaN/None is skipped), or a column name of which the last value is used
+        :param largest: keep the highest values (False keeps the lowest)
+        """
+        self._k = k
+        self._value = value if callable(value) else lambda frame: frame[value].iloc[-1] if len(frame) else None
+        self._sign = 1 if largest else -1
+        self._heap = []
+
+    def update(self, ins_id, frame):
+        value = self._value(frame)
+        if value is None or np.isnan(value):
+            return
+        # a min-heap of the k best, ins_id breaks ties deterministically
+        item = (self._sign * float(value), -int(ins_id))
+        if len(self._heap) < self._k:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def result(self):
+        """
+        :return: pd.Series of values indexed by ins_id, best first
+        """
+        items = sorted(self._heap, reverse=True)
+        return pd.Series([self._sign * value for value, _ in items],
+                         index=pd.Index([-ins_id for _, ins_id in items], name='ins_id'), dtype=np.float64)
+
+
+class GroupedSum:
+    """
+    running sums (and counts) of columns grouped by a column or the index, e.g. the total volume per date
+    or the sum of a kpi per year
+    """
+    def __init__(self, columns, by=None):
+        """
+        :param columns: columns to sum
+        :param by: column to group by, None groups by the index (e.g. the date of a stock price frame)
+        """
+        self._columns = list(columns)
+        self._by = by
+        self._sums = None
+        self._counts = None
+
+    def update(self, ins_id, frame):
+        groups = frame.groupby(self._by if self._by is not None else frame.index)[self._columns]
+        sums = groups.sum()
+        counts = groups.count()
+        if self._sums is None:
+            self._sums, self._counts = sums, counts
+        else:
+            self._sums = self._sums.add(sums, fill_value=0)
+            self._counts = self._counts.add(counts, fill_value=0)
+
+    def result(self):
+        """
+        :return: pd.DataFrame of the sums per group, with a '<column>_count' column (number of values) per column
+        """
+        if self._sums is None:
+            return pd.DataFrame(columns=self._columns + [column + '_count' for column in self._columns])
+        return self._sums.join(self._counts.add_suffix('_count')).sort_index()
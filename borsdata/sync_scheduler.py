@@ -0,0 +1,226 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import time
+from borsdata import constants as constants
+
+# order in which the kinds of work are synced (lowest first)
+DEFAULT_PRIORITIES = {'prices': 0, 'kpis': 1, 'reports': 2}
+
+
+def _kpi_key(spec):
+    return '/'.join(str(part) for part in spec)
+
+
+class SyncScheduler:
+    """
+    change-driven sync of the local stores. a poll costs two api-calls (instruments/updated and kpis/updated),
+    their timestamps are compared with the ones of the last sync and only the stale instruments and kpis
+    are queued for a refetch. the queue is a priority queue, watchlist instruments first and then by kind
+    (see DEFAULT_PRIORITIES). the price store is refreshed once per run with all queued instruments, reports
+    and kpis in batches. the api-calls are paced by the api's rate limiter, a run stops after max_calls
+    http-requests and what is left stays stale until the next run.
+
+        scheduler = SyncScheduler(api, price_store=PriceStore(api), report_store=ReportStore(api))
+        scheduler.run_once()
+
+    an instrument counts as synced when its store has stored it in the refetch, failed api-calls are
+    printed by the stores and stay queued for the next run.
+    """
+    def __init__(self, api, price_store=None, report_store=None, kpi_screener=None, kpis=None, ins_ids=None,
+                 watchlist=None, priorities=None, path=constants.CACHE_PATH + 'sync/', max_workers=8,
+                 batch_size=100):
+        """
+        :param api: BorsdataAPI
+        :param price_store: PriceStore to keep in sync, None skips prices
+        :param report_store: ReportStore to keep in sync, None skips reports
+        :param kpi_screener: KpiScreener to keep in sync, None skips kpis
+        :param kpis: list of (kpi_id, calc_group, calc) re-fetched when the kpis have been re-calculated
+        :param ins_ids: instrument ids to sync, None syncs all instruments
+        :param watchlist: instrument ids synced before all others
+        :param priorities: dict of kind ('prices', 'kpis', 'reports'): priority, lowest first
+        :param path: directory of the sync state
+        :param max_workers: number of concurrent api-calls
+        :param batch_size: number of queued reports and kpis synced between two saves of the state
+        """
+        self._api = api
+        self._stores = {'prices': price_store, 'reports': report_store}
+        self._kpi_screener = kpi_screener
+        self._kpis = [tuple(spec) for spec in kpis] if kpis is not None else []
+        self._ins_ids = set(int(ins_id) for ins_id in ins_ids) if ins_ids is not None else None
+        self._watchlist = set(int(ins_id) for ins_id in watchlist) if watchlist is not None else set()
+        self._priorities = dict(DEFAULT_PRIORITIES if priorities is None else priorities)
+        self._path = path
+        self._max_workers = max_workers
+        self._batch_size = batch_size
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        self._state = self._load_state()
+
+    def _state_file(self):
+        return os.path.join(self._path, 'state.json')
+
+    def _load_state(self):
+        if not os.path.exists(self._state_file()):
+            return {'instruments': {}, 'kpis': {}}
+        with open(self._state_file()) as file:
+            return json.load(file)
+
+    def _save_state(self):
+        tmp_file = self._state_file() + '.tmp'
+        with open(tmp_file, 'w') as file:
+            json.dump(self._state, file)
+        os.replace(tmp_file, self._state_file())
+
+    def _priority(self, kind, ins_id=None):
+        return 0 if ins_id in self._watchlist else 1, self._priorities.get(kind, len(self._priorities))
+
+    def poll(self):
+        """
+        polls the change feeds and queues what is stale
+        :return: priority queue (heapq) of (priority, sequence, kind, ins_id or kpi spec, updated at)
+        """
+        instruments = self._api.get_instruments_updated_json()['instruments']
+        kpis_updated = self._api.get_updated_kpis()['kpisCalcUpdated']
+        queue = []
+        sequence = itertools.count()
+        for kind, store in self._stores.items():
+            if store is None:
+                continue
+            synced = self._state['instruments'].get(kind, {})
+            for instrument in instruments:
+                ins_id = instrument['insId']
+                if self._ins_ids is not None and ins_id not in self._ins_ids:
+                    continue
+                # the timestamps are iso-formatted, i.e. they compare as strings
+                last_sync = synced.get(str(ins_id))
+                if last_sync is None or instrument['updatedAt'] > last_sync:
+                    queue.append((self._priority(kind, ins_id), next(sequence), kind, ins_id,
+                                  instrument['updatedAt']))
+        if self._kpi_screener is not None:
+            for spec in self._kpis:
+                if self._state['kpis'].get(_kpi_key(spec)) != kpis_updated:
+                    queue.append((self._priority('kpis'), next(sequence), 'kpis', spec, kpis_updated))
+        heapq.heapify(queue)
+        return queue
+
+    def _sync(self, kind, keys):
+        """
+        :param kind: 'prices', 'reports' or 'kpis'
+        :param keys: ins_ids or kpi specs to refetch
+        :return: list of the synced keys
+        """
+        if kind == 'kpis':
+            return self._kpi_screener.refresh(keys)
+        stored = self._stores[kind].refresh(keys, max_workers=self._max_workers)
+        # PriceStore.refresh returns its pull statistics with the stored instruments
+        return stored['stored'] if kind == 'prices' else stored
+
+    def _next_batch(self, queue, limit):
+        """
+        pops the next batch in priority order, grouped by kind. all queued prices are taken at once,
+        the price store shares its all-instrument api-calls (splits, last prices, days) between them.
+        :param queue: priority queue of poll
+        :param limit: max number of items, None for no limit
+        :return: dict of kind: {key: updated at}
+        """
+        if queue[0][2] == 'prices':
+            prices = sorted(item for item in queue if item[2] == 'prices')
+            queue[:] = [item for item in queue if item[2] != 'prices']
+            if limit is not None:
+                # one request for the split list and at most one per instrument, the prices beyond
+                # the budget stay queued
+                limit = max(limit - 1, 1)
+                queue.extend(prices[limit:])
+                prices = prices[:limit]
+            heapq.heapify(queue)
+            return {'prices': {key: updated_at for _, _, _, key, updated_at in prices}}
+        batch = {}
+        size = self._batch_size if limit is None else min(self._batch_size, limit)
+        while queue and size > 0 and queue[0][2] != 'prices':
+            _, _, kind, key, updated_at = heapq.heappop(queue)
+            batch.setdefault(kind, {})[key] = updated_at
+            size -= 1
+        return batch
+
+    def run_once(self, max_calls=None):
+        """
+        polls the change feeds and syncs the queued items in priority order
+        :param max_calls: max number of http-requests of the run (counted by the api, see request_count),
+                          no batch is started once they are used up and a batch takes at most one item
+                          per remaining request. the shared all-instrument calls of a price refresh
+                          (splits, last prices, one per missing day) and retries can exceed it.
+                          None syncs everything
+        :return: dict with the number of 'synced' items per kind, the number of items 'remaining' in the queue
+                 and the number of http-requests ('calls')
+        """
+        start = self._api.request_count
+        queue = self.poll()
+        synced = {kind: 0 for kind in self._priorities}
+
+        def calls():
+            return self._api.request_count - start
+        while queue and (max_calls is None or calls() < max_calls):
+            batch = self._next_batch(queue, None if max_calls is None else max_calls - calls())
+            for kind in sorted(batch, key=lambda kind: self._priorities.get(kind, len(self._priorities))):
+                done = self._sync(kind, list(batch[kind]))
+                for key in done:
+                    if kind == 'kpis':
+                        self._state['kpis'][_kpi_key(key)] = batch[kind][key]
+                    else:
+                        self._state['instruments'].setdefault(kind, {})[str(key)] = batch[kind][key]
+                synced[kind] = synced.get(kind, 0) + len(done)
+            self._save_state()
+        return {'synced': synced, 'remaining': len(queue), 'calls': calls()}
+
+    def run_forever(self, interval=3600, max_calls=None):
+        """
+        runs run_once every interval seconds
+        :param interval: seconds between two polls
+        :param max_calls: max number of api-calls per run
+        """
+        while True:
+            started = time.time()
+            result = self.run_once(max_calls)
+            print(f"SyncScheduler >> synced {result['synced']}, {result['remaining']} remaining, "
+                  f"{result['calls']} api-calls")
+            time.sleep(max(interval - (time.time() - started), 0))
+
+
+def main():
+    from borsdata.borsdata_api import BorsdataAPI
+    from borsdata.response_cache import ResponseCache
+    from borsdata.price_store import PriceStore
+    from borsdata.report_store import ReportStore
+    from borsdata.kpi_screener import KpiScreener
+    parser = argparse.ArgumentParser(description='syncs the local stores with what has changed in the Börsdata API')
+    parser.add_argument('--prices', action='store_true', help='sync the price store')
+    parser.add_argument('--reports', action='store_true', help='sync the report store')
+    parser.add_argument('--kpis', nargs='+', default=[], metavar='KPI_ID/CALC_GROUP/CALC',
+                        help='sync bulk kpis, e.g. 2/last/latest')
+    parser.add_argument('--ins-ids', nargs='+', type=int, help='instruments to sync (default all)')
+    parser.add_argument('--watchlist', nargs='+', type=int, default=[], help='instruments synced first')
+    parser.add_argument('--max-calls', type=int, help='max number of api-calls per run')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent api-calls')
+    parser.add_argument('--interval', type=float, default=3600, help='seconds between two runs with --forever')
+    parser.add_argument('--forever', action='store_true', help='keep running (default one run)')
+    args = parser.parse_args()
+    api = BorsdataAPI(constants.API_KEY, cache=ResponseCache(constants.CACHE_PATH + 'responses.sqlite'))
+    kpis = []
+    for kpi in args.kpis:
+        kpi_id, calc_group, calc = kpi.split('/')
+        kpis.append((int(kpi_id), calc_group, calc))
+    scheduler = SyncScheduler(api, price_store=PriceStore(api) if args.prices else None,
+                              report_store=ReportStore(api) if args.reports else None,
+                              kpi_screener=KpiScreener(api, args.workers) if kpis else None, kpis=kpis,
+                              ins_ids=args.ins_ids, watchlist=args.watchlist, max_workers=args.workers)
+    if args.forever:
+        scheduler.run_forever(args.interval, args.max_calls)
+    else:
+        print(scheduler.run_once(args.max_calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from borsdata.report_store import ReportStore
+
+# ratios of the valuation table
+RATIOS = ('pe', 'ps', 'pb', 'ev_ebit', 'ev_s')
+# r12 report fields the ratios are calculated from
+REPORT_FIELDS = ('earnings_per_share', 'number_of_shares', 'revenues', 'total_equity', 'operating_income', 'net_debt')
+
+
+def _ratio(numerator, denominator):
+    # a zero (or missing) denominator gives NaN instead of inf
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = numerator / denominator
+    return ratio.where(np.isfinite(ratio))
+
+
+def valuation_ratios(close, reports):
+    """
+    valuation ratios of many instruments in one vectorized pass
+    :param close: pd.Series of last closes indexed by ins_id
+    :param reports: pd.DataFrame of r12 report fields (REPORT_FIELDS) indexed by ins_id
+    :return: pd.DataFrame indexed by ins_id with close, market_cap, ev and RATIOS,
+             NaN where an instrument has no report or a denominator is zero
+    """
+    reports = reports.reindex(close.index)
+    # number of shares, revenues, equity, ebit and net debt are reported in millions,
+    # i.e. market cap and ev are in millions as well
+    market_cap = close * reports['number_of_shares']
+    ev = market_cap + reports['net_debt']
+    return pd.DataFrame({'close': close,
+                         'market_cap': market_cap,
+                         'ev': ev,
+                         'pe': _ratio(close, reports['earnings_per_share']),
+                         'ps': _ratio(market_cap, reports['revenues']),
+                         'pb': _ratio(market_cap, reports['total_equity']),
+                         'ev_ebit': _ratio(ev, reports['operating_income']),
+                         'ev_s': _ratio(ev, reports['revenues'])})
+
+
+class Valuation:
+    """
+    valuation ratios (pe, ps, pb, ev/ebit, ev/s) for a whole market at once: the last closes of all instruments
+    come from one api-call (instruments/stockprices/last), the r12 figures from the ReportStore, which only
+    fetches instruments it does not hold (keep it up to date with SyncScheduler).
+    the ratios are calculated in the reporting currency, closes in another currency are not converted.
+
+        valuation = Valuation(api)
+        valuation.table(ins_ids).sort_values('ev_ebit')
+    """
+    def __init__(self, api, report_store=None, max_workers=8):
+        """
+        :param api: BorsdataAPI
+        :param report_store: ReportStore of the r12 figures (default ReportStore(api))
+        :param max_workers: number of concurrent api-calls for reports missing in the store
+        """
+        self._api = api
+        self._report_store = report_store if report_store is not None else ReportStore(api)
+        self._max_workers = max_workers
+
+    def table(self, ins_ids=None):
+        """
+        :param ins_ids: instrument ids (default all instruments with a last price)
+        :return: pd.DataFrame indexed by ins_id with date, close, market_cap, ev, RATIOS and the
+                 year and period of the r12 report
+        """
+        last_prices = self._api.get_instruments_stock_prices_last()
+        last_prices = last_prices.drop_duplicates('ins_id', keep='last').set_index('ins_id')
+        if ins_ids is not None:
+            last_prices = last_prices.reindex(pd.Index([int(ins_id) for ins_id in ins_ids], name='ins_id'))
+        close = last_prices['close'].astype(np.float64).replace(0, np.nan)
+        # reports are only fetched for the instruments missing in the store
+        self._report_store.refresh(close.index, only_missing=True, max_workers=self._max_workers)
+        reports = self._report_store.latest(close.index, 'r12')
+        table = valuation_ratios(close, reports.reindex(columns=list(REPORT_FIELDS)).astype(np.float64))
+        table.insert(0, 'date', last_prices['date'])
+        table[['year', 'period']] = reports.reindex(index=table.index, columns=['year', 'period'])
+        return table
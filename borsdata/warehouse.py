@@ -0,0 +1,355 @@
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from borsdata import constants as constants
+
+_PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+_INSTRUMENT_COLUMNS = ['ins_id', 'name', 'ticker', 'isin', 'instrument_type', 'market', 'country', 'sector', 'branch']
+# reports-columns that are part of the key or are text
+_REPORT_KEY_COLUMNS = ['ins_id', 'report_type', 'year', 'period']
+# report types and their keys in the response of instruments/{ins_id}/reports
+_REPORT_KEYS = {'quarter': 'reportsQuarter', 'year': 'reportsYear', 'r12': 'reportsR12'}
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS instruments (ins_id INTEGER PRIMARY KEY, name TEXT, ticker TEXT, isin TEXT, '
+    'instrument_type TEXT, market TEXT, country TEXT, sector TEXT, branch TEXT)',
+    'CREATE INDEX IF NOT EXISTS instruments_market_country ON instruments (market, country)',
+    # clustered on (ins_id, date), i.e. the rows of an instrument are stored together and in date order
+    'CREATE TABLE IF NOT EXISTS prices (ins_id INTEGER, date TEXT, open REAL, high REAL, low REAL, close REAL, '
+    'volume INTEGER, PRIMARY KEY (ins_id, date)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS prices_date ON prices (date, ins_id)',
+    # the report columns are added as they are seen, see _report_columns
+    'CREATE TABLE IF NOT EXISTS reports (ins_id INTEGER, report_type TEXT, year INTEGER, period INTEGER, '
+    'PRIMARY KEY (ins_id, report_type, year, period)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS kpi_history (ins_id INTEGER, kpi_id INTEGER, report_type TEXT, price_type TEXT, '
+    'year INTEGER, period INTEGER, kpi_value REAL, '
+    'PRIMARY KEY (kpi_id, report_type, price_type, ins_id, year, period)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS kpi_history_ins_id ON kpi_history (ins_id)',
+    'CREATE TABLE IF NOT EXISTS splits (ins_id INTEGER, split_date TEXT, split_type TEXT, ratio TEXT, '
+    'PRIMARY KEY (ins_id, split_date))',
+]
+
+
+def _column_name(name):
+    # report fields become sql column names, e.g. 'Gross_Income' -> 'gross_income'
+    return re.sub(r'\W', '_', str(name).lower())
+
+
+def _date_text(value):
+    return None if value is None else str(np.datetime64(value, 'D'))
+
+
+class Warehouse:
+    """
+    local SQLite warehouse of instruments, stock prices, reports, kpi history and stock splits,
+    filled from the api once and queried without api-calls:
+
+        warehouse = Warehouse()
+        warehouse.fill(api, ins_ids, kpis=[(2, 'year', 'mean')])
+        close = warehouse.price_frame('close', market='Large Cap', country='Sverige', start='2015-01-01')
+
+    the query methods push their filters (instruments, market/country, dates, report types, fields) down
+    into sql, so only the needed rows are read: prices are clustered by (ins_id, date) with an index on date,
+    market and country filters are resolved through the indexed instruments table.
+    """
+    def __init__(self, path=constants.CACHE_PATH + 'warehouse.sqlite'):
+        """
+        :param path: path of the database file, ':memory:' for an in-memory warehouse
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+        self._report_columns = self._load_report_columns()
+
+    def close(self):
+        self._db.close()
+
+    def _load_report_columns(self):
+        return [row[1] for row in self._db.execute('PRAGMA table_info(reports)')
+                if row[1] not in _REPORT_KEY_COLUMNS]
+
+    def _write(self, statement, rows):
+        with self._lock:
+            self._db.executemany(statement, rows)
+            self._db.commit()
+
+    """
+    Writing
+    """
+    def write_instruments(self, instruments):
+        """
+        :param instruments: pd.DataFrame in the format of BorsdataClient.instruments_with_meta_data
+        """
+        rows = instruments.reindex(columns=_INSTRUMENT_COLUMNS).astype(object)
+        rows = rows.where(rows.notna(), None)
+        rows['ins_id'] = rows['ins_id'].astype(int)
+        self._write(f'INSERT OR REPLACE INTO instruments VALUES ({", ".join("?" * len(_INSTRUMENT_COLUMNS))})',
+                    rows.itertuples(index=False, name=None))
+
+    def write_prices(self, ins_id, stock_prices):
+        """
+        :param ins_id: instrument id
+        :param stock_prices: pd.DataFrame in the format of BorsdataAPI.get_instrument_stock_prices
+        """
+        arrays = {column: stock_prices[column].values for column in _PRICE_COLUMNS}
+        arrays['date'] = stock_prices.index.values
+        self.write_price_arrays(ins_id, arrays)
+
+    def write_price_arrays(self, ins_id, arrays):
+        """
+        :param ins_id: instrument id
+        :param arrays: dict of columns in the format of BorsdataAPI.get_instrument_stock_price_arrays,
+                       missing prices (NaN) are stored as NULL
+        """
+        dates = arrays['date'].astype('datetime64[D]').astype(str)
+        # sqlite stores NaN as NULL
+        columns = [arrays[column].astype(np.float64) for column in _PRICE_COLUMNS[:-1]]
+        volume = arrays['volume'].astype(np.int64)
+        rows = zip([int(ins_id)] * len(dates), dates, *(column.tolist() for column in columns), volume.tolist())
+        self._write('INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def _add_report_columns(self, columns):
+        for column in columns:
+            if column not in self._report_columns:
+                self._db.execute(f'ALTER TABLE reports ADD COLUMN "{column}"')
+                self._report_columns.append(column)
+
+    def write_reports(self, ins_id, reports_quarter, reports_year, reports_r12):
+        """
+        :param ins_id: instrument id
+        :param reports_quarter: pd.DataFrame, see BorsdataAPI.get_instrument_reports
+        :param reports_year: pd.DataFrame
+        :param reports_r12: pd.DataFrame
+        """
+        self._write_report_frames(ins_id, (('quarter', reports_quarter), ('year', reports_year),
+                                           ('r12', reports_r12)))
+
+    def write_reports_json(self, ins_id, json_data):
+        """
+        writes the reports as received, report types without reports are skipped and missing values are stored
+        as NULL (get_instrument_reports replaces them with 0)
+        :param ins_id: instrument id
+        :param json_data: json object of BorsdataAPI.get_instrument_reports_json
+        """
+        self._write_report_frames(ins_id, [(report_type, pd.DataFrame.from_records(json_data.get(key) or []))
+                                           for report_type, key in _REPORT_KEYS.items()])
+
+    def _write_report_frames(self, ins_id, reports):
+        frames = []
+        for report_type, frame in reports:
+            if len(frame) > 0:
+                frames.append(frame.rename(columns=_column_name).assign(report_type=report_type))
+        if not frames:
+            return
+        reports = pd.concat(frames, ignore_index=True)
+        reports['ins_id'] = int(ins_id)
+        columns = _REPORT_KEY_COLUMNS + [column for column in reports.columns if column not in _REPORT_KEY_COLUMNS]
+        reports = reports[columns].astype(object)
+        reports = reports.where(reports.notna(), None)
+        with self._lock:
+            self._add_report_columns(columns[len(_REPORT_KEY_COLUMNS):])
+            names = ', '.join(f'"{column}"' for column in columns)
+            self._db.executemany(f'INSERT OR REPLACE INTO reports ({names}) VALUES ({", ".join("?" * len(columns))})',
+                                 reports.itertuples(index=False, name=None))
+            self._db.commit()
+
+    def write_kpi_history(self, ins_id, kpi_id, report_type, price_type, kpi_history):
+        """
+        :param ins_id: instrument id
+        :param kpi_id: kpi id
+        :param report_type: ['quarter', 'year', 'r12']
+        :param price_type: ['mean', 'high', 'low']
+        :param kpi_history: pd.DataFrame in the format of BorsdataAPI.get_kpi_history
+        """
+        rows = zip(kpi_history['year'].astype(int).tolist(), kpi_history['period'].astype(int).tolist(),
+                   kpi_history['kpi_value'].astype(float).tolist())
+        self._write('INSERT OR REPLACE INTO kpi_history VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    ((int(ins_id), int(kpi_id), report_type, price_type, year, period, value)
+                     for year, period, value in rows))
+
+    def write_splits(self, stock_splits):
+        """
+        :param stock_splits: pd.DataFrame in the format of BorsdataAPI.get_stock_splits
+        """
+        rows = zip(stock_splits['instrumentId'].astype(int).tolist(),
+                   stock_splits['splitDate'].values.astype('datetime64[D]').astype(str).tolist(),
+                   stock_splits['splitType'].tolist(), stock_splits['ratio'].tolist())
+        self._write('INSERT OR REPLACE INTO splits VALUES (?, ?, ?, ?)', rows)
+
+    def fill(self, api, ins_ids, prices=True, reports=True, kpis=(), instruments=None, max_workers=8):
+        """
+        fetches data from the api into the warehouse
+        :param api: BorsdataAPI
+        :param ins_ids: iterable of instrument ids
+        :param prices: fetch the stock prices
+        :param reports: fetch the reports
+        :param kpis: list of (kpi_id, report_type, price_type) to fetch the kpi history of
+        :param instruments: pd.DataFrame of instruments with meta-data (BorsdataClient.instruments_with_meta_data)
+        :param max_workers: number of concurrent api-calls
+        """
+        ins_ids = [int(ins_id) for ins_id in ins_ids]
+        if instruments is not None:
+            self.write_instruments(instruments)
+        self.write_splits(api.get_stock_splits())
+        # the prices and reports are written as decoded, without the data frames of BorsdataAPI
+        # (which replace missing values with 0)
+        if prices:
+            for ins_id, arrays, error in api.fetch_many(api.get_instrument_stock_price_arrays, ins_ids, max_workers):
+                if error is not None:
+                    print(f"Warehouse >> could not fetch stock prices for ins_id {ins_id}: {error}")
+                    continue
+                self.write_price_arrays(ins_id, arrays)
+        if reports:
+            for ins_id, json_data, error in api.fetch_many(api.get_instrument_reports_json, ins_ids, max_workers):
+                if error is not None:
+                    print(f"Warehouse >> could not fetch reports for ins_id {ins_id}: {error}")
+                    continue
+                self.write_reports_json(ins_id, json_data)
+        for kpi_id, report_type, price_type in kpis:
+            for ins_id, kpi_history, error in api.get_kpi_history_many(ins_ids, kpi_id, report_type, price_type,
+                                                                       max_workers):
+                if error is not None:
+                    print(f"Warehouse >> could not fetch kpi {kpi_id} for ins_id {ins_id}: {error}")
+                    continue
+                self.write_kpi_history(ins_id, kpi_id, report_type, price_type, kpi_history)
+
+    """
+    Queries
+    """
+    def _query(self, sql, params):
+        with self._lock:
+            return pd.read_sql_query(sql, self._db, params=params)
+
+    @staticmethod
+    def _instrument_filter(table, ins_ids, market, country, where, params):
+        # instruments are filtered by id directly, market and country through the instruments table
+        if ins_ids is not None:
+            ins_ids = [int(ins_id) for ins_id in ins_ids]
+            where.append(f'{table}.ins_id IN ({", ".join("?" * len(ins_ids))})')
+            params.extend(ins_ids)
+        for column, value in (('market', market), ('country', country)):
+            if value is not None:
+                where.append(f'{table}.ins_id IN (SELECT ins_id FROM instruments WHERE {column} = ?)')
+                params.append(value)
+
+    @staticmethod
+    def _sql(select, where, order=None):
+        sql = select
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        if order is not None:
+            sql += ' ORDER BY ' + order
+        return sql
+
+    def instruments(self, market=None, country=None, ins_ids=None):
+        """
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param ins_ids: instrument ids
+        :return: pd.DataFrame of instruments with meta-data
+        """
+        where, params = [], []
+        self._instrument_filter('instruments', ins_ids, market, country, where, params)
+        return self._query(self._sql('SELECT * FROM instruments', where, 'ins_id'), params)
+
+    def prices(self, ins_ids=None, market=None, country=None, start=None, end=None, columns=_PRICE_COLUMNS):
+        """
+        stock prices in long format
+        :param ins_ids: instrument ids (default all)
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param start: first date, e.g. '2015-01-01'
+        :param end: last date
+        :param columns: price columns to read
+        :return: pd.DataFrame with the columns ins_id, date and columns, sorted by ins_id and date
+        """
+        where, params = [], []
+        self._instrument_filter('prices', ins_ids, market, country, where, params)
+        if start is not None:
+            where.append('date >= ?')
+            params.append(_date_text(start))
+        if end is not None:
+            where.append('date <= ?')
+            params.append(_date_text(end))
+        select = 'SELECT ' + ', '.join(['ins_id', 'date'] + [f'"{column}"' for column in columns]) + ' FROM prices'
+        prices = self._query(self._sql(select, where, 'ins_id, date'), params)
+        prices['date'] = pd.to_datetime(prices['date'])
+        return prices
+
+    def price_frame(self, column='close', ins_ids=None, market=None, country=None, start=None, end=None):
+        """
+        one price column as a date x ins_id table, e.g. for breadth calculations
+        :param column: price column, e.g. 'close'
+        :return: pd.DataFrame indexed by date with one column per ins_id, NaN where an instrument has no bar
+        """
+        prices = self.prices(ins_ids, market, country, start, end, [column])
+        return prices.pivot(index='date', columns='ins_id', values=column)
+
+    def reports(self, ins_ids=None, market=None, country=None, report_type=None, fields=None, year_from=None):
+        """
+        :param ins_ids: instrument ids (default all)
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param report_type: 'quarter', 'year' or 'r12', None reads all report types
+        :param fields: report fields to read, e.g. ['earnings_per_share'], None reads all fields
+        :param year_from: first year to read
+        :return: pd.DataFrame with the columns ins_id, report_type, year, period and fields
+        """
+        where, params = [], []
+        self._instrument_filter('reports', ins_ids, market, country, where, params)
+        if report_type is not None:
+            where.append('report_type = ?')
+            params.append(report_type)
+        if year_from is not None:
+            where.append('year >= ?')
+            params.append(int(year_from))
+        fields = self._report_columns if fields is None else [_column_name(field) for field in fields]
+        select = 'SELECT ' + ', '.join(_REPORT_KEY_COLUMNS + [f'"{field}"' for field in fields]) + ' FROM reports'
+        return self._query(self._sql(select, where, 'ins_id, report_type, year, period'), params)
+
+    def latest_reports(self, ins_ids=None, market=None, country=None, report_type='r12', fields=None):
+        """
+        the last report of each instrument
+        :return: pd.DataFrame indexed by ins_id
+        """
+        reports = self.reports(ins_ids, market, country, report_type, fields)
+        return reports.groupby('ins_id').tail(1).set_index('ins_id')
+
+    def kpi_history(self, kpi_id, report_type, price_type, ins_ids=None, market=None, country=None, year=None):
+        """
+        :param kpi_id: kpi id
+        :param report_type: ['quarter', 'year', 'r12']
+        :param price_type: ['mean', 'high', 'low']
+        :param ins_ids: instrument ids (default all)
+        :param market: market e.g. 'Large Cap'
+        :param country: country e.g. 'Sverige'
+        :param year: only this year
+        :return: pd.DataFrame with the columns ins_id, year, period and kpi_value
+        """
+        where, params = ['kpi_id = ?', 'report_type = ?', 'price_type = ?'], [int(kpi_id), report_type, price_type]
+        self._instrument_filter('kpi_history', ins_ids, market, country, where, params)
+        if year is not None:
+            where.append('year = ?')
+            params.append(int(year))
+        select = 'SELECT ins_id, year, period, kpi_value FROM kpi_history'
+        return self._query(self._sql(select, where, 'ins_id, year, period'), params)
+
+    def splits(self, ins_ids=None):
+        """
+        :param ins_ids: instrument ids (default all)
+        :return: pd.DataFrame in the format of BorsdataAPI.get_stock_splits
+        """
+        where, params = [], []
+        self._instrument_filter('splits', ins_ids, None, None, where, params)
+        splits = self._query(self._sql('SELECT ins_id AS instrumentId, split_type AS splitType, ratio, '
+                                       'split_date AS splitDate FROM splits', where, 'ins_id, split_date'), params)
+        splits['splitDate'] = pd.to_datetime(splits['splitDate'])
+        return splits
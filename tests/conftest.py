@@ -0,0 +1,49 @@
+import os
+import sys
+import pytest
+
+# the tests import the borsdata package and the mock server from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_server import MockBorsdataServer  # noqa: E402
+from borsdata.borsdata_api import BorsdataAPI  # noqa: E402
+from borsdata.rate_limiter import TokenBucketRateLimiter  # noqa: E402
+
+
+def make_api(server):
+    """
+    BorsdataAPI against a mock server, without rate limiting or backoff delays
+    """
+    return BorsdataAPI('key', url_root=server.url_root, backoff_factor=0, max_retries=1,
+                       rate_limiter=TokenBucketRateLimiter(rate=10000, capacity=10000, window_calls=0))
+
+
+class PartialReportsServer(MockBorsdataServer):
+    """
+    ins_id 1 has no reports at all (e.g. an index), ins_id 2 only quarter reports (e.g. a new listing)
+    """
+    def _reports(self, ins_id):
+        reports = super()._reports(ins_id)
+        if int(ins_id) == 1:
+            reports.update(reportsYear=[], reportsQuarter=[], reportsR12=[])
+        elif int(ins_id) == 2:
+            reports.update(reportsYear=[], reportsR12=[])
+        return reports
+
+
+@pytest.fixture(scope='session')
+def server():
+    with MockBorsdataServer(instruments=60, years=3) as mock_server:
+        yield mock_server
+
+
+@pytest.fixture
+def api(server):
+    with make_api(server) as borsdata_api:
+        yield borsdata_api
+
+
+@pytest.fixture(scope='session')
+def partial_server():
+    with PartialReportsServer(instruments=10, years=3) as mock_server:
+        yield mock_server
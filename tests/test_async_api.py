@@ -0,0 +1,76 @@
+import asyncio
+import aiohttp
+import numpy as np
+import pytest
+from benchmarks.mock_server import MockBorsdataServer
+from borsdata.async_borsdata_api import AsyncBorsdataAPI
+from borsdata.metrics import Metrics
+from borsdata.rate_limiter import TokenBucketRateLimiter
+from borsdata.response_cache import ResponseCache
+
+
+def _async_api(server, **kwargs):
+    return AsyncBorsdataAPI('key', url_root=server.url_root, backoff_factor=0, max_retries=1,
+                            rate_limiter=TokenBucketRateLimiter(rate=10000, capacity=10000, window_calls=0), **kwargs)
+
+
+def _run(server, coroutine_function, **kwargs):
+    async def main():
+        async with _async_api(server, **kwargs) as async_api:
+            return await coroutine_function(async_api)
+    return asyncio.run(main())
+
+
+def test_frames_match_the_sync_api(server, api):
+    async def fetch(async_api):
+        return (await async_api.get_instruments(), await async_api.get_instrument_stock_prices(3, adjusted=True),
+                await async_api.get_instrument_reports(3), await async_api.get_stock_prices_date('2020-12-29'))
+    instruments, stock_prices, reports, prices_date = _run(server, fetch)
+    assert instruments.equals(api.get_instruments())
+    assert stock_prices.equals(api.get_instrument_stock_prices(3, adjusted=True))
+    assert all(frame.equals(sync_frame) for frame, sync_frame in zip(reports, api.get_instrument_reports(3)))
+    assert prices_date.equals(api.get_stock_prices_date('2020-12-29'))
+
+
+def test_price_panel_matches_the_sync_api(server, api):
+    panel = _run(server, lambda async_api: async_api.get_price_panel([1, 2, 3], fields=('close',)))
+    sync_panel = api.get_price_panel([1, 2, 3], fields=('close',))
+    np.testing.assert_array_equal(panel['close'], sync_panel['close'])
+    assert panel.frame('close').index.equals(sync_panel.frame('close').index)
+
+
+def test_cache_and_metrics(server):
+    metrics = Metrics()
+
+    async def fetch(async_api):
+        await async_api.get_instruments()
+        await async_api.get_instruments()
+        return await async_api.refresh_cache(), await async_api.refresh_cache()
+    first, second = _run(server, fetch, cache=ResponseCache(), metrics=metrics)
+    counters = metrics.snapshot()['counters']
+    assert counters[('requests', 'instruments')] == 1 and counters[('cache_hits', 'instruments')] == 1
+    assert ('network', 'instruments') in metrics.snapshot()['histograms']
+    assert len(first) == server.instruments and second == []
+
+
+def test_instrument_names_are_fetched_once(server):
+    metrics = Metrics()
+
+    async def fetch(async_api):
+        return await async_api.get_instrument_name(3), await async_api.get_instrument_name(4), \
+            await async_api.get_instrument_name(-1)
+    assert _run(server, fetch, metrics=metrics) == ('Instrument 3', 'Instrument 4', 'Name could not be found!')
+    assert metrics.snapshot()['counters'][('requests', 'instruments')] == 1
+
+
+def test_api_error_raises(server):
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        _run(server, lambda async_api: async_api.get_kpi_summary(3, 'year'))
+    assert error.value.status == 404
+
+
+def test_hung_connection_times_out():
+    with MockBorsdataServer(instruments=2, years=1, latency=1.0) as slow_server:
+        with pytest.raises(asyncio.TimeoutError):
+            _run(slow_server, lambda async_api: async_api.get_markets(), timeout=0.1)
+        assert slow_server.request_count == 2
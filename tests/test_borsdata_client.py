@@ -0,0 +1,12 @@
+import subprocess
+import sys
+import os
+
+
+def test_importing_the_client_does_not_load_the_analytics():
+    code = ("import sys, borsdata.borsdata_client; "
+            "print(sorted(name for name in sys.modules if name in ('borsdata.kpi_screener', 'borsdata.close_window', "
+            "'borsdata.valuation', 'borsdata.streaming', 'borsdata.indicators')))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == '[]'
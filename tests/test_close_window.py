@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from conftest import make_api
+from borsdata.close_window import CloseWindow
+
+
+class _EmptyApi:
+    # no prices at all, e.g. a new account or a long holiday
+    def get_instruments_stock_prices_last(self):
+        return pd.DataFrame(columns=['date', 'ins_id', 'close'])
+
+    def get_stock_prices_date(self, date):
+        return pd.DataFrame(columns=['date', 'ins_id', 'close'])
+
+
+def test_merge_of_bars_before_an_empty_window_keeps_it_empty(tmp_path):
+    window = CloseWindow(_EmptyApi(), days=5, path=str(tmp_path) + '/')
+    # the latest bars of instruments that have not traded inside the window
+    stale = pd.DataFrame({'date': pd.to_datetime(['2020-01-02', '2020-06-30']), 'ins_id': [1, 2],
+                          'close': [10.0, 20.0]})
+    window._merge([stale], np.datetime64('2021-01-04'))
+    assert len(window.dates) == 0 and window.close.shape == (0, 0)
+    window.refresh(today='2021-01-08')
+    assert len(window.dates) == 0
+    assert CloseWindow(_EmptyApi(), days=5, path=str(tmp_path) + '/').returns(1).empty
+
+
+def test_refresh_fills_the_window_and_fetches_only_missing_days(server, tmp_path):
+    with make_api(server) as api:
+        window = CloseWindow(api, days=5, path=str(tmp_path) + '/')
+        assert window.refresh(today='2020-12-30') == 5
+        assert len(window.dates) == 5 and window.dates[-1] == np.datetime64('2020-12-30')
+        assert window.refresh(today='2020-12-30') == 0
+        # a larger window only fetches the days it does not hold
+        assert window.refresh(today='2020-12-31', days=7) == 3
+        assert len(window.dates) == 7
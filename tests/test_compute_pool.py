@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from borsdata import indicators as indicators
+from borsdata.compute_pool import ComputePool
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with ComputePool(max_workers=2, min_columns=4) as compute_pool:
+        yield compute_pool
+
+
+def _close(dates=300, instruments=40):
+    rng = np.random.RandomState(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (dates, instruments)), axis=0))
+    # instruments without bars on some days
+    close[rng.rand(dates, instruments) < 0.05] = np.nan
+    return close
+
+
+def test_shards_cover_the_columns_in_order(pool):
+    assert pool.shards(40) == [(0, 20), (20, 40)]
+    assert pool.shards(5) == [(0, 5)]
+
+
+def test_shared_memory_matrix(pool):
+    close = _close()
+    np.testing.assert_array_equal(pool.map_columns(indicators.sma, close, 20), indicators.sma(close, 20))
+    np.testing.assert_array_equal(pool.map_columns(indicators.rsi, close.astype(np.float32), 14),
+                                  indicators.rsi(close.astype(np.float32), 14))
+    # a non-contiguous matrix is copied into the shared memory block
+    np.testing.assert_array_equal(pool.map_columns(indicators.breadth, close[::2], 40, merge=sum),
+                                  indicators.breadth(close[::2], 40))
+
+
+def test_memory_mapped_npy_file(pool, tmp_path):
+    close = _close()
+    np.save(tmp_path / 'close.npy', close)
+    mapped = np.load(tmp_path / 'close.npy', mmap_mode='r')
+    assert pool._is_npy_file(mapped) and not pool._is_npy_file(mapped[:, :30])
+    np.testing.assert_array_equal(pool.map_columns(indicators.sma, mapped, 20), indicators.sma(close, 20))
+    # a slice of the file goes through shared memory
+    np.testing.assert_array_equal(pool.map_columns(indicators.breadth, mapped[:, :30], 40, merge=sum),
+                                  indicators.breadth(close[:, :30], 40))
+
+
+def test_small_matrices_are_computed_in_process():
+    with ComputePool(max_workers=2, min_columns=16) as pool:
+        close = _close(instruments=10)
+        np.testing.assert_array_equal(pool.map_columns(indicators.sma, close, 5), indicators.sma(close, 5))
+        assert pool._executor is None
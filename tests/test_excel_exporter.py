@@ -0,0 +1,31 @@
+import importlib.util
+import os
+import pytest
+from borsdata import constants as constants
+from borsdata.excel_exporter import ExcelExporter
+from conftest import make_api
+
+
+@pytest.fixture
+def exporter(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, 'EXPORT_PATH', str(tmp_path) + '/')
+    with make_api(server) as api:
+        yield ExcelExporter(api)
+
+
+def test_csv_export_is_resumed_from_the_manifest(exporter, tmp_path):
+    assert exporter.export('csv', writer_workers=2) == 60
+    files = [os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names]
+    assert sum(name.endswith('stock_prices.csv') for name in files) == 60
+    # country/market/instrument/sheet.csv, without a dated directory
+    assert all(os.path.relpath(name, tmp_path).count(os.sep) == 3 for name in files if name.endswith('.csv'))
+    assert exporter.export('csv') == 0
+    assert exporter.export('csv', force=True) == 60
+
+
+@pytest.mark.skipif(importlib.util.find_spec('pyarrow') is not None, reason='pyarrow is installed')
+def test_missing_engine_fails_before_fetching(exporter, server):
+    requests = server.request_count
+    with pytest.raises(ImportError, match='feather requires pyarrow'):
+        exporter.export('feather')
+    assert server.request_count == requests
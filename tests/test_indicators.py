@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from borsdata import indicators as indicators
+
+
+def _prices(gaps=True, dates=200, instruments=5, seed=7):
+    rng = np.random.RandomState(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (dates, instruments)), axis=0))
+    close = pd.DataFrame(close, index=pd.bdate_range('2020-01-01', periods=dates))
+    if gaps:
+        # days without a bar, and an instrument listed later
+        close = close.mask(rng.rand(dates, instruments) < 0.05)
+        close.iloc[:30, 2] = np.nan
+    spread = close * rng.uniform(0.005, 0.02, close.shape)
+    return close + spread, close - spread, close
+
+
+@pytest.mark.parametrize('gaps', [False, True])
+def test_windowed_indicators_match_pandas_rolling(gaps):
+    _, _, close = _prices(gaps)
+    sma = indicators.sma(close, [5, 20, 50])
+    assert sorted(sma) == [5, 20, 50]
+    for window in (5, 20, 50):
+        pd.testing.assert_frame_equal(sma[window], close.rolling(window).mean())
+    pd.testing.assert_frame_equal(indicators.rolling_max(close, 20), close.rolling(20).max())
+    pd.testing.assert_frame_equal(indicators.rolling_min(close, [10, 20])[10], close.rolling(10).min())
+    pd.testing.assert_frame_equal(indicators.returns(close, 5), close / close.shift(5) - 1)
+    # 1d input gives a 1d result
+    np.testing.assert_allclose(indicators.sma(close[0].values, 20), close[0].rolling(20).mean().values)
+
+
+@pytest.mark.parametrize('gaps', [False, True])
+def test_ema_and_rsi_match_pandas_ewm(gaps):
+    _, _, close = _prices(gaps)
+    ema = indicators.ema(close, [12, 26])
+    for span in (12, 26):
+        # a day without a bar keeps the previous mean and has no value
+        expected = close.ewm(span=span, adjust=False, ignore_na=True).mean().where(close.notna())
+        pd.testing.assert_frame_equal(ema[span], expected)
+    change = close.diff()
+    for window, rsi in indicators.rsi(close, [7, 14]).items():
+        gain = change.clip(lower=0).ewm(alpha=1 / window, adjust=False, ignore_na=True).mean()
+        loss = (-change).clip(lower=0).ewm(alpha=1 / window, adjust=False, ignore_na=True).mean()
+        expected = (100 - 100 / (1 + gain / loss)).where(change.notna())
+        pd.testing.assert_frame_equal(rsi, expected)
+        assert ((rsi >= 0) & (rsi <= 100) | rsi.isna()).all().all()
+
+
+def test_atr_matches_pandas():
+    high, low, close = _prices(gaps=False)
+    previous_close = close.shift(1)
+    # the first day has no previous close, its true range is high - low
+    true_range = pd.concat([high - low, (high - previous_close).abs(), (low - previous_close).abs()],
+                           keys=range(3)).groupby(level=1).max().asfreq(close.index.freq)
+    pd.testing.assert_frame_equal(indicators.true_range(high, low, close), true_range)
+    for window in (7, 14):
+        pd.testing.assert_frame_equal(indicators.atr(high, low, close, [7, 14])[window],
+                                      true_range.ewm(alpha=1 / window, adjust=False).mean())
+
+
+def test_breadth_counts_instruments_above_their_average():
+    _, _, close = _prices(gaps=False)
+    expected = (close > close.rolling(20).mean()).sum(axis=1).values
+    np.testing.assert_array_equal(indicators.breadth(close.values, 20), expected)
+
+
+@pytest.mark.parametrize('gaps', [False, True])
+def test_indicator_state_updates_like_the_batch_indicators(gaps):
+    high, low, close = _prices(gaps)
+    state = indicators.IndicatorState(sma_windows=(5, 20), ema_spans=(12,), rsi_windows=(14,), atr_windows=(14,),
+                                      high_low_windows=(10,), return_periods=(5,))
+    split = 150
+    state.fit(close.values[:split], high.values[:split], low.values[:split])
+    for row in range(split, split + 3):
+        latest = state.update(close.values[row], high.values[row], low.values[row])
+        history = slice(0, row + 1)
+        batch = {'sma5': indicators.sma(close[history], 5), 'sma20': indicators.sma(close[history], 20),
+                 'ema12': indicators.ema(close[history], 12), 'rsi14': indicators.rsi(close[history], 14),
+                 'high10': indicators.rolling_max(close[history], 10),
+                 'low10': indicators.rolling_min(close[history], 10),
+                 'return5': indicators.returns(close[history], 5)}
+        if not gaps:
+            batch['atr14'] = indicators.atr(high[history], low[history], close[history], 14)
+        for name, values in batch.items():
+            np.testing.assert_allclose(latest[name], values.values[-1], rtol=1e-10, err_msg=name)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from benchmarks.mock_server import MockBorsdataServer
+from borsdata.borsdata_api import BorsdataAPI
+from borsdata.borsdata_client import BorsdataClient
+from borsdata.kpi_screener import KpiScreener, kpi_values
+from borsdata.rate_limiter import TokenBucketRateLimiter
+from borsdata.response_cache import ResponseCache
+
+PE = {'pe': (2, 'last', 'latest')}
+
+
+class RecalculatingServer(MockBorsdataServer):
+    """
+    mock server whose kpis can be re-calculated (new values and a new kpisCalcUpdated)
+    """
+    calculation = 0
+
+    def recalculate(self):
+        self.calculation += 1
+        # the payloads are memoized per route
+        MockBorsdataServer._body.cache_clear()
+
+    def _kpis_updated(self):
+        return {'kpisCalcUpdated': f'{self.last_date}T0{self.calculation}:00:00'}
+
+    def _kpi_all_instruments(self, kpi_id, calc_group, calc):
+        json_data = super()._kpi_all_instruments(kpi_id, calc_group, calc)
+        for value in json_data['values']:
+            value['n'] += self.calculation
+        return json_data
+
+
+@pytest.fixture
+def cached_api():
+    MockBorsdataServer._body.cache_clear()
+    with RecalculatingServer(instruments=20, years=1) as server:
+        with BorsdataAPI('key', url_root=server.url_root, cache=ResponseCache(),
+                         rate_limiter=TokenBucketRateLimiter(window_calls=0)) as api:
+            yield server, api
+    MockBorsdataServer._body.cache_clear()
+
+
+def test_kpi_values():
+    values = kpi_values({'values': [{'i': 3, 'n': 1.5, 's': None}, {'i': 1, 'n': None, 's': 'x'}]})
+    assert values.index.tolist() == [3, 1] and values[3] == 1.5 and np.isnan(values[1])
+
+
+def test_screen_filters_and_ranks(api):
+    screener = KpiScreener(api)
+    matrix = screener.matrix({'pe': (2, 'last', 'latest'), 'roe': (33, 'last', 'latest')})
+    screen = screener.screen({'pe': (2, 'last', 'latest'), 'roe': (33, 'last', 'latest')}, where='pe > 10',
+                             rank={'pe': -1}, top=5)
+    assert len(screen) == 5 and (screen['pe'] > 10).all()
+    assert screen['pe'].tolist() == sorted(matrix.loc[matrix['pe'] > 10, 'pe'])[:5]
+
+
+def test_client_refresh_cache_drops_screener_values_after_a_recalculation(cached_api):
+    server, api = cached_api
+    client = BorsdataClient(api)
+    client.refresh_cache()
+    before = client._get_kpi_screener().matrix(PE)['pe']
+    # nothing re-calculated, the decoded values are kept
+    client.refresh_cache()
+    assert client._get_kpi_screener().matrix(PE)['pe'].equals(before)
+    server.recalculate()
+    assert client._get_kpi_screener().matrix(PE)['pe'].equals(before)
+    client.refresh_cache()
+    np.testing.assert_allclose(client._get_kpi_screener().matrix(PE)['pe'], before + 1)
@@ -0,0 +1,48 @@
+from borsdata.borsdata_api import BorsdataAPI
+from borsdata.metrics import Metrics
+from borsdata.rate_limiter import TokenBucketRateLimiter
+
+
+def test_prometheus_text_of_counters_and_histograms():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.increment('requests', 'instruments/3/stockprices')
+    metrics.increment('requests', 'instruments/4/stockprices')
+    metrics.increment('bytes', 'instruments/3/stockprices', 120)
+    metrics.increment('requests', 'instruments')
+    metrics.observe('network', 'instruments/3/stockprices', 0.05)
+    metrics.observe('network', 'instruments/4/stockprices', 0.5)
+    assert metrics.to_prometheus().splitlines() == [
+        '# TYPE borsdata_bytes_total counter',
+        'borsdata_bytes_total{endpoint="instruments/{id}/stockprices"} 120',
+        '# TYPE borsdata_requests_total counter',
+        'borsdata_requests_total{endpoint="instruments"} 1',
+        'borsdata_requests_total{endpoint="instruments/{id}/stockprices"} 2',
+        '# TYPE borsdata_stage_seconds histogram',
+        'borsdata_stage_seconds_bucket{stage="network",endpoint="instruments/{id}/stockprices",le="0.1"} 1',
+        'borsdata_stage_seconds_bucket{stage="network",endpoint="instruments/{id}/stockprices",le="1.0"} 2',
+        'borsdata_stage_seconds_bucket{stage="network",endpoint="instruments/{id}/stockprices",le="+Inf"} 2',
+        'borsdata_stage_seconds_sum{stage="network",endpoint="instruments/{id}/stockprices"} 0.55',
+        'borsdata_stage_seconds_count{stage="network",endpoint="instruments/{id}/stockprices"} 2',
+    ]
+
+
+def test_api_calls_are_counted_per_endpoint(server, tmp_path):
+    events = []
+    metrics = Metrics(sinks=[lambda *event: events.append(event)])
+    with BorsdataAPI('key', url_root=server.url_root, backoff_factor=0, max_retries=1, metrics=metrics,
+                     rate_limiter=TokenBucketRateLimiter(rate=10000, capacity=10000, window_calls=0)) as api:
+        api.get_instruments()
+        for ins_id in (1, 2, 3):
+            api.get_instrument_stock_prices(ins_id)
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'][('requests', 'instruments')] == 1
+    assert snapshot['counters'][('requests', 'instruments/{id}/stockprices')] == 3
+    assert snapshot['counters'][('bytes', 'instruments/{id}/stockprices')] > 0
+    assert snapshot['histograms'][('network', 'instruments/{id}/stockprices')]['count'] == 3
+    assert ('counter', 'requests', 'instruments', 1) in events
+    path = str(tmp_path / 'borsdata.prom')
+    metrics.write_prometheus(path)
+    with open(path) as file:
+        text = file.read()
+    assert 'borsdata_requests_total{endpoint="instruments/{id}/stockprices"} 3\n' in text
+    assert 'borsdata_stage_seconds_count{stage="network",endpoint="instruments/{id}/stockprices"} 3\n' in text
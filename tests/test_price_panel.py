@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from borsdata.price_panel import PricePanel
+
+
+def _prices(dates, close):
+    index = pd.DatetimeIndex(pd.to_datetime(dates), name='date')
+    close = np.array(close, dtype=np.float64)
+    return pd.DataFrame({'open': close - 1, 'high': close + 1, 'low': close - 2, 'close': close,
+                         'volume': close * 100}, index=index)
+
+
+def _frames():
+    # instruments with different trading days, and one without any prices
+    return [(3, _prices(['2020-01-02', '2020-01-06'], [30, 31])),
+            (1, _prices(['2020-01-02', '2020-01-03', '2020-01-06'], [10, 11, 12])),
+            (2, _prices([], []))]
+
+
+def test_instruments_are_aligned_on_the_shared_calendar():
+    panel = PricePanel.from_frames(_frames())
+    assert panel.shape == (3, 2)
+    assert list(panel.ins_ids) == [1, 3]
+    assert list(panel.dates) == list(np.array(['2020-01-02', '2020-01-03', '2020-01-06'], dtype='datetime64[D]'))
+    close = panel.frame('close')
+    assert close[1].tolist() == [10, 11, 12]
+    # no bar on 2020-01-03 is NaN, not a forward filled price
+    assert close[3].iloc[0] == 30 and np.isnan(close[3].iloc[1]) and close[3].iloc[2] == 31
+    instrument = panel.instrument(3)
+    assert list(instrument.index) == list(pd.to_datetime(['2020-01-02', '2020-01-06']))
+    assert instrument['volume'].tolist() == [3000, 3100]
+    assert panel['close'].dtype == np.float32
+
+
+def test_memory_mapped_panel_round_trip(tmp_path):
+    path = str(tmp_path / 'panel')
+    panel = PricePanel.from_frames(_frames(), path=path)
+    assert isinstance(panel['close'], np.memmap)
+    panel['close'].flush()
+    loaded = PricePanel.load(path)
+    assert isinstance(loaded['close'], np.memmap)
+    assert loaded.fields == list(panel.fields)
+    assert list(loaded.ins_ids) == [1, 3] and list(loaded.dates) == list(panel.dates)
+    for field in panel.fields:
+        np.testing.assert_array_equal(loaded[field], panel[field])
+    pd.testing.assert_frame_equal(loaded.instrument(1), PricePanel.from_frames(_frames()).instrument(1))
+
+
+def test_saved_panel_can_be_read_into_memory(tmp_path):
+    panel = PricePanel.from_frames(_frames())
+    panel.save(str(tmp_path))
+    loaded = PricePanel.load(str(tmp_path), fields=('close',), mmap=False)
+    assert loaded.fields == ['close'] and not isinstance(loaded['close'], np.memmap)
+    np.testing.assert_array_equal(loaded['close'], panel['close'])
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from benchmarks.mock_server import MockBorsdataServer
+from borsdata.price_store import PriceStore
+from conftest import make_api
+
+
+class SplitServer(MockBorsdataServer):
+    """
+    mock server with a settable split list, whose stock prices of some instruments can fail
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.splits = []
+        self.failing = set()
+
+    def split(self, ins_id, split_date):
+        self.splits.append({'instrumentId': ins_id, 'splitType': 'Split', 'ratio': '2:1',
+                            'splitDate': f'{split_date}T00:00:00'})
+        # the payloads are memoized per route
+        MockBorsdataServer._body.cache_clear()
+
+    def _stock_splits(self):
+        return {'stockSplitList': list(self.splits)}
+
+    def _stock_prices(self, ins_id, from_date=None, to_date=None):
+        if int(ins_id) in self.failing:
+            raise RuntimeError(f'stock prices of {ins_id} are not available')
+        return super()._stock_prices(ins_id, from_date, to_date)
+
+
+@pytest.fixture
+def split_server():
+    MockBorsdataServer._body.cache_clear()
+    with SplitServer(instruments=6, years=2) as server:
+        yield server
+    MockBorsdataServer._body.cache_clear()
+
+
+@pytest.fixture
+def store(split_server, tmp_path):
+    with make_api(split_server) as api:
+        yield PriceStore(api, path=str(tmp_path) + '/')
+
+
+def test_refresh_pulls_once_and_then_only_the_delta(store):
+    result = store.refresh([1, 2], today='2020-12-30')
+    assert result['full'] == 2 and sorted(result['stored']) == [1, 2]
+    assert store.last_date(1) == np.datetime64('2020-12-30')
+    result = store.refresh([1, 2], today='2020-12-31')
+    assert result['full'] == 0 and result['range'] == 0 and sorted(result['stored']) == [1, 2]
+
+
+def test_a_split_outside_the_refresh_is_not_marked_as_seen(split_server, store):
+    store.refresh([1, 2], today='2020-12-30')
+    split_server.split(2, '2020-11-02')
+    assert store.refresh([1], today='2020-12-30')['full'] == 0
+    result = store.refresh([2], today='2020-12-30')
+    assert result['full'] == 1 and result['stored'] == [2]
+    # the split has been seen now
+    assert store.refresh([1, 2], today='2020-12-30')['full'] == 0
+
+
+def test_a_failed_re_pull_is_retried(split_server, store):
+    store.refresh([3], today='2020-12-30')
+    split_server.split(3, '2020-11-02')
+    split_server.failing = {3}
+    result = store.refresh([3], today='2020-12-30')
+    assert result['full'] == 1 and result['stored'] == []
+    split_server.failing = set()
+    # a new store reads the state from disk
+    store = PriceStore(store._api, path=store._path)
+    result = store.refresh([3], today='2020-12-30')
+    assert result['full'] == 1 and result['stored'] == [3]
+    assert store.refresh([3], today='2020-12-30')['full'] == 0
@@ -0,0 +1,48 @@
+import multiprocessing
+import time
+import pytest
+from borsdata.rate_limiter import FileRateLimiter, TokenBucketRateLimiter, _BucketState
+
+
+def test_bucket_bursts_then_paces_at_the_rate():
+    state = _BucketState(rate=10, capacity=2, window_calls=0, window_seconds=10)
+    delays = [state.reserve(100.0) for _ in range(5)]
+    assert delays == pytest.approx([0, 0, 0.1, 0.2, 0.3])
+    # the bucket refills with the rate, one second later the backlog is gone and one token is back
+    assert state.reserve(101.0) == pytest.approx(0)
+
+
+def test_rolling_window_quota():
+    state = _BucketState(rate=1000, capacity=1000, window_calls=3, window_seconds=10)
+    assert [state.reserve(0.0) for _ in range(3)] == [0, 0, 0]
+    # the 4th call waits until the first one leaves the window
+    assert state.reserve(1.0) == pytest.approx(9)
+    assert state.reserve(11.0) == pytest.approx(0)
+
+
+def test_acquire_sleeps_for_the_reserved_slot():
+    limiter = TokenBucketRateLimiter(rate=20, capacity=1, window_calls=0)
+    started = time.perf_counter()
+    slept = [limiter.acquire() for _ in range(4)]
+    assert slept[0] == 0 and all(delay > 0 for delay in slept[1:])
+    assert time.perf_counter() - started >= 0.14
+
+
+def _reserve_slots(path, count, queue):
+    limiter = FileRateLimiter(path, rate=10, capacity=1, window_calls=0)
+    queue.put([time.time() + limiter.reserve() for _ in range(count)])
+
+
+def test_file_rate_limiter_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'limiter' / 'state.json')
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    processes = [context.Process(target=_reserve_slots, args=(path, 5, queue)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    slots = sorted(queue.get(timeout=30) + queue.get(timeout=30))
+    for process in processes:
+        process.join()
+    # one slot per 0.1 seconds across both processes, as if they were one limiter
+    gaps = [later - earlier for earlier, later in zip(slots, slots[1:])]
+    assert len(slots) == 10 and min(gaps) > 0.09
@@ -0,0 +1,40 @@
+import email.utils
+import time
+import pytest
+import requests
+from benchmarks.mock_server import MockBorsdataServer
+from borsdata.borsdata_raw_api import BorsdataRawAPI
+from borsdata.rate_limiter import TokenBucketRateLimiter
+
+
+class _Response:
+    def __init__(self, retry_after):
+        self.headers = {'Retry-After': retry_after}
+
+
+@pytest.fixture
+def raw_api():
+    with BorsdataRawAPI('key', backoff_factor=0.5, max_backoff=30) as api:
+        yield api
+
+
+def test_backoff_delay_honours_retry_after(raw_api):
+    assert raw_api._backoff_delay(0, _Response('2')) == 2
+    assert raw_api._backoff_delay(0, _Response('120')) == 30
+    retry_date = email.utils.formatdate(time.time() + 10, usegmt=True)
+    assert 8 < raw_api._backoff_delay(0, _Response(retry_date)) <= 10
+
+
+def test_malformed_retry_after_falls_back_to_exponential_backoff(raw_api):
+    assert raw_api._backoff_delay(0, _Response('soon')) == 0.5
+    assert raw_api._backoff_delay(3, _Response('')) == 4
+    assert raw_api._backoff_delay(2) == 2
+
+
+def test_hung_connection_times_out_and_is_retried():
+    with MockBorsdataServer(instruments=2, years=1, latency=1.0) as server:
+        with BorsdataRawAPI('key', url_root=server.url_root, timeout=0.1, max_retries=1, backoff_factor=0,
+                            rate_limiter=TokenBucketRateLimiter(window_calls=0)) as api:
+            with pytest.raises(requests.Timeout):
+                api.get_markets_json()
+        assert server.request_count == 2
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from borsdata.report_store import ReportStore, decode_reports
+from conftest import make_api
+
+
+@pytest.fixture
+def store(partial_server, tmp_path):
+    with make_api(partial_server) as api:
+        store = ReportStore(api, path=str(tmp_path) + '/')
+        assert sorted(store.refresh([1, 2, 3])) == [1, 2, 3]
+        yield store
+
+
+def test_decode_reports_sorts_and_keeps_missing_values():
+    json_data = {'reportsYear': [{'year': 2019, 'period': 5, 'revenues': None},
+                                 {'year': 2018, 'period': 5, 'revenues': 10.0}],
+                 'reportsQuarter': None,
+                 'reportsR12': [{'year': 2019, 'period': 4, 'Revenues': 12.5, 'report_End_Date': '2019-12-31T00:00:00'}]}
+    arrays = decode_reports(json_data, ['revenues'])
+    assert arrays['report_type'].tolist() == [1, 1, 2]
+    assert arrays['year'].tolist() == [2018, 2019, 2019]
+    assert arrays['values'][0, 0] == 10 and np.isnan(arrays['values'][1, 0]) and arrays['values'][2, 0] == 12.5
+    assert str(arrays['report_end_date'][2]) == '2019-12-31' and np.isnat(arrays['report_end_date'][0])
+
+
+def test_frame_leaves_out_instruments_without_the_report_type(store):
+    r12 = store.frame([1, 2, 3], 'r12')
+    assert set(r12.index.get_level_values('ins_id')) == {3}
+    quarter = store.frame([1, 2, 3], 'quarter')
+    assert set(quarter.index.get_level_values('ins_id')) == {2, 3}
+    assert len(store.frame([1], 'year')) == 0
+
+
+def test_latest_gives_nan_rows_for_missing_report_types(store):
+    latest = store.latest([1, 2, 3], 'r12')
+    assert latest.index.tolist() == [1, 2, 3]
+    assert latest.loc[[1, 2]].drop(columns=['report_end_date', 'report_date']).isna().all().all()
+    assert latest.loc[3, 'year'] == 2019 and latest.loc[3, 'period'] == 4
+    assert store.latest([1], 'r12').index.tolist() == [1]
+
+
+def test_latest_is_the_last_report(store):
+    latest = store.latest([2, 3], 'quarter')
+    reports = store.get(3)
+    np.testing.assert_equal(latest.loc[3, 'revenues'], reports.loc[('quarter', 2019, 4), 'revenues'])
+    assert latest.loc[2, 'year'] == 2019
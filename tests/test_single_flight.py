@@ -0,0 +1,98 @@
+import threading
+import time
+import pandas as pd
+import pytest
+from borsdata.single_flight import SingleFlight
+
+
+def _wait_for_followers(flights, key, count):
+    # the followers have joined the call once they are counted
+    deadline = time.time() + 10
+    while flights._calls[key].followers < count:
+        assert time.time() < deadline
+        time.sleep(0.001)
+
+
+def _run_concurrently(flights, key, function, callers):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def call(position):
+        try:
+            results[position] = flights.do(key, function)
+        except Exception as e:
+            errors[position] = e
+
+    threads = [threading.Thread(target=call, args=(position,)) for position in range(callers)]
+    threads[0].start()
+    # the leader is in flight before the others call
+    while key not in flights._calls:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    _wait_for_followers(flights, key, callers - 1)
+    return threads, results, errors
+
+
+def test_concurrent_calls_are_coalesced_into_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def fetch():
+        executions.append(1)
+        release.wait()
+        return pd.DataFrame({'close': [1.0, 2.0]})
+
+    threads, results, errors = _run_concurrently(flights, 'prices', fetch, 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(executions) == 1 and errors == [None] * 5
+    assert all(result['close'].tolist() == [1.0, 2.0] for result in results)
+    # every caller gets its own copy
+    assert len(set(id(result) for result in results)) == 5
+    results[0].loc[0, 'close'] = 100
+    assert all(result.loc[0, 'close'] == 1.0 for result in results[1:])
+    # the finished call is not cached
+    assert flights.do('prices', fetch) is not None and len(executions) == 2
+
+
+def test_an_error_is_raised_to_every_caller():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait()
+        raise ConnectionError('unavailable')
+
+    threads, results, errors = _run_concurrently(flights, 'prices', fetch, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    assert flights._calls == {}
+
+
+def test_without_copy_function_the_result_is_shared():
+    flights = SingleFlight(copy_function=None)
+    release = threading.Event()
+    shared = {'close': [1.0]}
+
+    def fetch():
+        release.wait()
+        return shared
+
+    threads, results, errors = _run_concurrently(flights, 'prices', fetch, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(result is shared for result in results)
+
+
+def test_different_keys_are_not_coalesced():
+    flights = SingleFlight()
+    assert flights.do(1, lambda: {'ins_id': 1}) == {'ins_id': 1}
+    assert flights.do(2, lambda: {'ins_id': 2}) == {'ins_id': 2}
+    with pytest.raises(ValueError):
+        flights.do(3, int, 'x')
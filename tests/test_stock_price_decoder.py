@@ -0,0 +1,53 @@
+import json
+import numpy as np
+from benchmarks.mock_server import MockBorsdataServer
+from borsdata.stock_price_decoder import decode_stock_prices
+
+
+def test_missing_values_and_types():
+    content = b'{"instrument":1,"stockPricesList":[' \
+              b'{"d":"2020-01-02T00:00:00","h":1.5,"l":null,"c":1.25,"o":1,"v":null},' \
+              b'{"d":"2020-01-03T00:00:00","h":2,"l":1,"c":1.5,"o":1.25,"v":12345678901}]}'
+    columns = decode_stock_prices(content)
+    assert columns['date'].tolist() == [np.datetime64('2020-01-02'), np.datetime64('2020-01-03')]
+    assert columns['close'].dtype == np.float32 and columns['close'].tolist() == [1.25, 1.5]
+    assert np.isnan(columns['low'][0]) and columns['low'][1] == 1
+    assert columns['volume'].dtype == np.int64 and columns['volume'].tolist() == [0, 12345678901]
+    assert 'ins_id' not in columns
+
+
+def test_all_instruments_response():
+    columns = decode_stock_prices('{"stockPricesList":[{"d":"2020-01-02","h":1,"l":1,"c":1,"o":1,"v":5,"i":7},'
+                                  '{"d":"2020-01-02","h":2,"l":2,"c":2,"o":2,"v":6,"i":9}]}')
+    assert columns['ins_id'].tolist() == [7, 9]
+    # no bars (e.g. a holiday) still gives the ins_id column
+    columns = decode_stock_prices('{"stockPricesList":[]}')
+    assert len(columns['date']) == 0 and len(columns['ins_id']) == 0
+
+
+def _reference(content):
+    rows = json.loads(content)['stockPricesList'] or []
+    return {'date': np.array([row['d'][:10] for row in rows], dtype='datetime64[D]'),
+            'close': np.array([row.get('c') for row in rows], dtype=np.float64).astype(np.float32),
+            'volume': np.array([row.get('v') or 0 for row in rows], dtype=np.int64)}
+
+
+def test_responses_of_many_chunks():
+    content = MockBorsdataServer(instruments=1, years=20)._stock_prices(1)
+    # a pretty-printed response with missing values
+    spaced = content.replace('},{', '}, \n {', 5000).replace('"c":', '"x":', 10)
+    for payload in (content, spaced.encode()):
+        columns = decode_stock_prices(payload)
+        expected = _reference(payload)
+        assert len(payload) > 5 * 65536 and len(columns['date']) == len(expected['date'])
+        np.testing.assert_array_equal(columns['date'], expected['date'])
+        np.testing.assert_array_equal(columns['close'], expected['close'])
+        np.testing.assert_array_equal(columns['volume'], expected['volume'])
+    assert np.isnan(decode_stock_prices(spaced)['close'][:10]).all()
+
+
+def test_unexpected_formats():
+    assert len(decode_stock_prices('{"stockPricesList":null}')['date']) == 0
+    # a bracket inside a row is parsed as a whole
+    columns = decode_stock_prices('{"stockPricesList":[{"d":"2020-01-02","h":1,"l":1,"c":1,"o":1,"v":5,"n":"[x]"}]}')
+    assert columns['close'].tolist() == [1]
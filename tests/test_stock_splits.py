@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_api
+from borsdata.stock_splits import SplitIndex, parse_ratio
+
+
+def _splits(rows):
+    return pd.DataFrame(rows, columns=['instrumentId', 'splitType', 'ratio', 'splitDate'])
+
+
+@pytest.mark.parametrize('ratio, split_type, factor', [
+    ('2:1', 'Split', 0.5),
+    ('1:10', 'Reverse Split', 10.0),
+    # a reverse split written the other way round
+    ('10:1', 'Reverse Split', 10.0),
+    ('3,5:1', None, 1 / 3.5),
+    ('0:1', 'Split', None),
+    ('n/a', 'Split', None),
+])
+def test_parse_ratio(ratio, split_type, factor):
+    if factor is None:
+        assert parse_ratio(ratio, split_type) is None
+    else:
+        assert parse_ratio(ratio, split_type) == pytest.approx(factor)
+
+
+def test_factors_are_cumulative_over_later_splits():
+    split_index = SplitIndex.from_frame(_splits([
+        (1, 'Split', '2:1', '2020-03-02'),
+        (1, 'Split', '3:1', '2020-06-01'),
+        (2, 'Reverse Split', '1:10', '2020-06-01'),
+    ]))
+    dates = np.array(['2020-01-02', '2020-03-02', '2020-05-29', '2020-06-01', '2020-12-30'], dtype='datetime64[D]')
+    # a split date already has the new prices
+    np.testing.assert_allclose(split_index.factors(1, dates), [1 / 6, 1 / 3, 1 / 3, 1, 1])
+    np.testing.assert_allclose(split_index.factors(2, dates), [10, 10, 10, 1, 1])
+    np.testing.assert_allclose(split_index.factors(3, dates), np.ones(5))
+
+
+def test_update_recomputes_only_changed_instruments():
+    splits = [(1, 'Split', '2:1', '2020-03-02'), (2, 'Split', '2:1', '2020-03-02'), (3, 'Split', 'bad', '2020-03-02')]
+    split_index = SplitIndex.from_frame(_splits(splits))
+    # an unparsable ratio is ignored
+    assert sorted(split_index.ins_ids) == [1, 2] and 3 not in split_index
+    assert split_index.update(_splits(splits)) == set()
+    assert split_index.update(_splits(splits[1:] + [(2, 'Split', '2:1', '2020-09-01')])) == {1, 2}
+    assert 1 not in split_index
+    np.testing.assert_allclose(split_index.factors(2, np.array(['2020-01-02'], dtype='datetime64[D]')), [0.25])
+
+
+def test_adjust_frame_of_one_and_of_several_instruments():
+    split_index = SplitIndex.from_frame(_splits([(1, 'Split', '2:1', '2020-03-02')]))
+    dates = pd.to_datetime(['2020-02-28', '2020-03-02'])
+    prices = pd.DataFrame({'close': np.array([100, 51], dtype=np.float32), 'volume': [1000, 2000]},
+                          index=pd.Index(dates, name='date'))
+    adjusted = split_index.adjust_frame(prices, 1)
+    np.testing.assert_allclose(adjusted['close'], [50, 51])
+    assert adjusted['volume'].tolist() == [2000, 2000]
+    assert adjusted['close'].dtype == np.float32 and prices['close'].tolist() == [100, 51]
+    assert split_index.adjust_frame(prices, 2) is prices
+    rows = pd.DataFrame({'date': [dates[0], dates[0], dates[1]], 'ins_id': [1, 2, 1], 'close': [100.0, 100.0, 51.0]})
+    np.testing.assert_allclose(split_index.adjust_frame(rows)['close'], [50, 100, 51])
+
+
+def test_adjusted_stock_prices_of_the_api(server):
+    with make_api(server) as api:
+        # a split inside the mock server's history
+        api._split_index = SplitIndex.from_frame(_splits([(3, 'Split', '4:1', '2020-06-01')]))
+        prices = api.get_instrument_stock_prices(3)
+        adjusted = api.get_instrument_stock_prices(3, adjusted=True)
+        before = prices.index < '2020-06-01'
+        assert before.any() and not before.all()
+        np.testing.assert_allclose(adjusted['close'][before], prices['close'][before] / 4, rtol=1e-6)
+        np.testing.assert_allclose(adjusted['close'][~before], prices['close'][~before])
+        assert api.get_instrument_stock_prices(4, adjusted=True).equals(api.get_instrument_stock_prices(4))
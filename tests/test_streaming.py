@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pandas as pd
+from borsdata import indicators as indicators
+from borsdata.async_borsdata_api import AsyncBorsdataAPI
+from borsdata.borsdata_raw_api import BorsdataRawAPI
+from borsdata.streaming import fold, BreadthCount, TopK, GroupedSum
+
+
+class _Counter:
+    # ins_ids as a lazy generator, counting the ids taken, the calls made and the most calls running at once
+    def __init__(self, count):
+        self.count = count
+        self.taken = 0
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def ins_ids(self):
+        for ins_id in range(1, self.count + 1):
+            self.taken += 1
+            yield ins_id
+
+    def start(self):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def end(self, ins_id):
+        with self._lock:
+            self.running -= 1
+        if ins_id == 5:
+            raise ValueError('no data')
+        return ins_id * 10
+
+    def call(self, ins_id):
+        self.start()
+        time.sleep(0.001)
+        return self.end(ins_id)
+
+
+def test_fetch_many_bounds_pending_calls_and_yields_errors():
+    counter = _Counter(50)
+    results = {}
+    with BorsdataRawAPI('key') as raw_api:
+        for ins_id, result, error in raw_api.fetch_many(counter.call, counter.ins_ids(), max_workers=2,
+                                                        max_in_flight=4):
+            # at most max_in_flight pending calls and the finished ones not yielded yet
+            assert counter.taken - len(results) <= 2 * 4
+            results[ins_id] = error if error is not None else result
+            time.sleep(0.002)
+    assert counter.peak <= 2
+    assert sorted(results) == list(range(1, 51)) and isinstance(results.pop(5), ValueError)
+    assert all(result == ins_id * 10 for ins_id, result in results.items())
+
+
+def test_fetch_many_stops_calling_when_the_consumer_stops():
+    counter = _Counter(1000)
+    with BorsdataRawAPI('key') as raw_api:
+        stream = raw_api.fetch_many(counter.call, counter.ins_ids(), max_workers=2, max_in_flight=4)
+        for _ in range(3):
+            next(stream)
+        stream.close()
+    assert counter.calls <= 3 + 2 * 4 and counter.taken <= 3 + 2 * 4
+
+
+def test_async_fetch_many_bounds_pending_calls_and_stops_early():
+    counter = _Counter(1000)
+
+    async def call(ins_id):
+        counter.start()
+        await asyncio.sleep(0.001)
+        return counter.end(ins_id)
+
+    async def main():
+        async with AsyncBorsdataAPI('key') as async_api:
+            results = {}
+            stream = async_api.fetch_many(call, counter.ins_ids(), max_concurrency=2, max_in_flight=4)
+            async for ins_id, result, error in stream:
+                assert counter.taken - len(results) <= 2 * 4
+                results[ins_id] = error if error is not None else result
+                await asyncio.sleep(0.002)
+                if len(results) == 10:
+                    break
+            await stream.aclose()
+            return results
+    results = asyncio.run(main())
+    assert len(results) == 10 and counter.taken <= 10 + 2 * 4 and counter.peak <= 2
+    if 5 in results:
+        assert isinstance(results[5], ValueError)
+
+
+def _frames(seed=1, instruments=12, days=120):
+    # instruments listed and delisted at different dates, with missing bars (NaN) on random days
+    rng = np.random.RandomState(seed)
+    calendar = pd.bdate_range('2020-01-01', periods=days)
+    frames = {}
+    for ins_id in range(1, instruments + 1):
+        first, last = sorted(rng.randint(0, days, 2))
+        dates = calendar[first:last + 1]
+        dates = dates[rng.rand(len(dates)) > 0.1]
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        frames[ins_id] = pd.DataFrame({'close': close, 'volume': rng.randint(1, 1000, len(dates))},
+                                      index=pd.Index(dates, name='date'))
+    return calendar, frames
+
+
+def test_breadth_count_with_a_calendar_matches_indicators_breadth():
+    calendar, frames = _frames()
+    breadth = BreadthCount(10, calendar=calendar)
+    result, = fold(((ins_id, frame) for ins_id, frame in frames.items()), [breadth])
+    close = pd.DataFrame({ins_id: frame['close'] for ins_id, frame in frames.items()}).reindex(calendar)
+    np.testing.assert_array_equal(result.values, indicators.breadth(close.values, 10))
+    assert result.index.equals(calendar)
+
+
+def test_top_k_and_grouped_sum_match_the_whole_frame():
+    _, frames = _frames(seed=2)
+    errors = []
+    stream = [(ins_id, frame, None) for ins_id, frame in frames.items()] + [(99, None, ValueError('no data'))]
+    top, sums = fold(stream, [TopK(3, 'close'), GroupedSum(['volume'])],
+                     on_error=lambda ins_id, error: errors.append(ins_id))
+    assert errors == [99]
+    last = pd.Series({ins_id: frame['close'].iloc[-1] for ins_id, frame in frames.items()})
+    assert top.index.tolist() == last.sort_values(ascending=False).index[:3].tolist()
+    np.testing.assert_allclose(top.values, last.sort_values(ascending=False).values[:3])
+    grouped = pd.concat(frames.values()).groupby(level='date')['volume']
+    np.testing.assert_allclose(sums['volume'], grouped.sum())
+    np.testing.assert_allclose(sums['volume_count'], grouped.count())
+    lowest = fold(frames.items(), [TopK(2, 'close', largest=False)])[0]
+    assert lowest.index.tolist() == last.sort_values().index[:2].tolist()
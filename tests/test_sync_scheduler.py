@@ -0,0 +1,112 @@
+import pytest
+from benchmarks.mock_server import MockBorsdataServer
+from borsdata.kpi_screener import KpiScreener
+from borsdata.price_store import PriceStore
+from borsdata.report_store import ReportStore
+from borsdata.sync_scheduler import SyncScheduler
+from conftest import make_api
+
+
+class ChangingServer(MockBorsdataServer):
+    """
+    mock server whose instruments/updated timestamps can be changed and whose reports can fail
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.updated = {ins_id: '2020-12-30T06:00:00' for ins_id in range(1, self.instruments + 1)}
+        self.failing = set()
+
+    def update(self, ins_ids, updated_at):
+        self.updated.update({ins_id: updated_at for ins_id in ins_ids})
+        # the payloads are memoized per route
+        MockBorsdataServer._body.cache_clear()
+
+    def _instruments_updated(self):
+        return {'instruments': [{'insId': ins_id, 'updatedAt': updated_at}
+                                for ins_id, updated_at in self.updated.items()]}
+
+    def _reports(self, ins_id):
+        if int(ins_id) in self.failing:
+            raise RuntimeError(f'reports of {ins_id} are not available')
+        return super()._reports(ins_id)
+
+
+@pytest.fixture
+def changing_server():
+    MockBorsdataServer._body.cache_clear()
+    with ChangingServer(instruments=6, years=2) as server:
+        yield server
+    MockBorsdataServer._body.cache_clear()
+
+
+@pytest.fixture
+def scheduler_api(changing_server):
+    with make_api(changing_server) as api:
+        yield api
+
+
+def _scheduler(api, tmp_path, **kwargs):
+    return SyncScheduler(api, report_store=ReportStore(api, path=str(tmp_path / 'reports') + '/'),
+                         path=str(tmp_path / 'sync') + '/', **kwargs)
+
+
+def test_second_run_only_polls(scheduler_api, tmp_path):
+    scheduler = _scheduler(scheduler_api, tmp_path, kpi_screener=KpiScreener(scheduler_api),
+                           kpis=[(2, 'last', 'latest')])
+    result = scheduler.run_once()
+    assert result['synced']['reports'] == 6 and result['synced']['kpis'] == 1 and result['remaining'] == 0
+    # the state survives a restart
+    result = _scheduler(scheduler_api, tmp_path, kpi_screener=KpiScreener(scheduler_api),
+                        kpis=[(2, 'last', 'latest')]).run_once()
+    assert result == {'synced': {'prices': 0, 'kpis': 0, 'reports': 0}, 'remaining': 0, 'calls': 2}
+
+
+def test_only_updated_instruments_are_refetched(changing_server, scheduler_api, tmp_path):
+    scheduler = _scheduler(scheduler_api, tmp_path)
+    scheduler.run_once()
+    changing_server.update([2, 5], '2020-12-31T06:00:00')
+    queue = scheduler.poll()
+    assert sorted(item[3] for item in queue) == [2, 5]
+    assert scheduler.run_once()['synced']['reports'] == 2
+    assert len(scheduler.poll()) == 0
+
+
+def test_failed_refetch_of_a_stored_instrument_stays_stale(changing_server, scheduler_api, tmp_path):
+    scheduler = _scheduler(scheduler_api, tmp_path)
+    scheduler.run_once()
+    changing_server.update([3, 4], '2020-12-31T06:00:00')
+    changing_server.failing = {3}
+    assert scheduler.run_once()['synced']['reports'] == 1
+    # 3 is still in the store (with the old reports) but is queued again
+    assert [item[3] for item in scheduler.poll()] == [3]
+    changing_server.failing = set()
+    assert scheduler.run_once()['synced']['reports'] == 1
+    assert len(scheduler.poll()) == 0
+
+
+def test_budget_and_watchlist_order(scheduler_api, tmp_path):
+    scheduler = _scheduler(scheduler_api, tmp_path, watchlist=[5], batch_size=2,
+                           price_store=PriceStore(scheduler_api, path=str(tmp_path / 'prices') + '/'))
+    assert [(item[2], item[3]) for item in sorted(scheduler.poll())][:3] == \
+        [('prices', 5), ('reports', 5), ('prices', 1)]
+    # the poll, the split list and the full pulls of the first 3 instruments (watchlist first)
+    result = scheduler.run_once(max_calls=6)
+    assert result['calls'] == 6 and result['remaining'] == 9
+    assert result['synced'] == {'prices': 3, 'kpis': 0, 'reports': 0}
+    assert sorted(item[3] for item in scheduler.poll() if item[2] == 'prices') == [3, 4, 6]
+    result = scheduler.run_once()
+    assert result['synced'] == {'prices': 3, 'kpis': 0, 'reports': 6} and result['remaining'] == 0
+
+
+def test_prices_are_refreshed_once_per_run_and_calls_are_requests(changing_server, scheduler_api, tmp_path):
+    scheduler = _scheduler(scheduler_api, tmp_path, batch_size=2,
+                           price_store=PriceStore(scheduler_api, path=str(tmp_path / 'prices') + '/'))
+    scheduler.run_once()
+    changing_server.update([1, 2, 3, 4, 5, 6], '2020-12-31T06:00:00')
+    requests = changing_server.request_count
+    result = scheduler.run_once()
+    assert result['synced'] == {'prices': 6, 'kpis': 0, 'reports': 6}
+    assert result['calls'] == changing_server.request_count - requests
+    # the poll, one split list for all 6 instruments (not one per batch), one range pull per instrument
+    # (the mock data ends in 2020, i.e. the instruments lag) and one reports call per instrument
+    assert result['calls'] == 2 + 1 + 6 + 6
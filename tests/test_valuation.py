@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from borsdata.borsdata_client import BorsdataClient
+from borsdata.report_store import ReportStore
+from borsdata.valuation import Valuation, valuation_ratios
+from borsdata.warehouse import Warehouse
+from conftest import make_api
+
+
+def test_valuation_ratios_give_nan_for_zero_denominators():
+    close = pd.Series([10.0, 20.0], index=[1, 2])
+    reports = pd.DataFrame({'earnings_per_share': [2.0, 0.0], 'number_of_shares': [100.0, 10.0],
+                            'revenues': [500.0, 0.0], 'total_equity': [250.0, 100.0],
+                            'operating_income': [50.0, 10.0], 'net_debt': [-100.0, 0.0]}, index=[1, 2])
+    table = valuation_ratios(close, reports)
+    assert table.loc[1, 'pe'] == 5 and table.loc[1, 'ps'] == 2 and table.loc[1, 'pb'] == 4
+    assert table.loc[1, 'ev'] == 900 and table.loc[1, 'ev_ebit'] == 18
+    assert np.isnan(table.loc[2, 'pe']) and np.isnan(table.loc[2, 'ev_s'])
+
+
+def test_table_with_instruments_without_r12_reports(partial_server, tmp_path):
+    with make_api(partial_server) as api:
+        table = Valuation(api, ReportStore(api, path=str(tmp_path) + '/')).table([1, 2, 3])
+    assert table.index.tolist() == [1, 2, 3]
+    assert table.loc[[1, 2], 'pe'].isna().all()
+    assert np.isfinite(table.loc[3, 'close']) and table.loc[3, 'year'] == 2019
+
+
+def test_get_latest_pe_of_an_instrument_missing_in_the_warehouse(api, capsys):
+    warehouse = Warehouse(':memory:')
+    BorsdataClient(api, warehouse=warehouse).get_latest_pe(5)
+    assert 'could not be found' in capsys.readouterr().out
+    warehouse.close()
+
+
+def test_get_latest_pe_of_an_instrument_without_r12_reports(partial_server, tmp_path, capsys):
+    with make_api(partial_server) as api:
+        client = BorsdataClient(api)
+        client._valuation = Valuation(api, ReportStore(api, path=str(tmp_path) + '/'))
+        client.get_latest_pe(2)
+        assert 'could not be found' in capsys.readouterr().out
+        client.get_latest_pe(3)
+        assert capsys.readouterr().out.startswith('PE for Instrument 3 is ')
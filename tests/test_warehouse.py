@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_api
+from borsdata.warehouse import Warehouse
+
+INS_IDS = [1, 2, 3, 4]
+PE = (2, 'year', 'mean')
+_KEYS = ['ins_id', 'report_type', 'year', 'period']
+
+
+@pytest.fixture(scope='module')
+def filled(server):
+    instruments = pd.DataFrame({'ins_id': INS_IDS, 'name': [f'Instrument {i}' for i in INS_IDS],
+                                'market': ['Large Cap', 'Large Cap', 'Mid Cap', 'Large Cap'],
+                                'country': ['Sverige', 'Sverige', 'Sverige', 'Norge']})
+    warehouse = Warehouse(':memory:')
+    with make_api(server) as api:
+        warehouse.fill(api, INS_IDS, kpis=[PE], instruments=instruments)
+        yield api, warehouse
+    warehouse.close()
+
+
+def test_prices_are_filtered_by_instrument_and_date(filled):
+    api, warehouse = filled
+    prices = warehouse.prices([2], start='2020-06-01', end='2020-06-30', columns=['close', 'volume'])
+    expected = api.get_instrument_stock_prices(2).loc['2020-06-01':'2020-06-30']
+    assert list(prices.columns) == ['ins_id', 'date', 'close', 'volume']
+    assert (prices['ins_id'] == 2).all() and prices['date'].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(prices['close'], expected['close'], rtol=1e-6)
+
+
+def test_market_and_country_filters(filled):
+    _, warehouse = filled
+    assert warehouse.instruments(market='Large Cap')['ins_id'].tolist() == [1, 2, 4]
+    assert warehouse.instruments(market='Large Cap', country='Sverige')['ins_id'].tolist() == [1, 2]
+    close = warehouse.price_frame('close', market='Large Cap', country='Sverige', start='2020-12-01')
+    assert close.columns.tolist() == [1, 2] and close.index.min() >= pd.Timestamp('2020-12-01')
+    assert warehouse.prices(market='Small Cap').empty
+
+
+def test_reports_by_type_field_and_year(filled):
+    api, warehouse = filled
+    reports = warehouse.reports([3], report_type='r12', fields=['Earnings_Per_Share'], year_from=2019)
+    assert list(reports.columns) == ['ins_id', 'report_type', 'year', 'period', 'earnings_per_share']
+    assert (reports['report_type'] == 'r12').all() and (reports['year'] >= 2019).all()
+    r12 = pd.DataFrame(api.get_instrument_reports_json(3)['reportsR12']).rename(columns=str.lower)
+    r12 = r12[r12['year'] >= 2019].sort_values(['year', 'period'])
+    # missing values stay missing
+    np.testing.assert_allclose(reports['earnings_per_share'], r12['earnings_per_share'].astype(float), rtol=1e-6)
+    latest = warehouse.latest_reports(INS_IDS, fields=['earnings_per_share'])
+    assert latest.index.tolist() == INS_IDS
+    assert latest.loc[3, 'earnings_per_share'] == pytest.approx(r12['earnings_per_share'].iloc[-1], nan_ok=True)
+
+
+def test_missing_report_values_are_null(filled):
+    api, warehouse = filled
+    json_data = api.get_instrument_reports_json(1)
+    missing = sum(value is None for key in ('reportsQuarter', 'reportsYear', 'reportsR12')
+                  for row in json_data[key] for field, value in row.items())
+    reports = warehouse.reports([1])
+    assert missing > 0 and reports.drop(columns=_KEYS).isna().sum().sum() == missing
+
+
+def test_partial_report_sets_are_stored(partial_server, capsys):
+    warehouse = Warehouse(':memory:')
+    with make_api(partial_server) as api:
+        warehouse.fill(api, [1, 2, 3])
+    assert 'could not fetch' not in capsys.readouterr().out
+    counts = warehouse.reports().groupby(['ins_id', 'report_type']).size()
+    assert 1 not in counts.index.get_level_values('ins_id')
+    assert counts.loc[2].index.tolist() == ['quarter'] and counts.loc[3].index.tolist() == ['quarter', 'r12', 'year']
+    assert warehouse.prices([1, 2, 3])['ins_id'].unique().tolist() == [1, 2, 3]
+    warehouse.close()
+
+
+def test_kpi_history_and_splits(filled):
+    api, warehouse = filled
+    history = warehouse.kpi_history(*PE, ins_ids=[1, 4], country='Sverige')
+    expected = api.get_kpi_history(1, *PE)
+    assert (history['ins_id'] == 1).all() and len(history) == len(expected)
+    assert len(warehouse.kpi_history(*PE, year=2019)) == len(INS_IDS)
+    splits = warehouse.splits()
+    assert splits.equals(api.get_stock_splits()[splits.columns].sort_values(['instrumentId', 'splitDate'])
+                         .reset_index(drop=True).astype(splits.dtypes))
+
+
+def test_queries_of_unknown_instruments_are_empty(filled):
+    _, warehouse = filled
+    assert warehouse.prices([999]).empty and warehouse.reports([999], report_type='r12').empty
+    assert warehouse.latest_reports([999]).empty and warehouse.price_frame('close', [999]).empty